@@ -0,0 +1,45 @@
+import asyncio
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException
+
+from app.schemas.predictions import InsightsResponse
+from app.services.insights_service import get_insights_refresher
+from main import get_current_user
+
+router = APIRouter()
+
+@router.get("/", response_model=InsightsResponse)
+async def get_insights(
+    current_user: dict = Depends(get_current_user)
+):
+    """Returns the user's spending trends, savings opportunities and recommendations.
+
+    Insights are precomputed in the background and served from the insights
+    store; they are only generated during the request when none are stored
+    yet. ``computed_at`` says when they were generated and ``stale`` whether
+    newer transactions are waiting to be included.
+
+    Args:
+        current_user (dict): The authenticated user's information, injected by Depends.
+
+    Returns:
+        InsightsResponse: The stored insights.
+
+    Raises:
+        HTTPException: 504 if generating missing insights times out, 500 if it fails.
+    """
+    try:
+        stored, stale = await get_insights_refresher().get(current_user["user_id"])
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Insight generation timed out")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Insight generation failed: {str(e)}")
+
+    return InsightsResponse(
+        period_days=stored.period_days,
+        computed_at=stored.computed_at,
+        stale=stale,
+        generated_at=datetime.now(),
+        **stored.insights
+    )
@@ -1,20 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List, Dict, Any, Optional
-from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from datetime import datetime
 from enum import Enum
-import pandas as pd
-import numpy as np
+import functools
+import hashlib
+import orjson
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_db
-from app.models.transaction import Transaction
+from app.core.database import get_read_db, read_session
+from app.core.responses import fast_json
+from app.core.singleflight import SingleFlight
 from app.schemas.analytics import (
     AnalyticsResponse,
+    BatchOverviewRequest,
     SpendingPatternResponse,
     CategoryAnalysisResponse,
     TrendAnalysisResponse
 )
-from app.services.analytics_service import AnalyticsService
+from app.services.analytics_service import AnalyticsService, day_window
+from app.services.export_service import MEDIA_TYPES, TransactionExporter
 from main import get_current_user
 
 
@@ -24,20 +29,108 @@ class PeriodEnum(str, Enum):
     monthly = "monthly"
 
 
+class DownsampleEnum(str, Enum):
+    lttb = "lttb"
+    minmax = "minmax"
+
+
+class ExportFormatEnum(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Applies the weak comparison of RFC 9110 to an If-None-Match header."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag.removeprefix("W/") for tag in candidates)
+
+
+async def analytics_etag(
+    request: Request,
+    response: Response,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Answers conditional GETs on analytics endpoints from the user's data watermark.
+
+    The ETag hashes the user's transaction watermark (row count and latest
+    ``updated_at``), the path and query parameters, and the current date.
+    The windows these endpoints aggregate are whole days ending today (see
+    ``day_window``), so for a given date and watermark the response cannot
+    change. When it matches the client's ``If-None-Match`` the request ends
+    with 304 before any aggregation query runs. The ETag is weak because ``generated_at``
+    differs between otherwise identical responses.
+
+    Args:
+        request (Request): The incoming request.
+        response (Response): The response whose caching headers are set.
+        current_user (dict): The authenticated user's information, injected by Depends.
+        db (AsyncSession): The read-only database session, injected by Depends.
+
+    Raises:
+        HTTPException: With status 304 if the client's copy is still current.
+    """
+    user_id = current_user["user_id"]
+    count, updated_at = await AnalyticsService(db).get_watermark(user_id)
+    key = "|".join([
+        str(user_id), str(count), updated_at.isoformat() if updated_at else "",
+        request.url.path, str(sorted(request.query_params.multi_items())), datetime.now().date().isoformat(),
+    ])
+    etag = f'W/"{hashlib.sha1(key.encode()).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    request.state.response_headers = headers
+
+
+analytics_flight = SingleFlight("analytics")
+
+
+def coalesced(endpoint):
+    """Shares one computation between concurrent identical analytics requests.
+
+    Requests for the same endpoint, user and query parameters that arrive
+    while one is already being computed await that computation's response
+    instead of running the aggregation queries again.
+    """
+    @functools.wraps(endpoint)
+    async def wrapper(**kwargs):
+        params = tuple(sorted(
+            (name, getattr(value, "value", value))
+            for name, value in kwargs.items() if name not in ("current_user", "db")
+        ))
+        key = (endpoint.__name__, kwargs["current_user"]["user_id"], params)
+        return await analytics_flight.do(key, lambda: endpoint(**kwargs))
+    return wrapper
+
+
 router = APIRouter()
 
-@router.get("/overview", response_model=AnalyticsResponse)
+@router.get("/overview", response_model=AnalyticsResponse, dependencies=[Depends(analytics_etag)])
+@fast_json
+@coalesced
 async def get_analytics_overview(
     days: int = 30,
+    approx: bool = False,
     current_user: dict = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Retrieves a comprehensive analytics overview for the current user.
 
+    With ``approx`` the overview is answered from per-month sketches, which
+    keeps windows of thousands of days interactive. Totals stay exact; top
+    categories become estimates, and distinct merchants and expense amount
+    percentiles are added, all with their ``error_bounds``.
+
     Args:
         days (int): The number of days to include in the analytics period.
+        approx (bool): Whether to answer from sketches instead of exact aggregation.
         current_user (dict): The authenticated user's information, injected by Depends.
-        db (AsyncSession): The database session, injected by Depends.
+        db (AsyncSession): The read-only database session, injected by Depends.
 
     Returns:
         AnalyticsResponse: An object containing the analytics overview.
@@ -49,8 +142,25 @@ async def get_analytics_overview(
     
     try:
         user_id = current_user["user_id"]
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=days)
+        start_date, end_date = day_window(days)
+
+        if approx:
+            summary = await analytics_service.get_approximate_summary(user_id, start_date, end_date)
+            income, expenses = summary["total_income"], summary["total_expenses"]
+            return AnalyticsResponse.model_construct(
+                period_days=days,
+                total_income=income,
+                total_expenses=expenses,
+                net_savings=income - expenses,
+                savings_rate=(income - expenses) / income * 100 if income else 0.0,
+                transaction_count=summary["transaction_count"],
+                top_categories=summary["categories"][:5],
+                approximate=True,
+                distinct_merchants=summary["distinct_merchants"],
+                amount_percentiles=summary["amount_percentiles"],
+                error_bounds=summary["error_bounds"],
+                generated_at=datetime.now()
+            )
         
         # Get basic metrics
         total_income = await analytics_service.get_total_income(user_id, start_date, end_date)
@@ -66,7 +176,7 @@ async def get_analytics_overview(
         # Get top spending categories
         top_categories = await analytics_service.get_top_spending_categories(user_id, start_date, end_date)
         
-        return AnalyticsResponse(
+        return AnalyticsResponse.model_construct(
             period_days=days,
             total_income=float(total_income),
             total_expenses=float(total_expenses),
@@ -80,18 +190,61 @@ async def get_analytics_overview(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Analytics calculation failed: {str(e)}")
 
-@router.get("/spending-patterns", response_model=SpendingPatternResponse)
+@router.post("/overview/batch")
+async def get_analytics_overview_batch(
+    request: BatchOverviewRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """Streams the analytics overview of many users as NDJSON, for reporting jobs.
+
+    Replaces one ``/overview`` request per user with a single grouped query
+    per chunk of users. Each line is one user's overview plus its
+    ``user_id``. Requires a token with the "admin" scope.
+
+    Args:
+        request (BatchOverviewRequest): The user ids to report on (all users if omitted) and the period in days.
+        current_user (dict): The authenticated user's information, injected by Depends.
+
+    Returns:
+        StreamingResponse: One JSON overview per line.
+
+    Raises:
+        HTTPException: If the caller is not an admin.
+    """
+    if "admin" not in current_user.get("scopes", []):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin scope required")
+
+    start_date, end_date = day_window(request.days)
+    generated_at = datetime.now().isoformat()
+
+    async def body():
+        async with read_session() as db:
+            overviews = AnalyticsService(db).get_overviews(request.user_ids, start_date, end_date)
+            async for overview in overviews:
+                overview["period_days"] = request.days
+                overview["generated_at"] = generated_at
+                yield orjson.dumps(overview) + b"\n"
+
+    return StreamingResponse(body(), media_type=MEDIA_TYPES["ndjson"])
+
+@router.get("/spending-patterns", response_model=SpendingPatternResponse, dependencies=[Depends(analytics_etag)])
+@fast_json
+@coalesced
 async def get_spending_patterns(
     days: int = 90,
     current_user: dict = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Analyzes the user's spending patterns and identifies trends.
 
+    Reports the mean, range, volatility and p50/p90/p99 of daily spending
+    along with monthly totals. Whole months are answered from cached
+    mergeable summaries, so long windows do not re-read every transaction.
+
     Args:
         days (int): The number of days to include in the analysis period.
         current_user (dict): The authenticated user's information, injected by Depends.
-        db (AsyncSession): The database session, injected by Depends.
+        db (AsyncSession): The read-only database session, injected by Depends.
 
     Returns:
         SpendingPatternResponse: An object containing the spending pattern analysis.
@@ -103,51 +256,38 @@ async def get_spending_patterns(
     
     try:
         user_id = current_user["user_id"]
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=days)
+        start_date, end_date = day_window(days)
         
-        # Get daily spending data
-        daily_spending_raw = await analytics_service.get_daily_spending(user_id, start_date, end_date)
-
-        # Filter out non-numeric data
-        daily_spending = [x for x in daily_spending_raw if isinstance(x, (int, float))]
+        # Daily spending statistics and monthly totals, merged from per-month summaries
+        stats = await analytics_service.get_spending_stats(user_id, start_date, end_date)
         
-        # Calculate patterns
-        avg_daily_spending = np.mean(daily_spending) if daily_spending else 0
-        max_spending_day = np.max(daily_spending) if daily_spending else 0
-        min_spending_day = np.min(daily_spending) if daily_spending else 0
-        spending_volatility = np.std(daily_spending) if len(daily_spending) > 1 else 0
-        
-        # Get monthly trends
-        monthly_trends = await analytics_service.get_monthly_trends(user_id, start_date, end_date)
-        
-        return SpendingPatternResponse(
+        return SpendingPatternResponse.model_construct(
             period_days=days,
-            avg_daily_spending=float(avg_daily_spending),
-            max_spending_day=float(max_spending_day),
-            min_spending_day=float(min_spending_day),
-            spending_volatility=float(spending_volatility),
-            monthly_trends=monthly_trends,
-            generated_at=datetime.now()
+            generated_at=datetime.now(),
+            **stats
         )
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Pattern analysis failed: {str(e)}")
 
-@router.get("/category-analysis", response_model=CategoryAnalysisResponse)
+@router.get("/category-analysis", response_model=CategoryAnalysisResponse, dependencies=[Depends(analytics_etag)])
+@fast_json
+@coalesced
 async def get_category_analysis(
     category: Optional[str] = None,
     days: int = 30,
+    approx: bool = False,
     current_user: dict = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Provides a detailed analysis of spending by category.
 
     Args:
         category (Optional[str]): The specific category to analyze. If None, analyzes all categories.
         days (int): The number of days to include in the analysis period.
+        approx (bool): Whether to estimate from per-month sketches, with ``error_bounds``.
         current_user (dict): The authenticated user's information, injected by Depends.
-        db (AsyncSession): The database session, injected by Depends.
+        db (AsyncSession): The read-only database session, injected by Depends.
 
     Returns:
         CategoryAnalysisResponse: An object containing the category analysis.
@@ -159,9 +299,21 @@ async def get_category_analysis(
     
     try:
         user_id = current_user["user_id"]
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=days)
+        start_date, end_date = day_window(days)
         
+        if approx:
+            estimate = await analytics_service.get_approximate_category_analysis(
+                user_id, start_date, end_date, category
+            )
+            return CategoryAnalysisResponse.model_construct(
+                period_days=days,
+                category=category,
+                analysis_data=estimate["analysis_data"],
+                approximate=True,
+                error_bounds=estimate["error_bounds"],
+                generated_at=datetime.now()
+            )
+
         if category:
             # Analyze specific category
             category_data = await analytics_service.analyze_category(user_id, category, start_date, end_date)
@@ -169,7 +321,7 @@ async def get_category_analysis(
             # Analyze all categories
             category_data = await analytics_service.analyze_all_categories(user_id, start_date, end_date)
         
-        return CategoryAnalysisResponse(
+        return CategoryAnalysisResponse.model_construct(
             period_days=days,
             category=category,
             analysis_data=category_data,
@@ -179,26 +331,38 @@ async def get_category_analysis(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Category analysis failed: {str(e)}")
 
-@router.get("/trends", response_model=TrendAnalysisResponse)
+@router.get("/trends", response_model=TrendAnalysisResponse, dependencies=[Depends(analytics_etag)])
+@fast_json
+@coalesced
 async def get_trend_analysis(
     trend_type: str = "spending",
     period: PeriodEnum = PeriodEnum.monthly,
+    days: int = 365,
+    max_points: Optional[int] = 500,
+    downsample: DownsampleEnum = DownsampleEnum.lttb,
     current_user: dict = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Analyzes financial trends over a specified period.
 
+    Series longer than ``max_points`` are downsampled on the server, so the
+    payload stays the same size however long the history is.
+
     Args:
         trend_type (str): The type of trend to analyze (e.g., "spending").
         period (str): The time period for the analysis (e.g., "daily", "weekly", "monthly").
+        days (int): How far back the series starts.
+        max_points (Optional[int]): The most points to return (at least 3).
+        downsample (DownsampleEnum): "lttb" keeps shape-preserving points; "minmax" returns bucket
+            averages with their min and max.
         current_user (dict): The authenticated user's information, injected by Depends.
-        db (AsyncSession): The database session, injected by Depends.
+        db (AsyncSession): The read-only database session, injected by Depends.
 
     Returns:
         TrendAnalysisResponse: An object containing the trend analysis data.
 
     Raises:
-        HTTPException: If the trend analysis fails.
+        HTTPException: If the parameters are invalid or the trend analysis fails.
     """
     analytics_service = AnalyticsService(db)
     
@@ -209,15 +373,58 @@ async def get_trend_analysis(
         trend_data = await analytics_service.get_trend_analysis(
             user_id=user_id,
             trend_type=trend_type,
-            period=period
+            period=period,
+            days=days,
+            max_points=max_points,
+            downsample=downsample
         )
         
-        return TrendAnalysisResponse(
+        return TrendAnalysisResponse.model_construct(
             trend_type=trend_type,
             period=period,
             trend_data=trend_data,
             generated_at=datetime.now()
         )
         
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Trend analysis failed: {str(e)}")
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Trend analysis failed: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Trend analysis failed: {str(e)}")
+
+@router.get("/export")
+async def export_transactions(
+    format: ExportFormatEnum = ExportFormatEnum.ndjson,
+    compress: bool = False,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Streams the current user's transactions as NDJSON or CSV.
+
+    Rows are read through a server-side cursor and written as they arrive, so
+    memory use stays flat however many transactions the user has. The stream
+    opens its own read-only session because it outlives the endpoint call.
+
+    Args:
+        format (ExportFormatEnum): The output format, "ndjson" or "csv".
+        compress (bool): Whether to gzip the response body.
+        start_date (Optional[datetime]): Only export transactions on or after this date.
+        end_date (Optional[datetime]): Only export transactions on or before this date.
+        current_user (dict): The authenticated user's information, injected by Depends.
+
+    Returns:
+        StreamingResponse: The streamed export.
+    """
+    user_id = current_user["user_id"]
+
+    async def body():
+        async with read_session() as db:
+            async for chunk in TransactionExporter(db).stream(
+                user_id, fmt=format.value, compress=compress, start_date=start_date, end_date=end_date
+            ):
+                yield chunk
+
+    headers = {"Content-Disposition": f'attachment; filename="transactions.{format.value}"'}
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(body(), media_type=MEDIA_TYPES[format.value], headers=headers)
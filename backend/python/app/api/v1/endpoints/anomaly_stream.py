@@ -0,0 +1,95 @@
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+
+from app.core.config import get_settings
+from app.core.stream_tokens import InvalidStreamToken, issue_stream_token, verify_stream_token
+from app.schemas.predictions import StreamTokenResponse
+from app.services.anomaly_feed import TooManyStreams, format_sse, get_anomaly_feed
+from main import get_current_user
+
+# Milliseconds EventSource clients wait before reconnecting
+RECONNECT_DELAY_MS = 3000
+
+router = APIRouter()
+
+@router.post("/token", response_model=StreamTokenResponse)
+async def create_stream_token(current_user: dict = Depends(get_current_user)):
+    """Issues a short-lived token for opening the user's event streams.
+
+    EventSource cannot send an Authorization header, so a browser client
+    calls this with its bearer token and opens
+    ``/stream/anomalies?token=...`` with the result. The token is only
+    checked when a stream is opened; a client whose stream drops after the
+    token has expired fetches a new one before reconnecting.
+
+    Args:
+        current_user (dict): The authenticated user's information, injected by Depends.
+
+    Returns:
+        StreamTokenResponse: The token and the seconds it remains valid for.
+    """
+    ttl = get_settings().STREAM_TOKEN_TTL_SECONDS
+    return StreamTokenResponse(token=issue_stream_token(current_user["user_id"], ttl), expires_in=ttl)
+
+@router.get("/anomalies")
+async def stream_anomalies(
+    token: str = Query(..., description="A stream token from POST /stream/token"),
+    last_event_id: Optional[str] = Header(None)
+):
+    """Pushes the user's anomalies as Server-Sent Events while transactions are ingested.
+
+    The stream is authenticated by a ``token`` query parameter from
+    ``POST /stream/token`` rather than a bearer header, so browsers can
+    open it with EventSource.
+
+    Each ``anomaly`` event carries one anomalous transaction as JSON, in the
+    shape ``GET /predictions/anomalies`` returns, and an id. Reconnecting
+    with that id in ``Last-Event-ID`` (EventSource does this by itself)
+    delivers the events missed in between; when they can no longer be
+    delivered a ``reset`` event asks the client to rescan instead. A
+    comment line is sent whenever the stream has been quiet for the
+    heartbeat interval, and a client too slow to keep up is disconnected
+    so it can resume.
+
+    Args:
+        token (str): The stream token naming the user.
+        last_event_id (Optional[str]): The id of the last event received, when resuming.
+
+    Returns:
+        StreamingResponse: The ``text/event-stream`` of the user's anomalies.
+
+    Raises:
+        HTTPException: 401 if the token is invalid or expired, 429 if the user already
+            has the maximum number of streams open.
+    """
+    try:
+        user_id = verify_stream_token(token)
+    except InvalidStreamToken as e:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(e))
+    feed = get_anomaly_feed()
+    heartbeat = get_settings().ANOMALY_FEED_HEARTBEAT_SECONDS
+    if not feed.can_subscribe(user_id):
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Too many open anomaly streams")
+
+    async def events():
+        try:
+            with feed.subscribe(user_id, last_event_id) as subscription:
+                yield f"retry: {RECONNECT_DELAY_MS}\n\n".encode()
+                while True:
+                    try:
+                        event = await asyncio.wait_for(subscription.queue.get(), heartbeat)
+                    except asyncio.TimeoutError:
+                        yield b": keepalive\n\n"
+                        continue
+                    # The client resumes from the last event it received, so nothing queued is lost
+                    if subscription.overflowed:
+                        return
+                    yield format_sse(feed, event)
+        except TooManyStreams:
+            return
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(events(), media_type="text/event-stream", headers=headers)
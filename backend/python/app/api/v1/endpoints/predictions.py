@@ -0,0 +1,88 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import get_read_db
+from app.models.transaction import TransactionType
+from app.schemas.predictions import (
+    AnomalyDetectionResponse,
+    SpendingPredictionRequest,
+    SpendingPredictionResponse
+)
+from app.services.analytics_service import AnalyticsService
+from app.services.inference_service import get_inference
+from main import get_current_user
+
+router = APIRouter()
+
+@router.post("/spending", response_model=SpendingPredictionResponse)
+async def predict_spending(
+    request: SpendingPredictionRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """Predicts the amount of a transaction with the given features.
+
+    The prediction runs on the inference thread pool, batched with other
+    requests arriving at the same time, so the event loop stays free.
+
+    Args:
+        request (SpendingPredictionRequest): The features of the transaction to predict.
+        current_user (dict): The authenticated user's information, injected by Depends.
+
+    Returns:
+        SpendingPredictionResponse: The predicted amount and its confidence.
+
+    Raises:
+        HTTPException: 504 if the prediction times out, 500 if it fails.
+    """
+    try:
+        result = await get_inference().predict_spending(request.model_dump())
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Spending prediction timed out")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Spending prediction failed: {str(e)}")
+
+    return SpendingPredictionResponse(generated_at=datetime.now(), **result)
+
+@router.get("/anomalies", response_model=AnomalyDetectionResponse)
+async def detect_anomalies(
+    days: int = 90,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Finds unusual expenses in the user's recent history.
+
+    Args:
+        days (int): The number of days of expenses to scan.
+        current_user (dict): The authenticated user's information, injected by Depends.
+        db (AsyncSession): The read-only database session, injected by Depends.
+
+    Returns:
+        AnomalyDetectionResponse: The anomalous transactions with their scores and severity.
+
+    Raises:
+        HTTPException: 504 if the scan times out, 500 if it fails.
+    """
+    analytics_service = AnalyticsService(db)
+    inference = get_inference()
+
+    try:
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=days)
+        transactions = await analytics_service.get_transaction_records(
+            current_user["user_id"], start_date, end_date, transaction_type=TransactionType.EXPENSE
+        )
+        anomalies = await inference.run("detect_anomalies", inference.ai_service.detect_anomalies, transactions)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Anomaly detection timed out")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Anomaly detection failed: {str(e)}")
+
+    return AnomalyDetectionResponse(
+        period_days=days,
+        transactions_scanned=len(transactions),
+        anomalies=anomalies,
+        generated_at=datetime.now()
+    )
@@ -0,0 +1,125 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+from datetime import datetime
+from enum import Enum
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import get_db, get_read_db
+from app.models.transaction import TransactionType
+from app.schemas.transaction import IngestResponse, TransactionPageResponse
+from app.services.anomaly_feed import schedule_anomaly_scan
+from app.services.dedup_service import get_deduplicator
+from app.services.ingest_service import TransactionIngestor, iter_batches, iter_lines
+from app.services.insights_service import get_insights_refresher
+from app.services.listing_service import TransactionLister
+from main import get_current_user
+
+
+class FeedFormatEnum(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+class ConflictEnum(str, Enum):
+    update = "update"
+    skip = "skip"
+
+
+class TransactionTypeEnum(str, Enum):
+    income = "INCOME"
+    expense = "EXPENSE"
+    transfer = "TRANSFER"
+
+
+router = APIRouter()
+
+@router.get("/", response_model=TransactionPageResponse)
+async def list_transactions(
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    category: Optional[str] = None,
+    type: Optional[TransactionTypeEnum] = None,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Lists the current user's transactions, newest first, one page at a time.
+
+    Pages are addressed by an opaque cursor rather than an offset, so fetching
+    a deep page costs the same as fetching the first one. Pass the returned
+    ``next_cursor`` to get the following page; it is null on the last page.
+
+    Args:
+        limit (int): The maximum number of transactions per page.
+        cursor (Optional[str]): The ``next_cursor`` from the previous page.
+        category (Optional[str]): Only list transactions in this category.
+        type (Optional[TransactionTypeEnum]): Only list transactions of this type.
+        current_user (dict): The authenticated user's information, injected by Depends.
+        db (AsyncSession): The read-only database session, injected by Depends.
+
+    Returns:
+        TransactionPageResponse: The page of transactions and the cursor for the next one.
+
+    Raises:
+        HTTPException: If the limit or cursor is invalid.
+    """
+    try:
+        page = await TransactionLister(db).page(
+            current_user["user_id"],
+            limit=limit,
+            cursor=cursor,
+            category=category,
+            transaction_type=TransactionType(type.value) if type else None
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Listing failed: {str(e)}")
+
+    return TransactionPageResponse.model_validate(page)
+
+
+@router.post("/ingest", response_model=IngestResponse)
+async def ingest_transactions(
+    request: Request,
+    format: FeedFormatEnum = FeedFormatEnum.ndjson,
+    on_conflict: ConflictEnum = ConflictEnum.update,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Bulk-loads transactions for the current user from an NDJSON or CSV body.
+
+    The request body is read as a stream and written in batches, so large
+    bank-feed histories never have to fit in memory. Rows whose
+    reference_number already exists are updated or skipped according to
+    ``on_conflict``; invalid rows are rejected and reported without failing
+    the rest of the upload. When rows are written, the user's precomputed
+    insights are queued for a refresh and, if the user is watching their
+    anomaly stream, the written rows are scored and anomalies pushed to it.
+
+    Args:
+        request (Request): The incoming request whose body holds the records.
+        format (FeedFormatEnum): The body format, "ndjson" or "csv" (with a header row).
+        on_conflict (ConflictEnum): Whether existing reference numbers are updated or skipped.
+        current_user (dict): The authenticated user's information, injected by Depends.
+        db (AsyncSession): The database session, injected by Depends.
+
+    Returns:
+        IngestResponse: Counts of received, written and rejected rows and the throughput.
+
+    Raises:
+        HTTPException: If the body cannot be parsed.
+    """
+    ingestor = TransactionIngestor(db, on_conflict=on_conflict.value, dedup=get_deduplicator())
+    started = datetime.utcnow()
+
+    try:
+        report = await ingestor.ingest(
+            iter_batches(iter_lines(request.stream()), fmt=format.value, batch_size=ingestor.batch_size),
+            user_id=current_user["user_id"]
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Ingest failed: {str(e)}")
+
+    if report["written"]:
+        get_insights_refresher().mark_dirty(current_user["user_id"])
+        schedule_anomaly_scan(current_user["user_id"], started)
+
+    return IngestResponse(**report)
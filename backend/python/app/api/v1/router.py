@@ -1,23 +1,48 @@
 """API router for version 1 of the Luminous-MastermindAI API."""
-from fastapi import APIRouter
-from app.api.v1.endpoints import analytics, predictions, ai_insights
+from fastapi import APIRouter, Depends
+from app.api.v1.endpoints import analytics, predictions, ai_insights, anomaly_stream, transactions
+from app.core.admission import admission
+from app.core.query_stats import request_queries
+from app.core.rate_limit import rate_limit
 
-api_router = APIRouter()
+# Every endpoint's SQL statements are sampled into per-endpoint query metrics
+api_router = APIRouter(dependencies=[Depends(request_queries)])
+
+# Rate limits are checked before admission control, so throttled clients never take an admission slot
 
 api_router.include_router(
     analytics.router,
     prefix="/analytics",
-    tags=["analytics"]
+    tags=["analytics"],
+    dependencies=[Depends(rate_limit("analytics")), Depends(admission("heavy"))]
+)
+
+api_router.include_router(
+    transactions.router,
+    prefix="/transactions",
+    tags=["transactions"],
+    dependencies=[Depends(rate_limit("transactions")), Depends(admission("cheap"))]
 )
 
 api_router.include_router(
     predictions.router,
     prefix="/predictions",
-    tags=["predictions"]
+    tags=["predictions"],
+    dependencies=[Depends(rate_limit("predictions")), Depends(admission("heavy"))]
 )
 
 api_router.include_router(
     ai_insights.router,
     prefix="/insights",
-    tags=["ai-insights"]
-)
\ No newline at end of file
+    tags=["ai-insights"],
+    dependencies=[Depends(rate_limit("insights")), Depends(admission("heavy"))]
+)
+
+# Streams stay open indefinitely, so they are rate limited but not admission controlled:
+# holding an admission slot for a connection's lifetime would starve the heavy routes
+api_router.include_router(
+    anomaly_stream.router,
+    prefix="/stream",
+    tags=["stream"],
+    dependencies=[Depends(rate_limit("stream"))]
+)
@@ -0,0 +1,31 @@
+"""Command-line runner for the nightly batch pipeline.
+
+Runs the pipeline once, resuming the previous run if it did not finish,
+and prints its per-stage throughput report.
+
+Usage:
+    python -m app.cli.batch
+    python -m app.cli.batch --workers 8 --retrain
+"""
+import argparse
+import asyncio
+import json
+import sys
+
+from app.services.batch_pipeline import run_nightly_batch
+
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score new transactions and refresh insights for every user.")
+    parser.add_argument("--workers", type=int, help="Scoring processes (defaults to BATCH_PIPELINE_WORKERS)")
+    parser.add_argument("--retrain", action=argparse.BooleanOptionalAction, default=None,
+                        help="Retrain the anomaly detector first (defaults to BATCH_PIPELINE_RETRAIN)")
+    args = parser.parse_args(argv)
+
+    report = await run_nightly_batch(workers=args.workers, retrain=args.retrain)
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,59 @@
+"""Command-line bulk loader for bank-feed transaction files.
+
+Usage:
+    python -m app.cli.ingest feed.ndjson
+    python -m app.cli.ingest history.csv --format csv --on-conflict skip
+"""
+import argparse
+import asyncio
+import json
+import sys
+
+from app.core.database import dispose_engine, get_sessionmaker
+from app.services.dedup_service import get_deduplicator
+from app.services.ingest_service import TransactionIngestor, iter_batches, iter_lines
+
+
+async def read_chunks(path: str, size: int = 1 << 20):
+    """Yields a file (or stdin for "-") in binary chunks."""
+    stream = sys.stdin.buffer if path == "-" else open(path, "rb")
+    try:
+        while chunk := stream.read(size):
+            yield chunk
+    finally:
+        if stream is not sys.stdin.buffer:
+            stream.close()
+
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk-load transactions into DATABASE_URL.")
+    parser.add_argument("path", help="NDJSON or CSV file to load, or - for stdin")
+    parser.add_argument("--format", choices=["ndjson", "csv"], help="Input format (defaults to the file extension)")
+    parser.add_argument("--on-conflict", choices=["update", "skip"], default="update",
+                        help="What to do with reference numbers that already exist")
+    parser.add_argument("--user-id", type=int, help="Assign every row to this user instead of the user_id column")
+    parser.add_argument("--batch-size", type=int, default=10000, help="Rows validated and committed per batch")
+    args = parser.parse_args(argv)
+    fmt = args.format or ("csv" if args.path.endswith(".csv") else "ndjson")
+
+    dedup = get_deduplicator()
+    try:
+        async with get_sessionmaker()() as session:
+            await dedup.load_or_rebuild(session)
+            ingestor = TransactionIngestor(
+                session, on_conflict=args.on_conflict, batch_size=args.batch_size, dedup=dedup
+            )
+            report = await ingestor.ingest(
+                iter_batches(iter_lines(read_chunks(args.path)), fmt=fmt, batch_size=args.batch_size),
+                user_id=args.user_id
+            )
+        dedup.save()
+    finally:
+        await dispose_engine()
+
+    print(json.dumps(report, indent=2))
+    return 0 if report["rejected"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
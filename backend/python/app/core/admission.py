@@ -0,0 +1,208 @@
+"""Admission control for expensive endpoints.
+
+Each route gets a concurrency limit and a bounded wait queue sized by its
+budget, "cheap" or "heavy". Requests beyond the limit wait in FIFO order;
+when the queue is full, or the expected wait already exceeds the deadline,
+the request is shed at once with ``503 Service Unavailable`` and a
+``Retry-After`` hint instead of joining a backlog that will time out
+anyway. Admitted requests therefore keep roughly their unloaded latency
+while the excess fails fast.
+"""
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict
+
+from fastapi import HTTPException, Request, status
+from prometheus_client import Counter, Gauge, Histogram
+
+from app.core.config import get_settings
+
+# Metrics
+ADMISSION_IN_FLIGHT = Gauge('admission_in_flight', 'Requests currently admitted per route', ['route'])
+ADMISSION_QUEUE_DEPTH = Gauge('admission_queue_depth', 'Requests waiting for admission per route', ['route'])
+ADMISSION_WAIT = Histogram(
+    'admission_wait_seconds',
+    'Time admitted requests spent queued',
+    ['route'],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+ADMISSION_REJECTED = Counter(
+    'admission_rejected_total',
+    'Requests shed by admission control',
+    ['route', 'reason']  # queue_full, deadline (expected wait too long) or timeout (waited too long)
+)
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed instead of admitted.
+
+    Args:
+        reason (str): Why the request was shed.
+        retry_after (float): Seconds after which a retry is likely to be admitted.
+    """
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f"Overloaded ({reason}), retry after {retry_after:.1f}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """A concurrency limit with a bounded FIFO wait queue and a wait deadline.
+
+    The expected wait of a newcomer is estimated from the queue length and
+    an exponentially weighted average of how long admitted requests hold
+    their slot, so hopeless requests are rejected before they wait at all.
+
+    Args:
+        name (str): The route label used in metrics.
+        limit (int): The number of requests admitted at once.
+        max_queue (int): The number of requests allowed to wait.
+        max_wait (float): Seconds a request may wait for a slot.
+    """
+
+    def __init__(self, name: str, limit: int, max_queue: int, max_wait: float):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.in_flight = 0
+        self.service_time = 0.0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._in_flight_gauge = ADMISSION_IN_FLIGHT.labels(route=name)
+        self._queue_gauge = ADMISSION_QUEUE_DEPTH.labels(route=name)
+
+    def expected_wait(self) -> float:
+        """Estimates how long a request arriving now would wait for a slot."""
+        return (len(self._waiters) + 1) * self.service_time / self.limit
+
+    async def acquire(self):
+        """Waits for a slot.
+
+        Raises:
+            Overloaded: If the queue is full, the expected wait exceeds ``max_wait``,
+                or no slot frees up within ``max_wait``.
+        """
+        if self.in_flight < self.limit and not self._waiters:
+            self._admitted()
+            return
+        if len(self._waiters) >= self.max_queue:
+            raise self._reject("queue_full")
+        if self.expected_wait() > self.max_wait:
+            raise self._reject("deadline")
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        self._queue_gauge.inc()
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.max_wait)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as the wait ended; pass it on
+                self._release_slot()
+            else:
+                future.cancel()
+                self._waiters.remove(future)
+                self._queue_gauge.dec()
+            if isinstance(e, asyncio.TimeoutError):
+                raise self._reject("timeout")
+            raise
+        ADMISSION_WAIT.labels(route=self.name).observe(time.perf_counter() - start)
+
+    def release(self, held: float):
+        """Frees a slot held for ``held`` seconds, handing it to the next waiter if any."""
+        self.service_time = held if self.service_time == 0.0 else 0.8 * self.service_time + 0.2 * held
+        self._release_slot()
+
+    @asynccontextmanager
+    async def admit(self) -> AsyncIterator[None]:
+        """Holds a slot for the duration of the block."""
+        await self.acquire()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(time.perf_counter() - start)
+
+    def _admitted(self):
+        self.in_flight += 1
+        self._in_flight_gauge.inc()
+
+    def _release_slot(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            self._queue_gauge.dec()
+            if not waiter.done():
+                # The slot moves to the waiter, so in_flight stays the same
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+        self._in_flight_gauge.dec()
+
+    def _reject(self, reason: str) -> Overloaded:
+        ADMISSION_REJECTED.labels(route=self.name, reason=reason).inc()
+        return Overloaded(reason, max(self.expected_wait(), 1.0))
+
+
+_controllers: Dict[str, AdmissionController] = {}
+
+
+def get_controller(route: str, budget: str) -> AdmissionController:
+    """Returns the route's controller, creating it with the budget's limits on first use.
+
+    Args:
+        route (str): The route template the controller limits.
+        budget (str): "cheap" or "heavy".
+
+    Returns:
+        AdmissionController: The route's controller.
+    """
+    controller = _controllers.get(route)
+    if controller is None:
+        settings = get_settings()
+        if budget == "heavy":
+            limit, queue = settings.ADMISSION_HEAVY_CONCURRENCY, settings.ADMISSION_HEAVY_QUEUE
+        else:
+            limit, queue = settings.ADMISSION_CHEAP_CONCURRENCY, settings.ADMISSION_CHEAP_QUEUE
+        controller = AdmissionController(route, limit, queue, settings.ADMISSION_MAX_WAIT_SECONDS)
+        _controllers[route] = controller
+    return controller
+
+
+def admission(budget: str):
+    """Builds a FastAPI dependency that admits requests to each route under ``budget``.
+
+    Args:
+        budget (str): "cheap" or "heavy"; selects the per-route concurrency and queue limits.
+
+    Returns:
+        Callable: The dependency, which raises ``HTTPException`` 503 with ``Retry-After`` when shedding.
+
+    Raises:
+        ValueError: If the budget is unknown.
+    """
+    if budget not in ("cheap", "heavy"):
+        raise ValueError(f"Unknown admission budget: {budget}")
+
+    async def admit(request: Request):
+        route = request.scope.get("route")
+        controller = get_controller(getattr(route, "path", request.url.path), budget)
+        try:
+            await controller.acquire()
+        except Overloaded as e:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, please retry later",
+                headers={"Retry-After": str(math.ceil(e.retry_after))},
+            )
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            controller.release(time.perf_counter() - start)
+
+    return admit
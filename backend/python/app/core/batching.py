@@ -0,0 +1,122 @@
+"""Dynamic micro-batching of concurrent calls into one vectorized call."""
+import asyncio
+import time
+from concurrent.futures import Executor
+from typing import Callable, Generic, List, Optional, Tuple, TypeVar
+
+from prometheus_client import Histogram
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Metrics
+BATCH_SIZE = Histogram(
+    'micro_batch_size',
+    'Items per micro-batch',
+    ['batcher'],
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+)
+BATCH_QUEUE_WAIT = Histogram(
+    'micro_batch_queue_wait_seconds',
+    'Time an item waited before its batch started running in a worker',
+    ['batcher'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+)
+BATCH_DURATION = Histogram(
+    'micro_batch_duration_seconds',
+    'Time spent running a micro-batch',
+    ['batcher'],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+
+
+class MicroBatcher(Generic[T, R]):
+    """Collects concurrent calls and runs them as one batch in a worker thread.
+
+    Items submitted while no batch is pending start a batch that is run
+    after ``max_wait`` seconds or as soon as it holds ``max_batch`` items,
+    whichever comes first. The batch function runs in ``executor`` (the
+    loop's default executor if None), so the event loop keeps serving other
+    requests, and each caller receives the result at its item's position,
+    or the batch's exception. Under light load a call waits at most
+    ``max_wait``; under heavy load batches fill up and the per-call model
+    overhead is paid once per batch.
+
+    Args:
+        fn (Callable[[List[T]], List[R]]): Maps a list of items to a list of results of the same length.
+        name (str): The batcher label used in metrics.
+        max_batch (int): The largest number of items run together.
+        max_wait (float): Seconds the first item of a batch waits for others to join.
+        executor (Optional[Executor]): Where batches run.
+    """
+
+    def __init__(self, fn: Callable[[List[T]], List[R]], name: str, max_batch: int = 64,
+                 max_wait: float = 0.005, executor: Optional[Executor] = None):
+        self.fn = fn
+        self.name = name
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.executor = executor
+        self._pending: List[Tuple[T, asyncio.Future, float]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running: set = set()
+        self._size = BATCH_SIZE.labels(batcher=name)
+        self._queue_wait = BATCH_QUEUE_WAIT.labels(batcher=name)
+        self._duration = BATCH_DURATION.labels(batcher=name)
+
+    async def submit(self, item: T) -> R:
+        """Adds an item to the next batch and waits for its result.
+
+        Args:
+            item (T): The input for one call.
+
+        Returns:
+            R: The batch function's result for this item.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future, time.perf_counter()))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        # Callers that gave up before the batch started are left out
+        batch = [entry for entry in self._pending if not entry[1].done()]
+        self._pending = []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    def _call(self, items: List[T]) -> Tuple[float, List[R]]:
+        # Timed from inside the executor, so queue wait includes any wait for a free worker
+        started = time.perf_counter()
+        try:
+            return started, self.fn(items)
+        finally:
+            self._duration.observe(time.perf_counter() - started)
+
+    async def _run(self, batch: List[Tuple[T, asyncio.Future, float]]):
+        self._size.observe(len(batch))
+        try:
+            started, results = await asyncio.get_running_loop().run_in_executor(
+                self.executor, self._call, [item for item, _, _ in batch]
+            )
+            for _, _, submitted in batch:
+                self._queue_wait.observe(started - submitted)
+            if len(results) != len(batch):
+                raise RuntimeError(f"Batch function returned {len(results)} results for {len(batch)} items")
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for (_, future, _), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
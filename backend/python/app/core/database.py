@@ -0,0 +1,330 @@
+"""Async database engine, connection pool and session management."""
+import asyncio
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator, AsyncIterator, Dict, List, Optional, Tuple
+
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import event, exc, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.core.config import get_settings
+from app.core.query_stats import instrument_engine
+from app.models.transaction import Base
+
+# Metrics
+DB_POOL_WAIT = Histogram(
+    'db_pool_wait_seconds',
+    'Time spent waiting to check out a pooled database connection',
+    ['engine'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+DB_POOL_CHECKOUTS = Counter('db_pool_checkouts_total', 'Total pooled connection checkouts', ['engine'])
+DB_POOL_TIMEOUTS = Counter('db_pool_timeouts_total', 'Checkouts that timed out waiting for a connection', ['engine'])
+DB_POOL_CHECKED_OUT = Gauge('db_pool_checked_out', 'Connections currently checked out of the pool', ['engine'])
+DB_READ_ROUTED = Counter('db_read_sessions_total', 'Read-only sessions routed to each engine', ['engine'])
+DB_REPLICA_LAG = Gauge('db_replica_lag_seconds', 'Last measured replication lag per replica', ['engine'])
+
+# Seconds of replay lag on a PostgreSQL standby; 0 when it has replayed everything it received
+PG_REPLICA_LAG_QUERY = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+# Sync driver names used in DATABASE_URL mapped to their asyncio counterparts
+ASYNC_DRIVERS = {
+    "postgres": "postgresql+asyncpg",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """An asyncio queue pool that reports checkout wait time to Prometheus.
+
+    The pool's ``logging_name`` is used as the ``engine`` metric label, so the
+    label survives ``recreate()`` on dispose or invalidation.
+    """
+
+    def _do_get(self):
+        engine = self.logging_name or "primary"
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            DB_POOL_TIMEOUTS.labels(engine=engine).inc()
+            raise
+        finally:
+            DB_POOL_WAIT.labels(engine=engine).observe(time.perf_counter() - start)
+
+
+def to_async_url(database_url: str):
+    """Converts a sync database URL into one that uses an asyncio driver.
+
+    Args:
+        database_url (str): The configured database URL, e.g. a psycopg2 URL.
+
+    Returns:
+        URL: The URL with its driver swapped for asyncpg or aiosqlite.
+    """
+    url = make_url(database_url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.drivername, url.drivername))
+
+
+def create_engine(database_url: str, name: str = "primary") -> AsyncEngine:
+    """Creates an instrumented async engine for the given database URL.
+
+    Pool sizing, prepared-statement caching and per-request query
+    instrumentation come from the application settings. Set ``DB_STATEMENT_CACHE_SIZE`` to 0 when connecting through a
+    transaction-pooling proxy such as PgBouncer.
+
+    Args:
+        database_url (str): The database URL; sync driver names are converted.
+        name (str): The label used for this engine's pool metrics.
+
+    Returns:
+        AsyncEngine: The configured engine.
+    """
+    settings = get_settings()
+    url = to_async_url(database_url)
+    if url.drivername == "postgresql+asyncpg":
+        url = url.update_query_dict({"prepared_statement_cache_size": str(settings.DB_STATEMENT_CACHE_SIZE)})
+
+    engine = create_async_engine(
+        url,
+        poolclass=InstrumentedAsyncQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=True,
+        pool_logging_name=name,
+        echo=settings.DEBUG,
+    )
+
+    @event.listens_for(engine.sync_engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        DB_POOL_CHECKOUTS.labels(engine=name).inc()
+        DB_POOL_CHECKED_OUT.labels(engine=name).inc()
+
+    @event.listens_for(engine.sync_engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        DB_POOL_CHECKED_OUT.labels(engine=name).dec()
+
+    if settings.DB_QUERY_SAMPLE_RATE > 0:
+        instrument_engine(engine)
+    return engine
+
+
+class ReplicaRouter:
+    """Chooses the engine that serves each read-only session.
+
+    Replicas are probed at most every ``check_interval`` seconds for
+    replication lag and round-trip latency. Reads are spread across replicas
+    whose lag is within ``max_lag`` using the configured strategy, and fall
+    back to the primary when no replica is healthy or none are configured.
+
+    Args:
+        primary (AsyncEngine): The read-write primary engine.
+        replicas (List[AsyncEngine]): The read replica engines.
+        strategy (str): "round_robin" or "least_latency".
+        max_lag (float): The maximum acceptable replication lag in seconds.
+        check_interval (float): Seconds between replica probes.
+    """
+
+    STRATEGIES = ("round_robin", "least_latency")
+
+    def __init__(
+        self,
+        primary: AsyncEngine,
+        replicas: List[AsyncEngine],
+        strategy: str = "round_robin",
+        max_lag: float = 5.0,
+        check_interval: float = 10.0,
+    ):
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Unknown replica strategy: {strategy}")
+        self.primary = primary
+        self.replicas = replicas
+        self.strategy = strategy
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.lag: Dict[AsyncEngine, float] = {engine: 0.0 for engine in replicas}
+        self.latency: Dict[AsyncEngine, float] = {engine: 0.0 for engine in replicas}
+        self._cycle = itertools.cycle(replicas)
+        self._checked_at = float("-inf")
+        self._lock = asyncio.Lock()
+
+    async def _probe(self, engine: AsyncEngine) -> Tuple[float, float]:
+        """Measures a replica's replication lag and round-trip latency.
+
+        Args:
+            engine (AsyncEngine): The replica to probe.
+
+        Returns:
+            Tuple[float, float]: The lag and latency, both in seconds.
+        """
+        start = time.perf_counter()
+        async with engine.connect() as conn:
+            if engine.dialect.name == "postgresql":
+                lag = float((await conn.execute(PG_REPLICA_LAG_QUERY)).scalar() or 0)
+            else:
+                await conn.execute(text("SELECT 1"))
+                lag = 0.0
+        return lag, time.perf_counter() - start
+
+    async def refresh(self):
+        """Probes every replica and records its lag and latency.
+
+        A replica that cannot be reached is treated as infinitely lagged until
+        the next successful probe.
+        """
+        results = await asyncio.gather(*(self._probe(engine) for engine in self.replicas), return_exceptions=True)
+        for engine, result in zip(self.replicas, results):
+            if isinstance(result, BaseException):
+                self.lag[engine] = float("inf")
+            else:
+                lag, latency = result
+                self.lag[engine] = lag
+                # Exponentially weighted so one slow probe does not flip routing
+                previous = self.latency[engine]
+                self.latency[engine] = latency if previous == 0.0 else 0.7 * previous + 0.3 * latency
+            DB_REPLICA_LAG.labels(engine=engine.pool.logging_name).set(self.lag[engine])
+        self._checked_at = time.monotonic()
+
+    async def choose(self) -> AsyncEngine:
+        """Returns the engine that should serve the next read-only session.
+
+        Returns:
+            AsyncEngine: A healthy replica, or the primary as a fallback.
+        """
+        if not self.replicas:
+            return self.primary
+
+        # Only one coroutine probes; the others route on the previous results
+        if time.monotonic() - self._checked_at >= self.check_interval and not self._lock.locked():
+            async with self._lock:
+                if time.monotonic() - self._checked_at >= self.check_interval:
+                    await self.refresh()
+
+        healthy = [engine for engine in self.replicas if self.lag[engine] <= self.max_lag]
+        if not healthy:
+            return self.primary
+        if self.strategy == "least_latency":
+            return min(healthy, key=lambda engine: self.latency[engine])
+        for _ in range(len(self.replicas)):
+            engine = next(self._cycle)
+            if engine in healthy:
+                return engine
+        return self.primary
+
+
+_engine: Optional[AsyncEngine] = None
+_sessionmaker: Optional[async_sessionmaker] = None
+_router: Optional[ReplicaRouter] = None
+
+
+def get_engine() -> AsyncEngine:
+    """Returns the process-wide engine, creating it on first use.
+
+    Returns:
+        AsyncEngine: The engine bound to ``DATABASE_URL``.
+    """
+    global _engine
+    if _engine is None:
+        _engine = create_engine(get_settings().DATABASE_URL)
+    return _engine
+
+
+def get_sessionmaker() -> async_sessionmaker:
+    """Returns the process-wide session factory bound to the engine.
+
+    Returns:
+        async_sessionmaker: A factory producing ``AsyncSession`` objects.
+    """
+    global _sessionmaker
+    if _sessionmaker is None:
+        _sessionmaker = async_sessionmaker(get_engine(), expire_on_commit=False)
+    return _sessionmaker
+
+
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
+    """FastAPI dependency that provides one database session per request.
+
+    The session only checks a connection out of the pool when it first runs a
+    query, and returns it when the request finishes.
+
+    Yields:
+        AsyncSession: The request-scoped database session.
+    """
+    async with get_sessionmaker()() as session:
+        yield session
+
+
+def get_router() -> ReplicaRouter:
+    """Returns the process-wide read router, creating replica engines on first use.
+
+    Returns:
+        ReplicaRouter: The router built from ``DATABASE_REPLICA_URLS``.
+    """
+    global _router
+    if _router is None:
+        settings = get_settings()
+        urls = [url.strip() for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()]
+        _router = ReplicaRouter(
+            get_engine(),
+            [create_engine(url, name=f"replica-{index}") for index, url in enumerate(urls)],
+            strategy=settings.DB_REPLICA_STRATEGY,
+            max_lag=settings.DB_REPLICA_MAX_LAG_SECONDS,
+            check_interval=settings.DB_REPLICA_CHECK_INTERVAL,
+        )
+    return _router
+
+
+@asynccontextmanager
+async def read_session() -> AsyncIterator[AsyncSession]:
+    """Opens a read-only session on the engine chosen by the ``ReplicaRouter``.
+
+    The session must not be used for writes or for reads that need to see
+    writes made elsewhere in the same request.
+
+    Yields:
+        AsyncSession: A session bound to a replica or, as a fallback, the primary.
+    """
+    engine = await get_router().choose()
+    DB_READ_ROUTED.labels(engine=engine.pool.logging_name or "primary").inc()
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
+
+
+async def get_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """FastAPI dependency that provides a read-only session per request.
+
+    Yields:
+        AsyncSession: The request-scoped session from ``read_session``.
+    """
+    async with read_session() as session:
+        yield session
+
+
+async def create_tables():
+    """Creates any missing tables for the ORM models."""
+    async with get_engine().begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+
+async def dispose_engine():
+    """Closes all pooled connections and forgets the process-wide engines."""
+    global _engine, _sessionmaker, _router
+    if _router is not None:
+        for replica in _router.replicas:
+            await replica.dispose()
+    if _engine is not None:
+        await _engine.dispose()
+    _engine = None
+    _sessionmaker = None
+    _router = None
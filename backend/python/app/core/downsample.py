@@ -0,0 +1,92 @@
+"""Vectorized downsampling of time series for charting.
+
+Both methods reduce a series to a fixed number of points in a handful of
+NumPy passes, so the size of a charted payload no longer grows with the
+length of the history behind it.
+"""
+from typing import Dict
+
+import numpy as np
+
+
+def _bucket_bounds(start: int, stop: int, buckets: int) -> np.ndarray:
+    """Splits ``range(start, stop)`` into ``buckets`` contiguous, non-empty runs.
+
+    Returns:
+        np.ndarray: ``buckets + 1`` increasing boundaries from ``start`` to ``stop``.
+    """
+    return np.floor(np.linspace(start, stop, buckets + 1)).astype(np.intp)
+
+
+def lttb(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """Selects the points that best preserve a series' shape (Largest-Triangle-Three-Buckets).
+
+    The first and last points are always kept; the rest are split into
+    ``max_points - 2`` buckets and from each bucket the point forming the
+    largest triangle with its neighbouring buckets is kept. Classic LTTB
+    anchors each triangle on the point chosen in the previous bucket, which
+    makes it sequential; here both neighbours are represented by their
+    bucket averages so every bucket is evaluated at once. Peaks and troughs
+    are kept the same way.
+
+    Args:
+        x (np.ndarray): Increasing x values (for example timestamps).
+        y (np.ndarray): The values at ``x``.
+        max_points (int): The number of points to keep; at least 3.
+
+    Returns:
+        np.ndarray: The sorted indices of the kept points.
+    """
+    n = len(x)
+    if max_points >= n or max_points < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    bounds = _bucket_bounds(1, n - 1, max_points - 2)
+    starts, lengths = bounds[:-1], np.diff(bounds)
+    avg_x = np.add.reduceat(x[1:n - 1], starts - 1) / lengths
+    avg_y = np.add.reduceat(y[1:n - 1], starts - 1) / lengths
+
+    # Anchors: the previous and next buckets' averages, or the fixed end points
+    left_x = np.concatenate([[x[0]], avg_x[:-1]])
+    left_y = np.concatenate([[y[0]], avg_y[:-1]])
+    right_x = np.concatenate([avg_x[1:], [x[-1]]])
+    right_y = np.concatenate([avg_y[1:], [y[-1]]])
+
+    bucket = np.repeat(np.arange(len(starts)), lengths)
+    px, py = x[1:n - 1], y[1:n - 1]
+    area = np.abs(
+        (left_x[bucket] - right_x[bucket]) * (py - left_y[bucket])
+        - (left_x[bucket] - px) * (right_y[bucket] - left_y[bucket])
+    )
+
+    # The first index reaching each bucket's maximum area
+    is_max = area == np.maximum.reduceat(area, starts - 1)[bucket]
+    candidates = np.flatnonzero(is_max)
+    _, first = np.unique(bucket[candidates], return_index=True)
+    return np.concatenate([[0], candidates[first] + 1, [n - 1]])
+
+
+def bucket_min_max_avg(y: np.ndarray, max_points: int) -> Dict[str, np.ndarray]:
+    """Reduces a series to ``max_points`` consecutive buckets.
+
+    Args:
+        y (np.ndarray): The series values.
+        max_points (int): The number of buckets.
+
+    Returns:
+        Dict[str, np.ndarray]: Each bucket's first index (``start``) and its ``min``, ``max`` and ``avg``.
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if max_points >= n:
+        return {"start": np.arange(n), "min": y, "max": y, "avg": y}
+    bounds = _bucket_bounds(0, n, max_points)
+    starts = bounds[:-1]
+    return {
+        "start": starts,
+        "min": np.minimum.reduceat(y, starts),
+        "max": np.maximum.reduceat(y, starts),
+        "avg": np.add.reduceat(y, starts) / np.diff(bounds),
+    }
@@ -0,0 +1,118 @@
+"""HTTP request metrics, recorded by a pure ASGI middleware."""
+import time
+from typing import Dict, Optional, Tuple
+
+from prometheus_client import Counter, Gauge, Histogram
+
+# Metrics
+REQUEST_COUNT = Counter('http_requests_total', 'Total HTTP requests', ['method', 'endpoint', 'status'])
+REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds',
+    'HTTP request duration',
+    ['method', 'endpoint'],
+    # Dense around the 100ms interactive and 500ms analytics latency objectives
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.15, 0.2, 0.3, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0)
+)
+RESPONSE_SIZE = Histogram(
+    'http_response_size_bytes',
+    'HTTP response body size',
+    ['method', 'endpoint'],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+)
+ACTIVE_CONNECTIONS = Gauge('active_connections', 'HTTP requests currently in flight')
+
+# The label for requests that matched no route, so unknown paths cannot grow label cardinality
+UNMATCHED = "<unmatched>"
+
+
+def _trace_id(scope) -> Optional[str]:
+    """Returns the trace id from a W3C ``traceparent`` header, if present."""
+    for name, value in scope["headers"]:
+        if name == b"traceparent":
+            parts = value.decode("latin-1").split("-")
+            return parts[1] if len(parts) >= 4 and len(parts[1]) == 32 else None
+    return None
+
+
+class MetricsMiddleware:
+    """Records count, latency, response size and in-flight HTTP requests.
+
+    Written as plain ASGI rather than ``BaseHTTPMiddleware``, so responses
+    are not buffered or moved to another task. Requests are labelled by
+    route template (``/api/v1/transactions/{id}``, not the raw path) and
+    status once routing has run, by reading the route the router records in
+    the shared scope; plain ASGI apps that are mounted are labelled by
+    their mount path. Label
+    children are cached so a request costs a few dictionary lookups on top
+    of the observations.
+
+    With ``exemplars``, latency observations carry the trace id of a
+    ``traceparent`` header, which links histogram buckets to traces in
+    OpenMetrics scrapes.
+
+    Args:
+        app: The ASGI application to wrap.
+        exemplars (bool): Whether to attach trace-id exemplars to latency observations.
+        exclude_paths (Tuple[str, ...]): Request paths that are not recorded, such as the metrics endpoint.
+    """
+
+    def __init__(self, app, exemplars: bool = False, exclude_paths: Tuple[str, ...] = ("/metrics",)):
+        self.app = app
+        self.exemplars = exemplars
+        self.exclude_paths = exclude_paths
+        self._excluded_prefixes = tuple(path.rstrip("/") + "/" for path in exclude_paths)
+        self._children: Dict[Tuple[str, str], Tuple[Histogram, Histogram]] = {}
+        self._counters: Dict[Tuple[str, str, int], Counter] = {}
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path", "")
+        if scope["type"] != "http" or path in self.exclude_paths or path.startswith(self._excluded_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        root_path = scope.get("root_path", "")
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        ACTIVE_CONNECTIONS.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            ACTIVE_CONNECTIONS.dec()
+            self._record(scope, root_path, status, size, elapsed)
+
+    def _record(self, scope, root_path: str, status: int, size: int, elapsed: float):
+        # Mounts extend root_path, and a mounted app's own router records a route relative to it
+        mount = scope.get("root_path", root_path)[len(root_path):]
+        route = scope.get("route")
+        if route is not None:
+            endpoint = mount + route.path
+        else:
+            endpoint = mount or UNMATCHED
+        method = scope["method"]
+
+        children = self._children.get((method, endpoint))
+        if children is None:
+            children = (REQUEST_DURATION.labels(method=method, endpoint=endpoint),
+                        RESPONSE_SIZE.labels(method=method, endpoint=endpoint))
+            self._children[method, endpoint] = children
+        counter = self._counters.get((method, endpoint, status))
+        if counter is None:
+            counter = REQUEST_COUNT.labels(method=method, endpoint=endpoint, status=str(status))
+            self._counters[method, endpoint, status] = counter
+
+        counter.inc()
+        duration, response_size = children
+        trace_id = _trace_id(scope) if self.exemplars else None
+        duration.observe(elapsed, exemplar={"trace_id": trace_id} if trace_id else None)
+        response_size.observe(size)
@@ -0,0 +1,178 @@
+"""Per-request SQL instrumentation.
+
+Engines created with a non-zero ``DB_QUERY_SAMPLE_RATE`` get cursor-execute
+listeners that add each statement's duration to the ``RequestQueries`` of
+the request being tracked, held in a context variable so concurrent
+requests never see each other's queries. When a request finishes, its query
+count, total database time and slowest statement are observed per endpoint,
+and a statement shape repeated more than ``DB_N_PLUS_ONE_THRESHOLD`` times
+is logged as a likely N+1 pattern.
+
+Requests that are not sampled leave the context variable unset, so each of
+their queries costs the listeners one context variable lookup; with
+sampling off the listeners are not attached at all.
+"""
+import random
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+
+import structlog
+from fastapi import Request
+from prometheus_client import Counter, Histogram
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import get_settings
+
+logger = structlog.get_logger()
+
+# Metrics
+DB_REQUEST_QUERIES = Histogram(
+    'db_request_queries',
+    'SQL statements executed per sampled request',
+    ['endpoint'],
+    buckets=(1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144, 233)
+)
+DB_REQUEST_SECONDS = Histogram(
+    'db_request_seconds',
+    'Total time spent executing SQL per sampled request',
+    ['endpoint'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+DB_REQUEST_SLOWEST_QUERY = Histogram(
+    'db_request_slowest_query_seconds',
+    'Duration of the slowest SQL statement per sampled request',
+    ['endpoint'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+DB_N_PLUS_ONE = Counter(
+    'db_n_plus_one_total',
+    'Sampled requests that repeated one statement shape more than the N+1 threshold',
+    ['endpoint']
+)
+
+# Literals and expanded IN lists vary between otherwise identical statements
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*(?:\?|%s|\$\d+|:\w+)(?:\s*,\s*(?:\?|%s|\$\d+|:\w+))*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """Reduces a SQL statement to its shape, with literals and IN-list lengths removed."""
+    shape = _STRING.sub("?", statement)
+    shape = _NUMBER.sub("?", shape)
+    shape = _PLACEHOLDER_LIST.sub("(?)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+class RequestQueries:
+    """The SQL statements executed on behalf of one request.
+
+    Args:
+        endpoint (str): The route template used as the metric label.
+    """
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.count = 0
+        self.total = 0.0
+        self.slowest = 0.0
+        self.slowest_statement: Optional[str] = None
+        self.statements: Dict[str, int] = {}
+
+    def record(self, statement: str, elapsed: float):
+        """Adds one executed statement and its duration."""
+        self.count += 1
+        self.total += elapsed
+        if elapsed >= self.slowest:
+            self.slowest = elapsed
+            self.slowest_statement = statement
+        self.statements[statement] = self.statements.get(statement, 0) + 1
+
+    def repeated(self, threshold: int) -> Dict[str, int]:
+        """Returns the statement shapes executed more than ``threshold`` times, with their counts."""
+        if self.count <= threshold:
+            return {}
+        shapes: Dict[str, int] = {}
+        for statement, n in self.statements.items():
+            shape = statement_shape(statement)
+            shapes[shape] = shapes.get(shape, 0) + n
+        return {shape: n for shape, n in shapes.items() if n > threshold}
+
+
+_current: ContextVar[Optional[RequestQueries]] = ContextVar("request_queries", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    queries = _current.get()
+    if queries is not None and conn.info.get("query_start"):
+        queries.record(statement, time.perf_counter() - conn.info["query_start"].pop())
+
+
+def instrument_engine(engine: AsyncEngine):
+    """Attaches the per-request query listeners to an engine."""
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+@contextmanager
+def track_queries(endpoint: str, sample_rate: float = 1.0,
+                  n_plus_one_threshold: int = 10) -> Iterator[Optional[RequestQueries]]:
+    """Records the queries run inside the block, for a ``sample_rate`` fraction of calls.
+
+    Args:
+        endpoint (str): The route template used as the metric label.
+        sample_rate (float): The probability that this call is tracked.
+        n_plus_one_threshold (int): Repetitions of one statement shape above which a warning is logged.
+
+    Yields:
+        Optional[RequestQueries]: The tracked queries, or None if this call is not sampled.
+    """
+    if sample_rate <= 0 or (sample_rate < 1 and random.random() >= sample_rate):
+        yield None
+        return
+
+    queries = RequestQueries(endpoint)
+    token = _current.set(queries)
+    try:
+        yield queries
+    finally:
+        _current.reset(token)
+        if queries.count:
+            DB_REQUEST_QUERIES.labels(endpoint=endpoint).observe(queries.count)
+            DB_REQUEST_SECONDS.labels(endpoint=endpoint).observe(queries.total)
+            DB_REQUEST_SLOWEST_QUERY.labels(endpoint=endpoint).observe(queries.slowest)
+        repeated = queries.repeated(n_plus_one_threshold)
+        if repeated:
+            DB_N_PLUS_ONE.labels(endpoint=endpoint).inc()
+            shape, times = max(repeated.items(), key=lambda item: item[1])
+            logger.warning("Repeated SQL statement, possible N+1 query", endpoint=endpoint,
+                           statement=shape, executions=times, total_queries=queries.count,
+                           slowest_statement=queries.slowest_statement)
+
+
+_settings = None
+
+
+async def request_queries(request: Request):
+    """FastAPI dependency that tracks the request's SQL statements for its endpoint.
+
+    Args:
+        request (Request): The incoming request; its route template labels the metrics.
+    """
+    global _settings
+    if _settings is None:
+        _settings = get_settings()
+    route = request.scope.get("route")
+    with track_queries(getattr(route, "path", request.url.path), _settings.DB_QUERY_SAMPLE_RATE,
+                       _settings.DB_N_PLUS_ONE_THRESHOLD):
+        yield
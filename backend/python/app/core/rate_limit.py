@@ -0,0 +1,322 @@
+"""Token-bucket rate limiting per client and route group.
+
+Every request draws one token from a bucket for its credential (the bearer
+token) and one for its client IP, within its route group ("analytics",
+"predictions", ...). A bucket holds up to its limit in tokens and refills
+at limit / period per second, so clients may burst up to the limit and
+are then held to the sustained rate. A request is admitted only if every
+one of its buckets has a token.
+
+Buckets live in Redis when it is reachable, updated by one Lua script per
+request (all of the request's buckets in a single round trip, atomically,
+using the Redis clock), so the limits hold across workers. When Redis is
+unavailable each worker falls back to in-process buckets, which enforce
+the same limits per worker.
+
+Behind a reverse proxy every connection comes from the proxy, so for
+connections from ``RATE_LIMIT_TRUSTED_PROXIES`` the client address is taken
+from ``X-Forwarded-For`` instead: the rightmost address not itself a
+trusted proxy, since entries to its left are whatever the client sent.
+"""
+import hashlib
+import hmac
+import ipaddress
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import structlog
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from prometheus_client import Counter
+
+from app.core.config import get_settings
+
+logger = structlog.get_logger()
+
+# Metrics
+RATE_LIMIT_DECISIONS = Counter(
+    'rate_limit_decisions_total',
+    'Rate limit checks per route group',
+    ['group', 'decision']  # allowed or limited
+)
+RATE_LIMIT_FALLBACKS = Counter('rate_limit_fallbacks_total', 'Checks served in-process because Redis failed')
+
+# Seconds Redis is left alone after a failure before it is tried again
+REDIS_RETRY_INTERVAL = 5.0
+
+# KEYS are bucket keys; ARGV holds each bucket's capacity and refill rate (tokens per millisecond),
+# followed by the cost. Returns whether the request is allowed, the wait in ms and the tokens left.
+TOKEN_BUCKET_SCRIPT = """
+local now = redis.call('TIME')
+local now_ms = tonumber(now[1]) * 1000 + math.floor(tonumber(now[2]) / 1000)
+local cost = tonumber(ARGV[#ARGV])
+local tokens = {}
+local wait_ms = 0
+local remaining = nil
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[2 * i - 1])
+    local rate = tonumber(ARGV[2 * i])
+    local state = redis.call('HMGET', key, 't', 'ts')
+    local t = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now_ms
+    t = math.min(capacity, t + math.max(0, now_ms - ts) * rate)
+    tokens[i] = t
+    if t < cost then
+        wait_ms = math.max(wait_ms, math.ceil((cost - t) / rate))
+    end
+    if remaining == nil or t - cost < remaining then
+        remaining = t - cost
+    end
+end
+local allowed = wait_ms == 0
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[2 * i - 1])
+    local rate = tonumber(ARGV[2 * i])
+    local t = tokens[i]
+    if allowed then
+        t = t - cost
+    end
+    redis.call('HSET', key, 't', tostring(t), 'ts', now_ms)
+    redis.call('PEXPIRE', key, math.ceil(capacity / rate) + 1000)
+end
+return {allowed and 1 or 0, wait_ms, math.floor(math.max(remaining or 0, 0))}
+"""
+
+
+class Limit(NamedTuple):
+    """A bucket's size and refill rate."""
+    capacity: float
+    per_second: float
+
+
+class Decision(NamedTuple):
+    """The outcome of a rate limit check."""
+    allowed: bool
+    retry_after: float
+    remaining: int
+
+
+def parse_networks(spec: str) -> list:
+    """Parses comma-separated addresses and CIDR networks, e.g. "127.0.0.1,172.16.0.0/12".
+
+    Raises:
+        ValueError: If an entry is not an address or network.
+    """
+    return [ipaddress.ip_network(entry.strip(), strict=False) for entry in spec.split(",") if entry.strip()]
+
+
+def parse_limits(spec: str) -> Dict[str, Limit]:
+    """Parses "group=count/seconds" pairs, e.g. "default=120/60,analytics=30/60".
+
+    Raises:
+        ValueError: If an entry is malformed.
+    """
+    limits = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        group, _, rate = entry.partition("=")
+        count, _, seconds = rate.partition("/")
+        if not group or not count or not seconds:
+            raise ValueError(f"Invalid rate limit: {entry}")
+        limits[group.strip()] = Limit(float(count), float(count) / float(seconds))
+    return limits
+
+
+class MemoryBuckets:
+    """Token buckets held in this process.
+
+    Checks run synchronously on the event loop, so a bucket is read and
+    updated without any await in between and needs no lock. The least
+    recently used buckets are dropped beyond ``max_keys``; a dropped bucket
+    simply starts full again.
+
+    Args:
+        max_keys (int): The number of buckets kept.
+    """
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def take(self, buckets: Sequence[Tuple[str, Limit]], cost: float = 1.0) -> Decision:
+        """Draws ``cost`` tokens from every bucket if all of them have enough."""
+        now = time.monotonic()
+        levels, wait, remaining = [], 0.0, math.inf
+        for key, limit in buckets:
+            tokens, updated = self._buckets.get(key, (limit.capacity, now))
+            tokens = min(limit.capacity, tokens + (now - updated) * limit.per_second)
+            levels.append(tokens)
+            if tokens < cost:
+                wait = max(wait, (cost - tokens) / limit.per_second)
+            remaining = min(remaining, tokens - cost)
+
+        allowed = wait == 0.0
+        for (key, _), tokens in zip(buckets, levels):
+            self._buckets[key] = (tokens - cost if allowed else tokens, now)
+            self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return Decision(allowed, wait, int(max(remaining, 0)))
+
+
+class RateLimiter:
+    """Checks requests against their buckets in Redis, or in-process when Redis is unavailable.
+
+    Args:
+        limits (Dict[str, Limit]): Per route group limits; "default" applies to unlisted groups.
+        redis: An asyncio Redis client, or None to keep every bucket in-process.
+        secret (str): Key for hashing client identities into bucket names.
+        ip_multiplier (float): How many times a user's limit one IP address may use,
+            since many users can share an address.
+        trusted_proxies (Sequence): Networks of the reverse proxies whose ``X-Forwarded-For`` is believed.
+    """
+
+    def __init__(self, limits: Dict[str, Limit], redis=None, secret: str = "", ip_multiplier: float = 4.0,
+                 trusted_proxies: Sequence = ()):
+        self.limits = limits
+        self.redis = redis
+        self.secret = secret.encode()
+        self.ip_multiplier = ip_multiplier
+        self.trusted_proxies = list(trusted_proxies)
+        self.memory = MemoryBuckets()
+        self._script = redis.register_script(TOKEN_BUCKET_SCRIPT) if redis is not None else None
+        self._redis_down_until = 0.0
+
+    def _key(self, group: str, kind: str, identity: str) -> str:
+        # Keyed hashes keep tokens and addresses out of Redis and bound the key length
+        digest = hmac.new(self.secret, identity.encode(), hashlib.sha256).hexdigest()[:32]
+        return f"ratelimit:{group}:{kind}:{digest}"
+
+    def _trusted(self, address: str) -> bool:
+        try:
+            ip = ipaddress.ip_address(address)
+        except ValueError:
+            return False
+        return any(ip in network for network in self.trusted_proxies)
+
+    def client_ip(self, peer: Optional[str], forwarded_for: Sequence[str] = ()) -> Optional[str]:
+        """Returns the address a request's IP bucket is keyed by.
+
+        Args:
+            peer (Optional[str]): The address the connection came from.
+            forwarded_for (Sequence[str]): The request's ``X-Forwarded-For`` header values.
+
+        Returns:
+            Optional[str]: The peer, or for a trusted proxy the nearest untrusted forwarded address.
+        """
+        if peer is None or not self._trusted(peer):
+            return peer
+        hops = [hop.strip() for value in forwarded_for for hop in value.split(",") if hop.strip()]
+        for hop in reversed(hops):
+            if not self._trusted(hop):
+                return hop
+        return hops[0] if hops else peer
+
+    def buckets(self, group: str, credential: Optional[str], ip: Optional[str]) -> List[Tuple[str, Limit]]:
+        """Returns the bucket keys and limits a request in ``group`` draws from."""
+        limit = self.limits.get(group) or self.limits["default"]
+        buckets = []
+        if credential:
+            buckets.append((self._key(group, "user", credential), limit))
+        if ip:
+            buckets.append((self._key(group, "ip", ip),
+                            Limit(limit.capacity * self.ip_multiplier, limit.per_second * self.ip_multiplier)))
+        return buckets
+
+    async def check(self, group: str, credential: Optional[str], ip: Optional[str]) -> Decision:
+        """Draws a token for the request from each of its buckets.
+
+        Args:
+            group (str): The route group.
+            credential (Optional[str]): The client's bearer token, if any.
+            ip (Optional[str]): The client's address, if known.
+
+        Returns:
+            Decision: Whether the request may proceed and, if not, when to retry.
+        """
+        buckets = self.buckets(group, credential, ip)
+        if not buckets:
+            return Decision(True, 0.0, 0)
+        if self._script is not None and time.monotonic() >= self._redis_down_until:
+            try:
+                args = [value for _, limit in buckets for value in (limit.capacity, limit.per_second / 1000)]
+                allowed, wait_ms, remaining = await self._script(keys=[key for key, _ in buckets], args=[*args, 1])
+                decision = Decision(bool(allowed), wait_ms / 1000, int(remaining))
+            except Exception as e:
+                self._redis_down_until = time.monotonic() + REDIS_RETRY_INTERVAL
+                logger.warning("Rate limiting in-process, Redis unavailable", error=str(e))
+            else:
+                self._count(group, decision)
+                return decision
+        if self._script is not None:
+            # Only a failing Redis is a fallback; the memory backend keeps buckets in-process by design
+            RATE_LIMIT_FALLBACKS.inc()
+        decision = self.memory.take(buckets)
+        self._count(group, decision)
+        return decision
+
+    @staticmethod
+    def _count(group: str, decision: Decision):
+        RATE_LIMIT_DECISIONS.labels(group=group, decision="allowed" if decision.allowed else "limited").inc()
+
+
+_rate_limiter: Optional[RateLimiter] = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Returns the process-wide rate limiter, creating it on first use.
+
+    Returns:
+        RateLimiter: The limiter configured from ``RATE_LIMITS``, backed by ``REDIS_URL``
+            unless ``RATE_LIMIT_BACKEND`` is "memory".
+
+    Raises:
+        ValueError: If ``RATE_LIMIT_SECRET`` is empty outside debug mode, which would
+            let anyone recompute the bucket names of a token or address.
+    """
+    global _rate_limiter
+    if _rate_limiter is None:
+        settings = get_settings()
+        if not settings.RATE_LIMIT_SECRET and not settings.DEBUG:
+            raise ValueError("RATE_LIMIT_SECRET must be set outside debug mode")
+        redis = None
+        if settings.RATE_LIMIT_BACKEND == "redis" and settings.REDIS_URL:
+            from redis import asyncio as aioredis
+            redis = aioredis.from_url(settings.REDIS_URL, socket_timeout=0.25, socket_connect_timeout=0.25)
+        _rate_limiter = RateLimiter(parse_limits(settings.RATE_LIMITS), redis, settings.RATE_LIMIT_SECRET,
+                                    settings.RATE_LIMIT_IP_MULTIPLIER,
+                                    parse_networks(settings.RATE_LIMIT_TRUSTED_PROXIES))
+    return _rate_limiter
+
+
+_bearer = HTTPBearer(auto_error=False)
+
+
+def rate_limit(group: str):
+    """Builds a FastAPI dependency that applies ``group``'s limits to each request.
+
+    The credential bucket is keyed by the bearer token itself rather than
+    its claims: the check runs before the token is verified, and keying by
+    an unverified user id would let a forged token drain someone else's
+    budget.
+
+    Args:
+        group (str): The route group whose limit applies.
+
+    Returns:
+        Callable: The dependency, which raises ``HTTPException`` 429 with ``Retry-After`` when limited.
+    """
+    async def check(request: Request, credentials: Optional[HTTPAuthorizationCredentials] = Depends(_bearer)):
+        limiter = get_rate_limiter()
+        ip = limiter.client_ip(request.client.host if request.client else None,
+                               request.headers.getlist("x-forwarded-for"))
+        decision = await limiter.check(group, credentials.credentials if credentials else None, ip)
+        if not decision.allowed:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Rate limit exceeded",
+                headers={"Retry-After": str(max(1, math.ceil(decision.retry_after)))},
+            )
+
+    return check
@@ -0,0 +1,64 @@
+import functools
+import inspect
+from decimal import Decimal
+from typing import Any
+
+import numpy as np
+import orjson
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from starlette.responses import Response
+
+
+def _default(obj: Any) -> Any:
+    """Converts the values orjson does not handle itself."""
+    if isinstance(obj, BaseModel):
+        return dict(obj)
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class FastJSONResponse(JSONResponse):
+    """A JSON response rendered with orjson.
+
+    Pydantic models are written field by field without being validated or
+    dumped again, and datetimes, enums, NumPy arrays and scalars and
+    Decimals are encoded directly, so service output goes to bytes in a
+    single pass.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(
+            content, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        )
+
+
+def fast_json(endpoint):
+    """Returns an endpoint's model as a ``FastJSONResponse``, bypassing response_model serialization.
+
+    FastAPI validates and re-serializes whatever an endpoint returns against
+    its ``response_model`` unless it is already a Response; this wraps the
+    result so that work is skipped, while the ``response_model`` still
+    documents the schema. Headers that dependencies put in
+    ``request.state.response_headers`` are applied to the response, since
+    FastAPI does not copy them onto a returned Response. Called directly,
+    outside a request, the endpoint's own return value is passed through.
+    """
+    @functools.wraps(endpoint)
+    async def wrapper(*args, request: Request = None, **kwargs):
+        result = await endpoint(*args, **kwargs)
+        if request is None or isinstance(result, Response):
+            return result
+        return FastJSONResponse(result, headers=getattr(request.state, "response_headers", None))
+
+    # Ask FastAPI to inject the request alongside the endpoint's own parameters
+    signature = inspect.signature(endpoint)
+    wrapper.__signature__ = signature.replace(parameters=[
+        inspect.Parameter("request", inspect.Parameter.KEYWORD_ONLY, annotation=Request),
+        *[p.replace(kind=inspect.Parameter.KEYWORD_ONLY) for p in signature.parameters.values()],
+    ])
+    return wrapper
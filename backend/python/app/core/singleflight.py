@@ -0,0 +1,89 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from prometheus_client import Counter, Gauge
+
+# Metrics
+SINGLEFLIGHT_CALLS = Counter(
+    'singleflight_calls_total',
+    'Calls through a single-flight group',
+    ['group', 'role']  # leader: ran the computation; follower: awaited a leader's result
+)
+SINGLEFLIGHT_IN_FLIGHT = Gauge(
+    'singleflight_in_flight',
+    'Distinct computations currently running in a single-flight group',
+    ['group']
+)
+
+
+class LeaderCancelled(Exception):
+    """Raised to followers when the call computing their shared result was cancelled."""
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one computation.
+
+    The first caller for a key (the leader) runs the computation; callers
+    arriving while it is in flight (followers) await the leader's result or
+    exception instead of starting their own. Nothing is cached: once the
+    leader finishes, the next call for the key computes afresh. State is
+    per process, so each worker coalesces its own requests.
+
+    If the leader is cancelled, for example because its client disconnected,
+    its followers are not failed: one of them takes over as the new leader.
+
+    Args:
+        name (str): The group name used in metric labels.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Runs ``fn`` for ``key`` unless an identical call is already in flight.
+
+        Args:
+            key (Hashable): Identifies calls whose results are interchangeable.
+            fn (Callable[[], Awaitable[Any]]): Produces the result when this call leads.
+
+        Returns:
+            Any: The result of ``fn``, from this call or the in-flight one.
+        """
+        # Counted once, by the role the call starts in, even if it later takes over from a cancelled leader
+        role = "follower" if key in self._calls else "leader"
+        SINGLEFLIGHT_CALLS.labels(group=self.name, role=role).inc()
+        while True:
+            future = self._calls.get(key)
+            if future is None:
+                return await self._lead(key, fn)
+            try:
+                # Shielded so a cancelled follower does not cancel everyone else's result
+                return await asyncio.shield(future)
+            except LeaderCancelled:
+                continue
+
+    async def _lead(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        SINGLEFLIGHT_IN_FLIGHT.labels(group=self.name).inc()
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            self._fail(future, LeaderCancelled())
+            raise
+        except BaseException as e:
+            self._fail(future, e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
+            SINGLEFLIGHT_IN_FLIGHT.labels(group=self.name).dec()
+
+    @staticmethod
+    def _fail(future: asyncio.Future, error: BaseException):
+        future.set_exception(error)
+        # Mark the exception as retrieved so a call without followers does not log it
+        future.exception()
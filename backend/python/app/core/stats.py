@@ -0,0 +1,306 @@
+"""Mergeable streaming summaries.
+
+Each summary can be updated with batches of values, merged with another
+summary of the same kind, and round-tripped through a JSON-friendly dict, so
+partial results (for example one per user per month) can be stored and
+combined later without revisiting the raw data.
+"""
+import base64
+import math
+from typing import Any, Dict, Iterable
+
+import numpy as np
+import pandas as pd
+
+
+def _pack(values: np.ndarray) -> str:
+    """Encodes a float array as base64 of its float64 bytes, far smaller than a list of floats."""
+    return base64.b64encode(np.ascontiguousarray(values, dtype=np.float64).tobytes()).decode()
+
+
+def _unpack(data: str) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(data), dtype=np.float64).copy()
+
+
+class RunningMoments:
+    """Count, mean, variance and range of a stream, via Welford's algorithm.
+
+    Batches are reduced with NumPy and folded in with Chan et al.'s pairwise
+    update, which is also how two summaries are merged, so the result does
+    not depend on how the stream was split.
+    """
+
+    def __init__(self, count: int = 0, mean: float = 0.0, m2: float = 0.0,
+                 minimum: float = math.inf, maximum: float = -math.inf):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+        self.min = minimum
+        self.max = maximum
+
+    def update(self, values: Iterable[float]) -> "RunningMoments":
+        """Adds a batch of values."""
+        values = np.asarray(values, dtype=float)
+        if values.size:
+            mean = float(values.mean())
+            self._combine(values.size, mean, float(((values - mean) ** 2).sum()),
+                          float(values.min()), float(values.max()))
+        return self
+
+    def merge(self, other: "RunningMoments") -> "RunningMoments":
+        """Folds another summary into this one."""
+        if other.count:
+            self._combine(other.count, other.mean, other.m2, other.min, other.max)
+        return self
+
+    def _combine(self, count: int, mean: float, m2: float, minimum: float, maximum: float):
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta ** 2 * self.count * count / total
+        self.count = total
+        self.min = min(self.min, minimum)
+        self.max = max(self.max, maximum)
+
+    @property
+    def variance(self) -> float:
+        """The population variance, or 0 for fewer than two values."""
+        return self.m2 / self.count if self.count > 1 else 0.0
+
+    @property
+    def std(self) -> float:
+        """The population standard deviation, matching ``np.std``."""
+        return math.sqrt(self.variance)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"count": self.count, "mean": self.mean, "m2": self.m2,
+                "min": self.min if self.count else None, "max": self.max if self.count else None}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RunningMoments":
+        if not data["count"]:
+            return cls()
+        return cls(data["count"], data["mean"], data["m2"], data["min"], data["max"])
+
+
+class TDigest:
+    """Approximate quantiles of a stream using a merging t-digest.
+
+    Values are kept as weighted centroids. Compression sorts the centroids
+    and groups neighbours whose cumulative rank falls in the same unit of
+    the arcsine scale function, so clusters stay tiny near the tails and
+    p99 stays accurate while the digest holds at most about
+    ``compression / 2`` centroids. The whole step is a handful of NumPy
+    operations.
+
+    Args:
+        compression (float): Controls the size/accuracy trade-off; larger keeps more centroids.
+    """
+
+    def __init__(self, compression: float = 200):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.min = math.inf
+        self.max = -math.inf
+
+    @property
+    def count(self) -> float:
+        return float(self.weights.sum())
+
+    def update(self, values: Iterable[float]) -> "TDigest":
+        """Adds a batch of values."""
+        values = np.asarray(values, dtype=float)
+        if values.size:
+            self.min = min(self.min, float(values.min()))
+            self.max = max(self.max, float(values.max()))
+            self._compress(np.concatenate([self.means, values]),
+                           np.concatenate([self.weights, np.ones(values.size)]))
+        return self
+
+    def merge(self, other: "TDigest") -> "TDigest":
+        """Folds another digest into this one."""
+        if other.weights.size:
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+            self._compress(np.concatenate([self.means, other.means]),
+                           np.concatenate([self.weights, other.weights]))
+        return self
+
+    def _compress(self, means: np.ndarray, weights: np.ndarray):
+        order = np.argsort(means, kind="stable")
+        means, weights = means[order], weights[order]
+        cumulative = np.cumsum(weights)
+        q_left = (cumulative - weights) / cumulative[-1]
+        k = np.floor(self.compression / (2 * math.pi) * np.arcsin(2 * q_left - 1))
+        starts = np.flatnonzero(np.diff(k, prepend=k[0] - 1))
+        self.weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / self.weights
+
+    def quantile(self, q: float) -> float:
+        """Estimates the value at quantile ``q`` (0 to 1), or 0 for an empty digest."""
+        if not self.weights.size:
+            return 0.0
+        if self.weights.size == 1:
+            return float(self.means[0])
+        # Each centroid's mean sits at the midpoint of the ranks it covers
+        total = self.weights.sum()
+        centres = (np.cumsum(self.weights) - self.weights / 2) / total
+        ranks = np.concatenate([[0.0], centres, [1.0]])
+        points = np.concatenate([[self.min], self.means, [self.max]])
+        return float(np.interp(q, ranks, points))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "compression": self.compression,
+            "means": _pack(self.means),
+            "weights": _pack(self.weights),
+            "min": self.min if self.weights.size else None,
+            "max": self.max if self.weights.size else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TDigest":
+        digest = cls(data["compression"])
+        if data["means"]:
+            digest.means = _unpack(data["means"])
+            digest.weights = _unpack(data["weights"])
+            digest.min, digest.max = data["min"], data["max"]
+        return digest
+
+
+def _hash64(keys: Iterable[str]) -> np.ndarray:
+    """Hashes keys to uint64 with pandas' vectorized SipHash."""
+    return pd.util.hash_array(np.asarray(list(keys), dtype=object), hash_key="trancendos-stats")
+
+
+class CountMinSketch:
+    """Approximate per-key sums in fixed space.
+
+    Each key adds its weight to one counter in each of ``depth`` rows and is
+    estimated by the smallest of those counters, so estimates never
+    undercount and, with probability ``1 - exp(-depth)``, overcount by at
+    most ``e / width`` of the total weight. Sketches with the same shape are
+    merged by adding their counters.
+
+    Args:
+        width (int): Counters per row; sets the error bound.
+        depth (int): Number of rows; sets the confidence of the bound.
+    """
+
+    def __init__(self, width: int = 256, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self.counts = np.zeros((depth, width))
+
+    def _columns(self, keys: Iterable[str]) -> np.ndarray:
+        h = _hash64(keys)
+        h1, h2 = h & np.uint64(0xFFFFFFFF), (h >> np.uint64(32)) | np.uint64(1)
+        rows = np.arange(self.depth, dtype=np.uint64)[:, None]
+        return ((h1[None, :] + rows * h2[None, :]) % np.uint64(self.width)).astype(np.intp)
+
+    @property
+    def total(self) -> float:
+        return float(self.counts[0].sum())
+
+    @property
+    def error_bound(self) -> float:
+        """The absolute overcount bound, ``e / width`` times the total weight."""
+        return math.e / self.width * self.total
+
+    @property
+    def confidence(self) -> float:
+        """The probability that an estimate is within ``error_bound``."""
+        return 1 - math.exp(-self.depth)
+
+    def update(self, keys: Iterable[str], weights: Iterable[float]) -> "CountMinSketch":
+        """Adds each key's weight."""
+        weights = np.asarray(weights, dtype=float)
+        if weights.size:
+            columns = self._columns(keys)
+            for row in range(self.depth):
+                np.add.at(self.counts[row], columns[row], weights)
+        return self
+
+    def estimate(self, keys: Iterable[str]) -> np.ndarray:
+        """Estimates the summed weight of each key."""
+        keys = list(keys)
+        if not keys:
+            return np.empty(0)
+        return self.counts[np.arange(self.depth)[:, None], self._columns(keys)].min(axis=0)
+
+    def merge(self, other: "CountMinSketch") -> "CountMinSketch":
+        """Adds another sketch of the same shape into this one."""
+        self.counts += other.counts
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"width": self.width, "depth": self.depth, "counts": _pack(self.counts)}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CountMinSketch":
+        sketch = cls(data["width"], data["depth"])
+        sketch.counts = _unpack(data["counts"]).reshape(sketch.depth, sketch.width)
+        return sketch
+
+
+class HyperLogLog:
+    """Approximate count of distinct keys in fixed space.
+
+    Keys are hashed once; the top ``precision`` bits pick a register and the
+    position of the first set bit in the remaining bits is kept as the
+    register's maximum. The relative standard error is ``1.04 / sqrt(m)``
+    for ``m = 2 ** precision`` registers, and sketches merge by taking the
+    register-wise maximum.
+
+    Args:
+        precision (int): log2 of the number of registers.
+    """
+
+    # Rank bits are kept within float64's exact integer range
+    RANK_BITS = 52
+
+    def __init__(self, precision: int = 11):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    @property
+    def relative_error(self) -> float:
+        """The relative standard error of ``count``."""
+        return 1.04 / math.sqrt(self.registers.size)
+
+    def update(self, keys: Iterable[str]) -> "HyperLogLog":
+        """Adds a batch of keys."""
+        h = _hash64(keys)
+        if h.size:
+            index = (h >> np.uint64(64 - self.precision)).astype(np.intp)
+            rest = (h & np.uint64((1 << self.RANK_BITS) - 1)).astype(float)
+            bit_length = np.where(rest > 0, np.floor(np.log2(np.maximum(rest, 1))) + 1, 0)
+            rank = (self.RANK_BITS - bit_length + 1).astype(np.uint8)
+            np.maximum.at(self.registers, index, rank)
+        return self
+
+    def count(self) -> float:
+        """Estimates the number of distinct keys added."""
+        m = self.registers.size
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.exp2(-self.registers.astype(float)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # Linear counting is more accurate while many registers are empty
+            return m * math.log(m / zeros)
+        return float(estimate)
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        """Folds another sketch of the same precision into this one."""
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"precision": self.precision, "registers": base64.b64encode(self.registers.tobytes()).decode()}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "HyperLogLog":
+        sketch = cls(data["precision"])
+        sketch.registers = np.frombuffer(base64.b64decode(data["registers"]), dtype=np.uint8).copy()
+        return sketch
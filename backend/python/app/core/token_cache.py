@@ -0,0 +1,228 @@
+"""Cache of verified access-token payloads."""
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from contextlib import suppress
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+import structlog
+from prometheus_client import Counter, Gauge
+
+from app.core.config import get_settings
+
+logger = structlog.get_logger()
+
+# Metrics
+TOKEN_CACHE_LOOKUPS = Counter(
+    'auth_token_cache_lookups_total',
+    'Verified-token cache lookups',
+    ['result']  # hit, miss, expired or stale (revocations since the entry was cached)
+)
+TOKEN_CACHE_SIZE = Gauge('auth_token_cache_entries', 'Verified token payloads currently cached')
+# Resolved once, since a hit should cost little more than the dict lookup
+_HITS = TOKEN_CACHE_LOOKUPS.labels(result="hit")
+
+
+class TokenRevoked(Exception):
+    """Raised when a token, or every token of its subject, has been revoked."""
+
+
+class VerifiedTokenCache:
+    """Bounded LRU cache of verified token payloads, each kept until its token's ``exp``.
+
+    Entries are keyed by a SHA-256 of the token, so raw tokens are never
+    held, and a repeat request with the same token costs a hash and a dict
+    lookup instead of a signature verification. Tokens without ``exp`` are
+    verified every time.
+
+    Revocation goes through a denylist of token ids (``jti``) and subjects
+    (``sub``) with a generation counter: every revocation bumps the
+    generation, which turns all earlier entries stale, so their tokens are
+    verified and checked against the denylist again on next use. Other
+    processes revoking tokens are followed by ``SharedRevocations``, which
+    calls ``sync`` with the generation and denylist shared in Redis.
+
+    Args:
+        max_size (int): The maximum number of cached payloads.
+        max_ttl (float): Seconds an entry may be served from cache, even if its token lives longer.
+    """
+
+    def __init__(self, max_size: int = 10000, max_ttl: float = 300.0):
+        self.max_size = max_size
+        self.max_ttl = max_ttl
+        self.generation = 0
+        self.revoked_ids: Set[str] = set()
+        self.revoked_subjects: Set[str] = set()
+        self._entries: "OrderedDict[bytes, Tuple[Dict[str, Any], float, int]]" = OrderedDict()
+
+    def get_or_verify(self, token: str, verify: Callable[[str], Dict[str, Any]]) -> Dict[str, Any]:
+        """Returns the token's payload from cache, verifying it on a miss.
+
+        Args:
+            token (str): The bearer token.
+            verify (Callable[[str], Dict[str, Any]]): Verifies a token's signature and claims,
+                returning its payload or raising.
+
+        Returns:
+            Dict[str, Any]: The verified payload.
+
+        Raises:
+            TokenRevoked: If the token or its subject is on the denylist.
+        """
+        key = hashlib.sha256(token.encode()).digest()
+        entry = self._entries.get(key)
+        now = time.time()
+        if entry is not None:
+            payload, expires_at, generation = entry
+            if generation == self.generation and now < expires_at:
+                self._entries.move_to_end(key)
+                _HITS.inc()
+                return payload
+            del self._entries[key]
+            TOKEN_CACHE_SIZE.set(len(self._entries))
+            TOKEN_CACHE_LOOKUPS.labels(result="stale" if generation != self.generation else "expired").inc()
+        else:
+            TOKEN_CACHE_LOOKUPS.labels(result="miss").inc()
+
+        payload = verify(token)
+        if payload.get("jti") in self.revoked_ids or payload.get("sub") in self.revoked_subjects:
+            raise TokenRevoked("Token has been revoked")
+        if payload.get("exp") is not None:
+            self._entries[key] = (payload, min(float(payload["exp"]), now + self.max_ttl), self.generation)
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            TOKEN_CACHE_SIZE.set(len(self._entries))
+        return payload
+
+    def revoke(self, jti: Optional[str] = None, subject: Optional[str] = None):
+        """Denylists a token id and/or every token of a subject, invalidating cached payloads."""
+        if jti is not None:
+            self.revoked_ids.add(jti)
+        if subject is not None:
+            self.revoked_subjects.add(subject)
+        self.generation += 1
+
+    def sync(self, generation: int, revoked_ids: Set[str], revoked_subjects: Set[str]):
+        """Adopts a denylist shared with other processes if its generation differs from ours."""
+        if generation != self.generation:
+            self.revoked_ids = set(revoked_ids)
+            self.revoked_subjects = set(revoked_subjects)
+            self.generation = generation
+
+    def clear(self):
+        """Drops every cached payload."""
+        self._entries.clear()
+        TOKEN_CACHE_SIZE.set(0)
+
+
+class SharedRevocations:
+    """Keeps a token cache's denylist in step with the one shared by every process in Redis.
+
+    Revocations add to two Redis sets and then increment a generation
+    counter, so a process that reads the new generation also finds the
+    entries behind it. Each process polls the generation and, when it
+    differs from its cache's, reads the sets and adopts them with
+    ``VerifiedTokenCache.sync``; a revocation thus reaches every process
+    within one poll interval.
+
+    Args:
+        cache (VerifiedTokenCache): The cache kept in step.
+        redis: An asyncio Redis client.
+        interval (float): Seconds between polls of the shared generation.
+    """
+
+    GENERATION_KEY = "auth:revocations:generation"
+    IDS_KEY = "auth:revocations:ids"
+    SUBJECTS_KEY = "auth:revocations:subjects"
+
+    def __init__(self, cache: VerifiedTokenCache, redis, interval: float = 1.0):
+        self.cache = cache
+        self.redis = redis
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def revoke(self, jti: Optional[str] = None, subject: Optional[str] = None):
+        """Denylists a token id and/or every token of a subject in every process."""
+        if jti is not None:
+            await self.redis.sadd(self.IDS_KEY, jti)
+        if subject is not None:
+            await self.redis.sadd(self.SUBJECTS_KEY, subject)
+        await self.redis.incr(self.GENERATION_KEY)
+        await self.pull()
+
+    async def pull(self):
+        """Adopts the shared denylist if its generation differs from the cache's."""
+        generation = int(await self.redis.get(self.GENERATION_KEY) or 0)
+        if generation == self.cache.generation:
+            return
+        ids = await self.redis.smembers(self.IDS_KEY)
+        subjects = await self.redis.smembers(self.SUBJECTS_KEY)
+        self.cache.sync(generation, {_decode(v) for v in ids}, {_decode(v) for v in subjects})
+
+    async def run(self):
+        """Polls the shared generation every interval until stopped."""
+        while True:
+            try:
+                await self.pull()
+            except Exception as e:
+                logger.warning("Revocation sync failed", error=str(e))
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        """Starts the background polling loop."""
+        if self._task is None:
+            self._task = asyncio.ensure_future(self.run())
+
+    async def stop(self):
+        """Stops the background polling loop."""
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+
+def _decode(value) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+_token_cache: Optional[VerifiedTokenCache] = None
+_shared_revocations: Optional[SharedRevocations] = None
+
+
+def get_token_cache() -> VerifiedTokenCache:
+    """Returns the process-wide verified-token cache, creating it on first use.
+
+    Returns:
+        VerifiedTokenCache: The cache sized from ``AUTH_CACHE_SIZE`` and ``AUTH_CACHE_MAX_TTL_SECONDS``.
+    """
+    global _token_cache
+    if _token_cache is None:
+        settings = get_settings()
+        _token_cache = VerifiedTokenCache(settings.AUTH_CACHE_SIZE, settings.AUTH_CACHE_MAX_TTL_SECONDS)
+    return _token_cache
+
+
+def get_shared_revocations() -> SharedRevocations:
+    """Returns the process-wide revocation sync, creating it on first use.
+
+    Returns:
+        SharedRevocations: The sync of ``get_token_cache()`` with Redis at ``REDIS_URL``,
+            polling every ``AUTH_REVOCATION_SYNC_SECONDS``.
+    """
+    global _shared_revocations
+    if _shared_revocations is None:
+        settings = get_settings()
+        from redis import asyncio as aioredis
+        _shared_revocations = SharedRevocations(get_token_cache(), aioredis.from_url(settings.REDIS_URL),
+                                                settings.AUTH_REVOCATION_SYNC_SECONDS)
+    return _shared_revocations
+
+
+async def shutdown_shared_revocations():
+    """Stops the polling loop and forgets the process-wide revocation sync."""
+    global _shared_revocations
+    if _shared_revocations is not None:
+        await _shared_revocations.stop()
+    _shared_revocations = None
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Numeric, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, DateTime, Numeric, Float, ForeignKey, Enum, Index, LargeBinary
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -44,6 +44,54 @@ class Transaction(Base):
     # Relationships
     user = relationship("User", back_populates="transactions")
 
+    # Serves per-user listings and keyset pagination ordered by (transaction_date, id),
+    # and the per-user max(updated_at) watermark behind the analytics ETags
+    __table_args__ = (
+        Index("ix_transactions_user_date_id", "user_id", "transaction_date", "id"),
+        Index("ix_transactions_user_updated", "user_id", "updated_at"),
+    )
+
+class TransactionAnomaly(Base):
+    """An expense the nightly batch flagged as anomalous.
+
+    Attributes:
+        transaction_id (int): The flagged transaction.
+        user_id (int): The user the transaction belongs to.
+        anomaly_score (float): The detector's score; the lower, the more unusual.
+        severity (str): "high" or "medium".
+        run_id (str): The batch run that flagged the transaction.
+        detected_at (datetime): When the transaction was flagged.
+    """
+    __tablename__ = "transaction_anomalies"
+
+    transaction_id = Column(Integer, ForeignKey("transactions.id"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    anomaly_score = Column(Float, nullable=False)
+    severity = Column(String(10), nullable=False)
+    run_id = Column(String(32), nullable=False)
+    detected_at = Column(DateTime, default=datetime.utcnow)
+
+class MonthStats(Base):
+    """A user's precomputed per-month analytics state, persisted by the nightly batch.
+
+    Attributes:
+        user_id (int): The user the state describes.
+        kind (str): "summary" (daily spending moments) or "sketch" (approximate analytics sketches).
+        month (str): The calendar month, "YYYY-MM".
+        state (bytes): The serialized state.
+        watermark_count (int): The user's transaction count when the state was computed.
+        watermark_updated_at (datetime): The user's latest ``updated_at`` when the state was computed.
+    """
+    __tablename__ = "month_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    kind = Column(String(10), primary_key=True)
+    month = Column(String(7), primary_key=True)
+    state = Column(LargeBinary, nullable=False)
+    watermark_count = Column(Integer, nullable=False)
+    watermark_updated_at = Column(DateTime)
+
+
 class User(Base):
     """Represents a user of the application.
 
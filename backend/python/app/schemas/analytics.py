@@ -10,14 +10,25 @@ class AnalyticsResponse(BaseModel):
     savings_rate: float
     transaction_count: int
     top_categories: List[Dict[str, Any]]
+    approximate: bool = False
+    distinct_merchants: Optional[int] = None
+    amount_percentiles: Optional[Dict[str, float]] = None
+    error_bounds: Optional[Dict[str, float]] = None
     generated_at: datetime
 
+class BatchOverviewRequest(BaseModel):
+    user_ids: Optional[List[int]] = None
+    days: int = 30
+
 class SpendingPatternResponse(BaseModel):
     period_days: int
     avg_daily_spending: float
     max_spending_day: float
     min_spending_day: float
     spending_volatility: float
+    p50_daily_spending: float = 0.0
+    p90_daily_spending: float = 0.0
+    p99_daily_spending: float = 0.0
     monthly_trends: Dict[str, Any]
     generated_at: datetime
 
@@ -25,6 +36,8 @@ class CategoryAnalysisResponse(BaseModel):
     period_days: int
     category: Optional[str]
     analysis_data: Dict[str, Any]
+    approximate: bool = False
+    error_bounds: Optional[Dict[str, float]] = None
     generated_at: datetime
 
 class TrendAnalysisResponse(BaseModel):
@@ -0,0 +1,39 @@
+from pydantic import BaseModel
+from typing import List, Dict, Any, Optional
+from datetime import datetime
+
+class SpendingPredictionRequest(BaseModel):
+    day_of_week: int = 0
+    day_of_month: int = 1
+    month: int = 1
+    hour: int = 12
+    category_encoded: int = 0
+    rolling_mean_7d: float = 0.0
+    rolling_std_7d: float = 0.0
+
+class SpendingPredictionResponse(BaseModel):
+    success: bool
+    predicted_amount: Optional[float] = None
+    confidence: Optional[float] = None
+    message: str
+    generated_at: datetime
+
+class AnomalyDetectionResponse(BaseModel):
+    period_days: int
+    transactions_scanned: int
+    anomalies: List[Dict[str, Any]]
+    generated_at: datetime
+
+class StreamTokenResponse(BaseModel):
+    token: str
+    expires_in: float
+
+class InsightsResponse(BaseModel):
+    period_days: int
+    spending_trends: List[Dict[str, Any]]
+    savings_opportunities: List[Dict[str, Any]]
+    budget_recommendations: List[Dict[str, Any]]
+    risk_alerts: List[Dict[str, Any]]
+    computed_at: datetime
+    stale: bool
+    generated_at: datetime
@@ -0,0 +1,32 @@
+from pydantic import BaseModel, ConfigDict
+from typing import List, Dict, Any, Optional
+from datetime import datetime
+from decimal import Decimal
+
+from app.models.transaction import TransactionType
+
+class IngestResponse(BaseModel):
+    received: int
+    written: int
+    rejected: int
+    duplicates: int = 0
+    errors: List[Dict[str, Any]]
+    elapsed_seconds: float
+    rows_per_second: float
+
+class TransactionResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    amount: Decimal
+    description: Optional[str]
+    type: TransactionType
+    category: Optional[str]
+    transaction_date: Optional[datetime]
+    reference_number: Optional[str]
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+
+class TransactionPageResponse(BaseModel):
+    items: List[TransactionResponse]
+    next_cursor: Optional[str]
@@ -15,12 +15,16 @@ class AIService:
     to analyze financial data, predict future spending, and identify unusual transactions.
     """
     
-    def __init__(self):
-        """Initializes the AIService, loading pre-trained models if available."""
+    def __init__(self, model_path: str = "./models"):
+        """Initializes the AIService, loading pre-trained models if available.
+
+        Args:
+            model_path (str): The directory models are loaded from and saved to.
+        """
         self.spending_model = None
         self.anomaly_detector = None
         self.scaler = StandardScaler()
-        self.model_path = "./models"
+        self.model_path = model_path
         
         # Create models directory if it doesn't exist
         os.makedirs(self.model_path, exist_ok=True)
@@ -153,6 +157,19 @@ class AIService:
             "message": "Spending predictor trained successfully"
         }
     
+    @staticmethod
+    def _spending_vector(features: Dict[str, Any]) -> List[float]:
+        """Orders a prediction request's features as the spending model expects them."""
+        return [
+            features.get('day_of_week', 0),
+            features.get('day_of_month', 1),
+            features.get('month', 1),
+            features.get('hour', 12),
+            features.get('category_encoded', 0),
+            features.get('rolling_mean_7d', 0),
+            features.get('rolling_std_7d', 0)
+        ]
+
     def predict_spending(self, features: Dict[str, Any]) -> Dict[str, Any]:
         """Predicts a future spending amount based on a given set of features.
 
@@ -168,15 +185,7 @@ class AIService:
         
         try:
             # Prepare feature vector
-            feature_vector = np.array([[
-                features.get('day_of_week', 0),
-                features.get('day_of_month', 1),
-                features.get('month', 1),
-                features.get('hour', 12),
-                features.get('category_encoded', 0),
-                features.get('rolling_mean_7d', 0),
-                features.get('rolling_std_7d', 0)
-            ]])
+            feature_vector = np.array([self._spending_vector(features)])
             
             # Scale features
             feature_vector_scaled = self.scaler.transform(feature_vector)
@@ -202,6 +211,45 @@ class AIService:
                 "message": f"Prediction failed: {str(e)}"
             }
     
+    def predict_spending_batch(self, features_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Predicts spending for many feature sets with one pass over the model.
+
+        Equivalent to calling ``predict_spending`` for each feature set, but
+        the features are scaled together and each tree predicts the whole
+        batch once, instead of once per request.
+
+        Args:
+            features_list (List[Dict[str, Any]]): One dictionary of features per prediction.
+
+        Returns:
+            List[Dict[str, Any]]: One prediction result per feature set, in order.
+        """
+        if not self.spending_model:
+            return [{"success": False, "message": "Model not trained"} for _ in features_list]
+        if not features_list:
+            return []
+
+        try:
+            feature_matrix = self.scaler.transform(np.array([self._spending_vector(f) for f in features_list]))
+
+            # A forest's prediction is the mean of its trees', whose spread gives the confidence
+            tree_predictions = np.stack([tree.predict(feature_matrix) for tree in self.spending_model.estimators_])
+            predictions = tree_predictions.mean(axis=0)
+            confidences = 1 / (1 + tree_predictions.std(axis=0))
+
+            return [
+                {
+                    "success": True,
+                    "predicted_amount": float(prediction),
+                    "confidence": float(confidence),
+                    "message": "Prediction generated successfully"
+                }
+                for prediction, confidence in zip(predictions, confidences)
+            ]
+
+        except Exception as e:
+            return [{"success": False, "message": f"Prediction failed: {str(e)}"} for _ in features_list]
+
     def train_anomaly_detector(self, transactions: List[Dict]) -> Dict[str, Any]:
         """Trains a model to detect anomalous or fraudulent transactions.
 
@@ -289,18 +337,108 @@ class AIService:
         results = []
         for idx, (score, is_anomaly) in enumerate(zip(anomaly_scores, anomalies)):
             if is_anomaly == -1:  # Anomaly detected
-                transaction = transactions[idx]
-                results.append({
-                    "transaction_id": transaction.get('id'),
-                    "amount": transaction.get('amount'),
-                    "description": transaction.get('description'),
-                    "category": transaction.get('category'),
-                    "transaction_date": transaction.get('transaction_date'),
-                    "anomaly_score": float(score),
-                    "severity": "high" if score < -0.5 else "medium"
-                })
+                results.append(self._anomaly(transactions[idx], score))
         
         return results
+
+    @staticmethod
+    def _anomaly(transaction: Dict, score: float) -> Dict[str, Any]:
+        """Describes a transaction the detector flagged."""
+        return {
+            "transaction_id": transaction.get('id'),
+            "amount": transaction.get('amount'),
+            "description": transaction.get('description'),
+            "category": transaction.get('category'),
+            "transaction_date": transaction.get('transaction_date'),
+            "anomaly_score": float(score),
+            "severity": "high" if score < -0.5 else "medium"
+        }
+
+    def prepare_features_by_user(self, transactions_by_user: Dict[Any, List[Dict]]) -> pd.DataFrame:
+        """Builds the features of many users' transactions in one frame.
+
+        Equivalent to ``prepare_features`` on each user's transactions: rolling
+        statistics and category codes are still computed within each user, but
+        as grouped operations over one frame instead of one frame per user.
+
+        Args:
+            transactions_by_user (Dict[Any, List[Dict]]): Each user's transactions.
+
+        Returns:
+            pd.DataFrame: The features, sorted by user and date, with a ``user_index`` column giving
+                the user's position in ``transactions_by_user``. The index is each transaction's
+                position in the users' transaction lists concatenated in that order.
+        """
+        counts = [len(transactions) for transactions in transactions_by_user.values()]
+        if not sum(counts):
+            return pd.DataFrame()
+
+        df = pd.DataFrame([t for transactions in transactions_by_user.values() for t in transactions])
+        df['user_index'] = np.repeat(np.arange(len(counts)), counts)
+
+        df['transaction_date'] = pd.to_datetime(df['transaction_date'])
+        df['day_of_week'] = df['transaction_date'].dt.dayofweek
+        df['day_of_month'] = df['transaction_date'].dt.day
+        df['month'] = df['transaction_date'].dt.month
+        df['hour'] = df['transaction_date'].dt.hour
+
+        # A stable sort keeps each user's rows together and in date order
+        df = df.sort_values(['user_index', 'transaction_date'], kind='mergesort')
+        rolling = df.groupby('user_index', sort=False)['amount'].rolling(window=7, min_periods=1)
+        df['rolling_mean_7d'] = rolling.mean().reset_index(level=0, drop=True)
+        df['rolling_std_7d'] = rolling.std().reset_index(level=0, drop=True).fillna(0)
+
+        # Each user numbers their categories in order of first appearance, as prepare_features does
+        category = df['category'].fillna('unknown')
+        first_seen = ~pd.DataFrame({'user': df['user_index'], 'category': category}).duplicated()
+        codes = (first_seen.astype(int).groupby(df['user_index']).cumsum() - 1).where(first_seen)
+        df['category_encoded'] = codes.groupby([df['user_index'], category]).transform('first').astype(int)
+
+        return df
+
+    def detect_anomalies_batch(self, transactions_by_user: Dict[Any, List[Dict]]) -> Dict[Any, List[Dict[str, Any]]]:
+        """Detects anomalous transactions for many users with one pass over the model.
+
+        Equivalent to calling ``detect_anomalies`` for each user, but the
+        features of all users are built together, stacked into one matrix and
+        scored with a single model call, so small users do not each pay for
+        a DataFrame and a model call of their own.
+
+        Args:
+            transactions_by_user (Dict[Any, List[Dict]]): Each user's transactions to scan.
+
+        Returns:
+            Dict[Any, List[Dict[str, Any]]]: Each user's anomalous transactions, shaped as
+                ``detect_anomalies`` returns them; users without any map to an empty list.
+        """
+        results = {user_id: [] for user_id in transactions_by_user}
+        if not self.anomaly_detector:
+            return results
+
+        df = self.prepare_features_by_user(transactions_by_user)
+        if df.empty:
+            return results
+
+        feature_columns = [
+            'amount', 'day_of_week', 'day_of_month', 'month', 'hour',
+            'category_encoded', 'rolling_mean_7d', 'rolling_std_7d'
+        ]
+
+        X_scaled = self.scaler.transform(df[feature_columns].fillna(0))
+
+        # IsolationForest.predict flags exactly the rows whose decision score is negative,
+        # so the scores alone decide which rows are anomalies
+        scores = self.anomaly_detector.decision_function(X_scaled)
+
+        users = list(transactions_by_user)
+        transactions = [t for user_transactions in transactions_by_user.values() for t in user_transactions]
+        user_index = df['user_index'].to_numpy()
+        positions = df.index.to_numpy()
+        for row in np.flatnonzero(np.asarray(scores) < 0):
+            user_id = users[user_index[row]]
+            results[user_id].append(self._anomaly(transactions[positions[row]], scores[row]))
+
+        return results
     
     def generate_insights(self, transactions: List[Dict]) -> Dict[str, Any]:
         """Generates AI-powered financial insights from a user's transaction history.
@@ -1,3 +1,942 @@
+import functools
+import zlib
+from collections import OrderedDict
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence
+
+import numpy as np
+import orjson
+import pandas as pd
+from sqlalchemy import BigInteger, cast, delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.downsample import bucket_min_max_avg, lttb
+from app.core.stats import CountMinSketch, HyperLogLog, RunningMoments, TDigest
+from app.models.transaction import MonthStats, Transaction, TransactionType, User
+
+# pandas resample rules for the trend periods exposed by the API; periods are
+# labelled by their first day (weeks start on Monday), see get_trend_analysis
+PERIOD_RULES = {"daily": "D", "weekly": "W-MON", "monthly": "MS"}
+
+# Users aggregated per query by the batch overview
+OVERVIEW_CHUNK_SIZE = 1000
+
+# Users whose per-month state is kept in memory, and the most bytes of state kept, per kind of state
+STATS_CACHE_USERS = 10000
+STATS_CACHE_BYTES = 256 * 1024 * 1024
+
+# Amounts are aggregated as integer cents, which is exact and avoids a Decimal
+# object per value; they are converted back only when results are returned.
+# ROUND guards against SQLite storing NUMERIC values as floats.
+AMOUNT_CENTS = cast(func.round(Transaction.amount * 100), BigInteger)
+
+
+def sum_cents(cents=AMOUNT_CENTS):
+    """SUM of cents typed as bigint, since PostgreSQL widens SUM(bigint) to numeric."""
+    return cast(func.coalesce(func.sum(cents), 0), BigInteger)
+
+
+def to_amount(cents):
+    """Converts cents (a scalar or NumPy/pandas values) to currency units as float."""
+    return cents / 100
+
+
+class MonthSummary:
+    """Mergeable summary of one period's daily spending and totals.
+
+    Holds Welford moments and a t-digest over the daily expense totals of
+    days with spending, plus the period's income and expense sums in exact
+    cents, so the spending-pattern figures for any run of months come from
+    merging their summaries.
+    """
+
+    def __init__(self, moments: Optional[RunningMoments] = None, digest: Optional[TDigest] = None,
+                 income_cents: int = 0, expenses_cents: int = 0):
+        self.moments = moments or RunningMoments()
+        self.digest = digest or TDigest()
+        self.income_cents = income_cents
+        self.expenses_cents = expenses_cents
+
+    @classmethod
+    def from_daily(cls, daily: pd.DataFrame) -> "MonthSummary":
+        """Builds a summary from a frame of ``_daily_totals``."""
+        spending = to_amount(daily["expenses"][daily["expenses"] > 0].to_numpy())
+        return cls(RunningMoments().update(spending), TDigest().update(spending),
+                   int(daily["income"].sum()), int(daily["expenses"].sum()))
+
+    def merge(self, other: "MonthSummary") -> "MonthSummary":
+        self.moments.merge(other.moments)
+        self.digest.merge(other.digest)
+        self.income_cents += other.income_cents
+        self.expenses_cents += other.expenses_cents
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"moments": self.moments.to_dict(), "digest": self.digest.to_dict(),
+                "income_cents": self.income_cents, "expenses_cents": self.expenses_cents}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MonthSummary":
+        return cls(RunningMoments.from_dict(data["moments"]), TDigest.from_dict(data["digest"]),
+                   data["income_cents"], data["expenses_cents"])
+
+
+class MonthSketch:
+    """Mergeable sketches of one period's transactions for approximate analytics.
+
+    Income and expense totals (in cents) and counts are exact. Spend (in cents) and transaction
+    counts per category are count-min sketches, with the category names seen
+    kept alongside so top categories can be enumerated; distinct merchants
+    (descriptions) are a HyperLogLog; expense amounts are a t-digest.
+    """
+
+    # Category names kept per sketch; categories beyond this are still counted in totals
+    MAX_CATEGORIES = 256
+
+    def __init__(self):
+        self.income_cents = 0
+        self.expenses_cents = 0
+        self.count = 0
+        self.category_spend = CountMinSketch()
+        self.category_count = CountMinSketch()
+        self.categories: set = set()
+        self.merchants = HyperLogLog()
+        self.amounts = TDigest()
+
+    @classmethod
+    def from_rows(cls, rows: pd.DataFrame) -> "MonthSketch":
+        """Builds a sketch from a frame with type, category, amount_cents and description columns."""
+        sketch = cls()
+        expenses = rows[rows["type"] == TransactionType.EXPENSE.value]
+        categories = expenses["category"].fillna("uncategorized")
+        sketch.income_cents = int(rows.loc[rows["type"] == TransactionType.INCOME.value, "amount_cents"].sum())
+        sketch.expenses_cents = int(expenses["amount_cents"].sum())
+        sketch.count = len(rows)
+        sketch.category_spend.update(categories, expenses["amount_cents"])
+        sketch.category_count.update(categories, np.ones(len(expenses)))
+        sketch.categories = set(categories.unique()[:cls.MAX_CATEGORIES])
+        sketch.merchants.update(rows["description"].dropna())
+        sketch.amounts.update(to_amount(expenses["amount_cents"].to_numpy()))
+        return sketch
+
+    def merge(self, other: "MonthSketch") -> "MonthSketch":
+        self.income_cents += other.income_cents
+        self.expenses_cents += other.expenses_cents
+        self.count += other.count
+        self.category_spend.merge(other.category_spend)
+        self.category_count.merge(other.category_count)
+        self.categories = set(sorted(self.categories | other.categories)[:self.MAX_CATEGORIES])
+        self.merchants.merge(other.merchants)
+        self.amounts.merge(other.amounts)
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "income_cents": self.income_cents, "expenses_cents": self.expenses_cents, "count": self.count,
+            "category_spend": self.category_spend.to_dict(), "category_count": self.category_count.to_dict(),
+            "categories": sorted(self.categories), "merchants": self.merchants.to_dict(),
+            "amounts": self.amounts.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MonthSketch":
+        sketch = cls()
+        sketch.income_cents, sketch.expenses_cents = data["income_cents"], data["expenses_cents"]
+        sketch.count = data["count"]
+        sketch.category_spend = CountMinSketch.from_dict(data["category_spend"])
+        sketch.category_count = CountMinSketch.from_dict(data["category_count"])
+        sketch.categories = set(data["categories"])
+        sketch.merchants = HyperLogLog.from_dict(data["merchants"])
+        sketch.amounts = TDigest.from_dict(data["amounts"])
+        return sketch
+
+
+def _pack_state(state: Dict[str, Any]) -> bytes:
+    """Serializes one month's state compactly; sketches of quiet months are mostly zeros and compress well."""
+    return zlib.compress(orjson.dumps(state))
+
+
+def _unpack_state(packed: bytes) -> Dict[str, Any]:
+    return orjson.loads(zlib.decompress(packed))
+
+
+class MonthStateCache:
+    """Per-user packed month state in memory, bounded by users and by total bytes.
+
+    Args:
+        max_users (int): The most users whose state is kept.
+        max_bytes (int): The most bytes of packed state kept across all users.
+    """
+
+    def __init__(self, max_users: int = STATS_CACHE_USERS, max_bytes: int = STATS_CACHE_BYTES):
+        self.max_users = max_users
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        # user_id -> (watermark, {"YYYY-MM": packed state}, size), least recently used first
+        self._entries: "OrderedDict[Any, tuple]" = OrderedDict()
+
+    def pop(self, user_id) -> Optional[tuple]:
+        """Removes and returns the user's (watermark, packed months), or None."""
+        entry = self._entries.pop(user_id, None)
+        if entry is None:
+            return None
+        self.nbytes -= entry[2]
+        return entry[0], entry[1]
+
+    def put(self, user_id, watermark: tuple, months: Dict[str, bytes]):
+        """Stores the user's packed months, evicting the least recently used users beyond the bounds."""
+        self.pop(user_id)
+        size = sum(len(packed) for packed in months.values())
+        self._entries[user_id] = (watermark, months, size)
+        self.nbytes += size
+        while len(self._entries) > self.max_users or (self.nbytes > self.max_bytes and len(self._entries) > 1):
+            _, (_, _, evicted) = self._entries.popitem(last=False)
+            self.nbytes -= evicted
+
+    def clear(self):
+        self._entries.clear()
+        self.nbytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_month_summaries = MonthStateCache()
+_month_sketches = MonthStateCache()
+_MONTH_CACHES = {"summary": _month_summaries, "sketch": _month_sketches}
+
+
+def day_window(days: int, today: Optional[date] = None) -> tuple:
+    """Returns the window covering the last ``days`` whole days and all of today.
+
+    The bounds depend only on the date, so a result for a given date and
+    data watermark stays valid all day (the analytics ETags rely on this).
+
+    Args:
+        days (int): The number of whole days before today to include.
+        today (Optional[date]): The day the window ends on; defaults to the current date.
+
+    Returns:
+        tuple: The (start, end) datetimes of the window, both inclusive.
+    """
+    today = today or datetime.now().date()
+    return datetime.combine(today - timedelta(days=days), time.min), datetime.combine(today, time.max)
+
+
+def _month_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, 1)
+
+
+def _next_month(value: datetime) -> datetime:
+    return datetime(value.year + value.month // 12, value.month % 12 + 1, 1)
+
+
 class AnalyticsService:
-    def __init__(self, db):
-        pass
+    """Computes financial analytics from a user's stored transactions.
+
+    Every query is read-only, so the service is normally given a session from
+    ``get_read_db`` that may be bound to a read replica rather than the primary.
+    """
+
+    def __init__(self, db: AsyncSession):
+        """Initializes the AnalyticsService.
+
+        Args:
+            db (AsyncSession): The session used to run the analytics queries.
+        """
+        self.db = db
+
+    @staticmethod
+    def _window(user_id, start_date: datetime, end_date: datetime) -> tuple:
+        """Builds the filter for one user's transactions within a date range."""
+        return (
+            Transaction.user_id == user_id,
+            Transaction.transaction_date >= start_date,
+            Transaction.transaction_date <= end_date,
+        )
+
+    async def _sum_by_type(self, user_id, transaction_type: TransactionType,
+                           start_date: datetime, end_date: datetime) -> Decimal:
+        """Sums the amounts of one transaction type within a date range."""
+        stmt = select(sum_cents()).where(
+            *self._window(user_id, start_date, end_date),
+            Transaction.type == transaction_type
+        )
+        return Decimal(int((await self.db.execute(stmt)).scalar())).scaleb(-2)
+
+    async def _daily_totals(self, user_id, start_date: datetime, end_date: datetime) -> pd.DataFrame:
+        """Loads per-day income and expense totals within a date range.
+
+        Returns:
+            pd.DataFrame: A frame indexed by day with int64 ``income`` and ``expenses`` columns in cents.
+        """
+        day = func.date(Transaction.transaction_date)
+        stmt = (
+            select(day, Transaction.type, sum_cents())
+            .where(*self._window(user_id, start_date, end_date))
+            .group_by(day, Transaction.type)
+        )
+        rows = (await self.db.execute(stmt)).all()
+
+        frame = pd.DataFrame(
+            [
+                # SQLite returns DATE() as text while PostgreSQL returns a date
+                (date.fromisoformat(d) if isinstance(d, str) else d, t.value, total)
+                for d, t, total in rows
+            ],
+            columns=["day", "type", "total"],
+        ).astype({"total": np.int64})
+        daily = frame.groupby(["day", "type"])["total"].sum().unstack(fill_value=0)
+        daily.index = pd.to_datetime(daily.index)
+        return pd.DataFrame({
+            "income": daily.get(TransactionType.INCOME.value, 0),
+            "expenses": daily.get(TransactionType.EXPENSE.value, 0),
+        }, index=daily.index, dtype=np.int64).sort_index()
+
+    async def get_watermark(self, user_id) -> tuple:
+        """Returns a cheap fingerprint of the user's stored transactions.
+
+        The row count and latest ``updated_at`` change whenever a transaction
+        is inserted, updated or deleted, and both are answered from indexes,
+        so callers can tell whether any analytics result could have changed
+        without running the aggregations.
+
+        Returns:
+            tuple: The (row count, latest updated_at) of the user's transactions.
+        """
+        stmt = select(func.count(Transaction.id), func.max(Transaction.updated_at)).where(
+            Transaction.user_id == user_id
+        )
+        count, updated_at = (await self.db.execute(stmt)).one()
+        return count, updated_at
+
+    async def get_total_income(self, user_id, start_date: datetime, end_date: datetime) -> Decimal:
+        """Returns the user's total income within the date range."""
+        return await self._sum_by_type(user_id, TransactionType.INCOME, start_date, end_date)
+
+    async def get_total_expenses(self, user_id, start_date: datetime, end_date: datetime) -> Decimal:
+        """Returns the user's total expenses within the date range."""
+        return await self._sum_by_type(user_id, TransactionType.EXPENSE, start_date, end_date)
+
+    async def get_transaction_count(self, user_id, start_date: datetime, end_date: datetime) -> int:
+        """Returns the number of transactions the user made within the date range."""
+        stmt = select(func.count(Transaction.id)).where(*self._window(user_id, start_date, end_date))
+        return int((await self.db.execute(stmt)).scalar())
+
+    async def get_top_spending_categories(self, user_id, start_date: datetime, end_date: datetime,
+                                          limit: Optional[int] = 5) -> List[Dict[str, Any]]:
+        """Returns the categories with the highest expense totals.
+
+        Args:
+            user_id: The user whose transactions are analyzed.
+            start_date (datetime): The start of the analysis window.
+            end_date (datetime): The end of the analysis window.
+            limit (Optional[int]): The maximum number of categories to return, or None for all.
+
+        Returns:
+            List[Dict[str, Any]]: The categories with their total spent and transaction count.
+        """
+        total = sum_cents()
+        stmt = (
+            select(Transaction.category, total, func.count(Transaction.id))
+            .where(*self._window(user_id, start_date, end_date), Transaction.type == TransactionType.EXPENSE)
+            .group_by(Transaction.category)
+            .order_by(total.desc())
+            .limit(limit)
+        )
+        return [
+            {"category": category or "uncategorized", "total_spent": to_amount(spent), "transaction_count": count}
+            for category, spent, count in (await self.db.execute(stmt)).all()
+        ]
+
+    async def get_daily_spending(self, user_id, start_date: datetime, end_date: datetime) -> List[float]:
+        """Returns the total spent on each day with at least one expense."""
+        daily = await self._daily_totals(user_id, start_date, end_date)
+        expenses = daily["expenses"].to_numpy()
+        return to_amount(expenses[expenses > 0]).tolist()
+
+    async def get_transaction_records(self, user_id, start_date: datetime, end_date: datetime,
+                                      transaction_type: Optional[TransactionType] = None) -> List[Dict[str, Any]]:
+        """Loads the user's transactions within the date range in the shape ``AIService`` expects.
+
+        ``AIService`` treats every amount as money spent, so callers feeding
+        it should pass ``TransactionType.EXPENSE`` to leave out income.
+
+        Args:
+            user_id: The user whose transactions are loaded.
+            start_date (datetime): The start of the window.
+            end_date (datetime): The end of the window.
+            transaction_type (Optional[TransactionType]): Only load transactions of this type.
+
+        Returns:
+            List[Dict[str, Any]]: One dict per transaction, oldest first, with the amount as float.
+        """
+        stmt = (
+            select(Transaction.id, AMOUNT_CENTS, Transaction.type, Transaction.description, Transaction.category,
+                   Transaction.transaction_date)
+            .where(*self._window(user_id, start_date, end_date))
+            .order_by(Transaction.transaction_date, Transaction.id)
+        )
+        if transaction_type is not None:
+            stmt = stmt.where(Transaction.type == transaction_type)
+        return [
+            {"id": id_, "amount": to_amount(cents), "type": type_.value, "description": description,
+             "category": category, "transaction_date": transaction_date}
+            for id_, cents, type_, description, category, transaction_date in (await self.db.execute(stmt)).all()
+        ]
+
+    async def get_updated_transaction_ids(self, user_id, since: datetime) -> set:
+        """Returns the ids of the user's transactions inserted or updated at or after ``since``."""
+        stmt = select(Transaction.id).where(Transaction.user_id == user_id, Transaction.updated_at >= since)
+        return set((await self.db.execute(stmt)).scalars().all())
+
+    async def get_transaction_records_for_users(self, user_ids: Sequence[int], start_date: datetime,
+                                                end_date: datetime,
+                                                transaction_type: Optional[TransactionType] = None
+                                                ) -> Dict[int, List[Dict[str, Any]]]:
+        """Loads many users' transactions in one query, like ``get_transaction_records`` per user.
+
+        Args:
+            user_ids (Sequence[int]): The users whose transactions are loaded.
+            start_date (datetime): The start of the window.
+            end_date (datetime): The end of the window.
+            transaction_type (Optional[TransactionType]): Only load transactions of this type.
+
+        Returns:
+            Dict[int, List[Dict[str, Any]]]: Each user's transactions, oldest first; users without any are absent.
+        """
+        stmt = (
+            select(Transaction.user_id, Transaction.id, AMOUNT_CENTS, Transaction.type, Transaction.description,
+                   Transaction.category, Transaction.transaction_date)
+            .where(Transaction.user_id.in_(user_ids), Transaction.transaction_date.between(start_date, end_date))
+            .order_by(Transaction.user_id, Transaction.transaction_date, Transaction.id)
+        )
+        if transaction_type is not None:
+            stmt = stmt.where(Transaction.type == transaction_type)
+        records: Dict[int, List[Dict[str, Any]]] = {}
+        for user_id, id_, cents, type_, description, category, transaction_date in (await self.db.execute(stmt)).all():
+            records.setdefault(user_id, []).append(
+                {"id": id_, "amount": to_amount(cents), "type": type_.value, "description": description,
+                 "category": category, "transaction_date": transaction_date}
+            )
+        return records
+
+    async def get_latest_transaction_records(self, limit: int,
+                                             transaction_type: Optional[TransactionType] = None
+                                             ) -> List[Dict[str, Any]]:
+        """Loads the most recent transactions across all users, e.g. to retrain the models on.
+
+        Args:
+            limit (int): The most transactions loaded.
+            transaction_type (Optional[TransactionType]): Only load transactions of this type.
+
+        Returns:
+            List[Dict[str, Any]]: One dict per transaction, oldest first, as ``get_transaction_records`` returns.
+        """
+        stmt = (
+            select(Transaction.id, AMOUNT_CENTS, Transaction.type, Transaction.description, Transaction.category,
+                   Transaction.transaction_date)
+            .order_by(Transaction.transaction_date.desc(), Transaction.id.desc())
+            .limit(limit)
+        )
+        if transaction_type is not None:
+            stmt = stmt.where(Transaction.type == transaction_type)
+        rows = (await self.db.execute(stmt)).all()
+        return [
+            {"id": id_, "amount": to_amount(cents), "type": type_.value, "description": description,
+             "category": category, "transaction_date": transaction_date}
+            for id_, cents, type_, description, category, transaction_date in reversed(rows)
+        ]
+
+    async def get_updated_transaction_ids_for_users(self, user_ids: Sequence[int], since: datetime) -> Dict[int, set]:
+        """Returns, per user, the ids of their transactions inserted or updated at or after ``since``."""
+        stmt = select(Transaction.user_id, Transaction.id).where(
+            Transaction.user_id.in_(user_ids), Transaction.updated_at >= since
+        )
+        changed: Dict[int, set] = {}
+        for user_id, id_ in (await self.db.execute(stmt)).all():
+            changed.setdefault(user_id, set()).add(id_)
+        return changed
+
+    async def _changed_months(self, user_id, old: tuple, new: tuple) -> Optional[set]:
+        """Finds the months touched since the ``old`` watermark.
+
+        Uses the (user_id, updated_at) index to read only the rows written
+        since then. When those rows do not account for the change in row
+        count, or include updates that may have moved a transaction to
+        another month, the changes cannot be localised.
+
+        Returns:
+            Optional[set]: The changed "YYYY-MM" months, or None if every month must be recomputed.
+        """
+        if old == new:
+            return set()
+        old_count, old_updated_at = old
+        if old_updated_at is None:
+            return None
+        stmt = select(Transaction.transaction_date, Transaction.created_at).where(
+            Transaction.user_id == user_id, Transaction.updated_at > old_updated_at
+        )
+        rows = (await self.db.execute(stmt)).all()
+        only_inserts = all(created_at is not None and created_at > old_updated_at for _, created_at in rows)
+        if not only_inserts or new[0] != old_count + len(rows):
+            return None
+        return {d.strftime("%Y-%m") for d, _ in rows if d is not None}
+
+    async def _load_month_stats(self, kind: str, user_id) -> tuple:
+        """Reads the user's persisted month state of one kind.
+
+        Returns:
+            tuple: The watermark it was computed at and the packed state per month, or (None, {}).
+        """
+        stmt = select(MonthStats.month, MonthStats.state, MonthStats.watermark_count,
+                      MonthStats.watermark_updated_at).where(MonthStats.user_id == user_id, MonthStats.kind == kind)
+        rows = (await self.db.execute(stmt)).all()
+        if not rows:
+            return None, {}
+        # Every row of a user and kind is written together, at one watermark
+        _, _, count, updated_at = rows[0]
+        return (count, updated_at), {month: state for month, state, _, _ in rows}
+
+    async def _cached_months(self, kind: str, user_id, months: List[datetime], build,
+                             persist: bool = False) -> Dict[str, Dict[str, Any]]:
+        """Returns per-month state for whole calendar months, building only stale or missing ones.
+
+        State is looked up in this process's cache, then in what the nightly
+        batch persisted, and validated against the user's watermark, so only
+        months that received new transactions since are re-aggregated.
+
+        Args:
+            kind (str): "summary" or "sketch".
+            user_id: The user whose months are needed.
+            months (List[datetime]): The first instants of the consecutive months needed.
+            build: Coroutine function taking (start, end) and returning state for every month in that range.
+            persist (bool): Whether to write the state back to ``month_stats``; needs a writable session.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: The state of each requested month, keyed "YYYY-MM".
+        """
+        cache = _MONTH_CACHES[kind]
+        watermark = await self.get_watermark(user_id)
+        entry = cache.pop(user_id)
+        cached_watermark, stored = entry if entry is not None else await self._load_month_stats(kind, user_id)
+        if cached_watermark is not None:
+            changed = await self._changed_months(user_id, cached_watermark, watermark)
+            stored = {} if changed is None else {m: v for m, v in stored.items() if m not in changed}
+
+        missing = [m for m in months if m.strftime("%Y-%m") not in stored]
+        if missing:
+            built = await build(missing[0], _next_month(missing[-1]) - timedelta(microseconds=1))
+            stored.update({month: _pack_state(state) for month, state in built.items()})
+
+        if persist and (missing or cached_watermark != watermark):
+            await self.db.execute(delete(MonthStats).where(MonthStats.user_id == user_id, MonthStats.kind == kind))
+            await self.db.execute(insert(MonthStats), [
+                {"user_id": user_id, "kind": kind, "month": month, "state": packed,
+                 "watermark_count": watermark[0], "watermark_updated_at": watermark[1]}
+                for month, packed in stored.items()
+            ])
+        cache.put(user_id, watermark, stored)
+        return {m.strftime("%Y-%m"): _unpack_state(stored[m.strftime("%Y-%m")]) for m in months}
+
+    async def precompute_months(self, user_id, months: int):
+        """Builds and persists the user's summaries and sketches for the last ``months`` whole months.
+
+        Run by the nightly batch on a writable session, which the caller
+        commits, so that the first long-window request after a restart, or
+        on another worker, merges stored months instead of aggregating them.
+
+        Args:
+            user_id: The user whose months are precomputed.
+            months (int): The number of whole calendar months before the current one.
+        """
+        end = _month_start(datetime.now())
+        start = end
+        for _ in range(months):
+            start = _month_start(start - timedelta(days=1))
+        full_months, _ = self._split_window(start, end - timedelta(microseconds=1))
+        if not full_months:
+            return
+        await self._cached_months("summary", user_id, full_months,
+                                  functools.partial(self._build_month_summaries, user_id), persist=True)
+        await self._cached_months("sketch", user_id, full_months,
+                                  functools.partial(self._build_month_sketches, user_id), persist=True)
+
+    @staticmethod
+    def _split_window(start_date: datetime, end_date: datetime) -> tuple:
+        """Splits a window into the whole calendar months it contains and the partial ranges around them.
+
+        Returns:
+            tuple: The first instants of the whole months, and the (start, end) edge ranges.
+        """
+        first_full = start_date if start_date == _month_start(start_date) else _next_month(start_date)
+        full_months = []
+        while _next_month(first_full) - timedelta(microseconds=1) <= end_date:
+            full_months.append(first_full)
+            first_full = _next_month(first_full)
+        if not full_months:
+            return [], [(start_date, end_date)]
+        edges = [(start_date, full_months[0] - timedelta(microseconds=1)), (first_full, end_date)]
+        return full_months, [(a, b) for a, b in edges if a <= b]
+
+    async def _build_month_summaries(self, user_id, start_date: datetime, end_date: datetime) -> Dict[str, Any]:
+        """Aggregates a range into one serialized MonthSummary per month."""
+        daily = await self._daily_totals(user_id, start_date, end_date)
+        built = {}
+        month = _month_start(start_date)
+        while month <= end_date:
+            in_month = daily[(daily.index >= month) & (daily.index < _next_month(month))]
+            built[month.strftime("%Y-%m")] = MonthSummary.from_daily(in_month).to_dict()
+            month = _next_month(month)
+        return built
+
+    async def _build_month_sketches(self, user_id, start_date: datetime, end_date: datetime) -> Dict[str, Any]:
+        """Reads a range's transactions into one serialized MonthSketch per month."""
+        stmt = select(
+            Transaction.transaction_date, Transaction.type, Transaction.category,
+            AMOUNT_CENTS, Transaction.description
+        ).where(*self._window(user_id, start_date, end_date))
+        rows = pd.DataFrame(
+            [(d, t.value, c, a, desc) for d, t, c, a, desc in (await self.db.execute(stmt)).all()],
+            columns=["transaction_date", "type", "category", "amount_cents", "description"],
+        ).astype({"amount_cents": np.int64})
+        # One grouping pass rather than a mask over every row per month
+        by_month = dict(list(rows.groupby(pd.to_datetime(rows["transaction_date"]).dt.to_period("M"))))
+        built = {}
+        month = _month_start(start_date)
+        while month <= end_date:
+            in_month = by_month.get(pd.Period(month, "M"), rows.iloc[:0])
+            built[month.strftime("%Y-%m")] = MonthSketch.from_rows(in_month).to_dict()
+            month = _next_month(month)
+        return built
+
+    async def get_approximate_summary(self, user_id, start_date: datetime, end_date: datetime) -> Dict[str, Any]:
+        """Answers overview and category questions from merged per-month sketches.
+
+        Whole months come from cached sketches and only the partial months at
+        either end read transactions, so the cost depends on the number of
+        months rather than the number of transactions. Income, expense and
+        count totals are exact; per-category figures, distinct merchants and
+        amount percentiles are estimates reported with their error bounds.
+
+        Args:
+            user_id: The user whose transactions are analyzed.
+            start_date (datetime): The start of the analysis window.
+            end_date (datetime): The end of the analysis window.
+
+        Returns:
+            Dict[str, Any]: Totals, every seen category's estimated spend and count (largest
+                first), distinct merchants, expense amount percentiles and ``error_bounds``.
+        """
+        full_months, edges = self._split_window(start_date, end_date)
+        build = functools.partial(self._build_month_sketches, user_id)
+        stored = await self._cached_months("sketch", user_id, full_months, build) if full_months else {}
+        for edge_start, edge_end in edges:
+            stored.update(await build(edge_start, edge_end))
+
+        total = MonthSketch()
+        for state in stored.values():
+            total.merge(MonthSketch.from_dict(state))
+
+        names = sorted(total.categories)
+        spend = total.category_spend.estimate(names)
+        counts = total.category_count.estimate(names)
+        categories = sorted(
+            ({"category": name, "total_spent": to_amount(float(spent)), "transaction_count": int(round(n))}
+             for name, spent, n in zip(names, spend, counts)),
+            key=lambda c: c["total_spent"], reverse=True
+        )
+        return {
+            "total_income": to_amount(total.income_cents),
+            "total_expenses": to_amount(total.expenses_cents),
+            "transaction_count": total.count,
+            "categories": categories,
+            "distinct_merchants": int(round(total.merchants.count())),
+            "amount_percentiles": {
+                "p50": total.amounts.quantile(0.5),
+                "p90": total.amounts.quantile(0.9),
+                "p99": total.amounts.quantile(0.99),
+            },
+            "error_bounds": {
+                # Per-category estimates never undercount and overcount by at most this much
+                "category_spend_abs": to_amount(total.category_spend.error_bound),
+                "category_count_abs": total.category_count.error_bound,
+                "category_confidence": total.category_spend.confidence,
+                "distinct_merchants_rel": total.merchants.relative_error,
+                # t-digest rank error is far below this at the tails; 1% is a conservative bound
+                "amount_percentile_rank": 0.01,
+            },
+        }
+
+    async def get_approximate_category_analysis(self, user_id, start_date: datetime, end_date: datetime,
+                                                category: Optional[str] = None) -> Dict[str, Any]:
+        """Estimates ``analyze_category``/``analyze_all_categories`` from merged sketches.
+
+        Returns:
+            Dict[str, Any]: The ``analysis_data`` in the shape of the exact methods (without
+                ``largest_transaction``) and the ``error_bounds`` of the estimates.
+        """
+        summary = await self.get_approximate_summary(user_id, start_date, end_date)
+        total_expenses = summary["total_expenses"]
+        for c in summary["categories"]:
+            c["average_transaction"] = c["total_spent"] / c["transaction_count"] if c["transaction_count"] else 0.0
+            c["share_of_expenses"] = c["total_spent"] / total_expenses * 100 if total_expenses else 0.0
+
+        if category is None:
+            analysis_data = {"total_expenses": total_expenses, "categories": summary["categories"]}
+        else:
+            match = next((c for c in summary["categories"] if c["category"] == category), None)
+            analysis_data = {
+                "total_spent": match["total_spent"] if match else 0.0,
+                "transaction_count": match["transaction_count"] if match else 0,
+                "average_transaction": match["average_transaction"] if match else 0.0,
+                "share_of_expenses": match["share_of_expenses"] if match else 0.0,
+            }
+        return {"analysis_data": analysis_data, "error_bounds": summary["error_bounds"]}
+
+    async def get_spending_stats(self, user_id, start_date: datetime, end_date: datetime) -> Dict[str, Any]:
+        """Summarizes daily spending and monthly totals from mergeable per-month summaries.
+
+        Whole calendar months inside the window come from the cached
+        per-month summaries; only the partial months at either end are
+        aggregated from the transactions table on every call.
+
+        Args:
+            user_id: The user whose transactions are analyzed.
+            start_date (datetime): The start of the analysis window.
+            end_date (datetime): The end of the analysis window.
+
+        Returns:
+            Dict[str, Any]: Mean, max, min, standard deviation and p50/p90/p99 of
+                daily spending, and income, expenses and net savings per month.
+        """
+        full_months, edges = self._split_window(start_date, end_date)
+        build = functools.partial(self._build_month_summaries, user_id)
+        stored = await self._cached_months("summary", user_id, full_months, build) if full_months else {}
+        for edge_start, edge_end in edges:
+            stored.update(await build(edge_start, edge_end))
+        summaries = {month: MonthSummary.from_dict(state) for month, state in stored.items()}
+
+        total = MonthSummary()
+        monthly_trends = {}
+        for month in sorted(summaries):
+            summary = summaries[month]
+            total.merge(summary)
+            monthly_trends[month] = {
+                "income": to_amount(summary.income_cents),
+                "expenses": to_amount(summary.expenses_cents),
+                "net_savings": to_amount(summary.income_cents - summary.expenses_cents),
+            }
+        # Like get_monthly_trends, the series spans the first to the last month with transactions
+        active = [m for m, v in monthly_trends.items() if v["income"] or v["expenses"]]
+        monthly_trends = {m: v for m, v in monthly_trends.items() if active and active[0] <= m <= active[-1]}
+
+        moments, digest = total.moments, total.digest
+        return {
+            "avg_daily_spending": moments.mean,
+            "max_spending_day": moments.max if moments.count else 0.0,
+            "min_spending_day": moments.min if moments.count else 0.0,
+            "spending_volatility": moments.std,
+            "p50_daily_spending": digest.quantile(0.5),
+            "p90_daily_spending": digest.quantile(0.9),
+            "p99_daily_spending": digest.quantile(0.99),
+            "monthly_trends": monthly_trends,
+        }
+
+    async def get_monthly_trends(self, user_id, start_date: datetime, end_date: datetime) -> Dict[str, Any]:
+        """Returns income, expenses and net savings for each month in the range."""
+        daily = await self._daily_totals(user_id, start_date, end_date)
+        if daily.empty:
+            return {}
+        monthly = daily.resample("M").sum()
+        return {
+            month.strftime("%Y-%m"): {
+                "income": to_amount(int(row["income"])),
+                "expenses": to_amount(int(row["expenses"])),
+                "net_savings": to_amount(int(row["income"] - row["expenses"])),
+            }
+            for month, row in monthly.iterrows()
+        }
+
+    async def analyze_category(self, user_id, category: str, start_date: datetime,
+                               end_date: datetime) -> Dict[str, Any]:
+        """Summarizes the user's spending in a single category.
+
+        Returns:
+            Dict[str, Any]: Totals for the category and its share of all expenses.
+        """
+        stmt = select(
+            sum_cents(),
+            func.count(Transaction.id),
+            func.max(AMOUNT_CENTS),
+        ).where(
+            *self._window(user_id, start_date, end_date),
+            Transaction.type == TransactionType.EXPENSE,
+            Transaction.category == category
+        )
+        spent, count, largest = (await self.db.execute(stmt)).one()
+        total_expenses = await self.get_total_expenses(user_id, start_date, end_date)
+        return {
+            "total_spent": to_amount(spent),
+            "transaction_count": count,
+            "average_transaction": to_amount(spent / count) if count else 0.0,
+            "largest_transaction": to_amount(largest or 0),
+            "share_of_expenses": to_amount(spent) / float(total_expenses) * 100 if total_expenses else 0.0,
+        }
+
+    async def analyze_all_categories(self, user_id, start_date: datetime, end_date: datetime) -> Dict[str, Any]:
+        """Summarizes the user's spending across every category.
+
+        Returns:
+            Dict[str, Any]: Per-category totals, ordered by amount spent, and the overall total.
+        """
+        categories = await self.get_top_spending_categories(user_id, start_date, end_date, limit=None)
+        total_expenses = sum(c["total_spent"] for c in categories)
+        for c in categories:
+            c["average_transaction"] = c["total_spent"] / c["transaction_count"] if c["transaction_count"] else 0.0
+            c["share_of_expenses"] = c["total_spent"] / total_expenses * 100 if total_expenses else 0.0
+        return {"total_expenses": total_expenses, "categories": categories}
+
+    async def get_trend_analysis(self, user_id, trend_type: str = "spending", period: str = "monthly",
+                                 days: int = 365, max_points: Optional[int] = None,
+                                 downsample: str = "lttb") -> List[Dict[str, Any]]:
+        """Builds a time series of spending, income or savings.
+
+        Args:
+            user_id: The user whose transactions are analyzed.
+            trend_type (str): "spending", "income" or "savings".
+            period (str): The bucket size: "daily", "weekly" or "monthly".
+            days (int): How far back the series starts.
+            max_points (Optional[int]): Downsample series longer than this, or None to return every period.
+            downsample (str): "lttb" keeps the most shape-preserving points; "minmax" returns
+                each bucket's average with its ``min`` and ``max``.
+
+        Returns:
+            List[Dict[str, Any]]: One point per period (or bucket) with its start date, "YYYY-MM-DD"
+                (the Monday of a week, the 1st of a month), and value.
+
+        Raises:
+            ValueError: If the trend type, period or downsampling method is not supported.
+        """
+        period = getattr(period, "value", period)
+        downsample = getattr(downsample, "value", downsample)
+        if period not in PERIOD_RULES:
+            raise ValueError(f"Unsupported period: {period}")
+        if trend_type not in ("spending", "income", "savings"):
+            raise ValueError(f"Unsupported trend type: {trend_type}")
+        if downsample not in ("lttb", "minmax"):
+            raise ValueError(f"Unsupported downsampling method: {downsample}")
+        if max_points is not None and max_points < 3:
+            raise ValueError("max_points must be at least 3")
+
+        daily = await self._daily_totals(user_id, *day_window(days))
+        if daily.empty:
+            return []
+
+        buckets = daily.resample(PERIOD_RULES[period], label="left", closed="left").sum()
+        values = {
+            "spending": buckets["expenses"],
+            "income": buckets["income"],
+            "savings": buckets["income"] - buckets["expenses"],
+        }[trend_type]
+
+        # Downsample before formatting so the work after this point is bounded by max_points
+        if max_points is None or len(values) <= max_points:
+            kept = np.arange(len(values))
+        elif downsample == "minmax":
+            reduced = bucket_min_max_avg(values.to_numpy(), max_points)
+            periods = values.index[reduced["start"]].strftime("%Y-%m-%d")
+            return [
+                {"period": p, "value": float(avg), "min": float(low), "max": float(high)}
+                for p, avg, low, high in zip(periods, to_amount(reduced["avg"]), to_amount(reduced["min"]),
+                                             to_amount(reduced["max"]))
+            ]
+        else:
+            kept = lttb(values.index.asi8, values.to_numpy(), max_points)
+        periods = values.index[kept].strftime("%Y-%m-%d")
+        return [{"period": p, "value": v} for p, v in zip(periods, to_amount(values.to_numpy()[kept]).tolist())]
+
+    async def _user_id_chunks(self, user_ids: Optional[Sequence[int]],
+                              chunk_size: int) -> AsyncIterator[List[int]]:
+        """Yields the requested user ids, or every user's id, in chunks."""
+        if user_ids is not None:
+            for start in range(0, len(user_ids), chunk_size):
+                yield list(user_ids[start:start + chunk_size])
+            return
+        last_id = 0
+        while True:
+            stmt = select(User.id).where(User.id > last_id).order_by(User.id).limit(chunk_size)
+            chunk = list((await self.db.execute(stmt)).scalars())
+            if not chunk:
+                return
+            yield chunk
+            last_id = chunk[-1]
+
+    async def get_overviews(self, user_ids: Optional[Sequence[int]], start_date: datetime, end_date: datetime,
+                            chunk_size: int = OVERVIEW_CHUNK_SIZE,
+                            top_limit: int = 5) -> AsyncIterator[Dict[str, Any]]:
+        """Computes the analytics overview for many users at once.
+
+        Each chunk of users costs a single query grouped by user, category and
+        type; totals, counts and top categories are then derived from those
+        groups in pandas. Users without transactions in the window get zeros.
+
+        Args:
+            user_ids (Optional[Sequence[int]]): The users to report on, or None for every user.
+            start_date (datetime): The start of the analysis window.
+            end_date (datetime): The end of the analysis window.
+            chunk_size (int): The number of users aggregated per query.
+            top_limit (int): The number of top spending categories per user.
+
+        Yields:
+            Dict[str, Any]: One overview per user, with the fields of ``get_analytics_overview``.
+        """
+        async for chunk in self._user_id_chunks(user_ids, chunk_size):
+            stmt = (
+                select(
+                    Transaction.user_id, Transaction.category, Transaction.type,
+                    sum_cents(), func.count(Transaction.id)
+                )
+                .where(
+                    Transaction.user_id.in_(chunk),
+                    Transaction.transaction_date >= start_date,
+                    Transaction.transaction_date <= end_date
+                )
+                .group_by(Transaction.user_id, Transaction.category, Transaction.type)
+            )
+            groups = pd.DataFrame(
+                [(u, c or "uncategorized", t.value, total, n)
+                 for u, c, t, total, n in (await self.db.execute(stmt)).all()],
+                columns=["user_id", "category", "type", "total", "count"],
+            ).astype({"total": np.int64})
+
+            by_type = groups.groupby(["user_id", "type"])["total"].sum().unstack(fill_value=0)
+            income = by_type.get(TransactionType.INCOME.value, {})
+            expenses = by_type.get(TransactionType.EXPENSE.value, {})
+            counts = groups.groupby("user_id")["count"].sum()
+
+            spending = groups[groups["type"] == TransactionType.EXPENSE.value]
+            spending = spending.groupby(["user_id", "category"], as_index=False)[["total", "count"]].sum()
+            spending = spending.sort_values(["user_id", "total"], ascending=[True, False])
+            top = {
+                user_id: [
+                    {"category": c, "total_spent": to_amount(int(t)), "transaction_count": int(n)}
+                    for c, t, n in frame[["category", "total", "count"]].head(top_limit).itertuples(index=False)
+                ]
+                for user_id, frame in spending.groupby("user_id")
+            }
+
+            for user_id in chunk:
+                total_income = to_amount(int(income.get(user_id, 0)))
+                total_expenses = to_amount(int(expenses.get(user_id, 0)))
+                net_savings = total_income - total_expenses
+                yield {
+                    "user_id": user_id,
+                    "total_income": total_income,
+                    "total_expenses": total_expenses,
+                    "net_savings": net_savings,
+                    "savings_rate": net_savings / total_income * 100 if total_income else 0.0,
+                    "transaction_count": int(counts.get(user_id, 0)),
+                    "top_categories": top.get(user_id, []),
+                }
@@ -0,0 +1,276 @@
+"""Live anomaly events, pushed to each user's open dashboards.
+
+When an ingest writes transactions for a user who is watching, the rows it
+touched are scored on the inference pool and any anomalies are published
+to the user's feed. The feed fans each event out to the user's open
+streams and keeps the user's recent events, so a client that reconnects
+with the id of the last event it saw receives what it missed instead of
+rescanning its history.
+
+Streams are in-process: a client resumes on the worker that served it,
+and events published on one worker reach only that worker's streams.
+A stream that cannot keep up is closed rather than slowing the publisher
+or buffering without bound; its client reconnects and catches up from
+the feed's history.
+"""
+import asyncio
+import itertools
+import os
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Deque, Dict, Iterator, List, NamedTuple, Optional, Set
+
+import orjson
+import structlog
+from prometheus_client import Counter, Gauge
+
+from app.core.config import get_settings
+from app.core.database import get_sessionmaker
+from app.models.transaction import TransactionType
+from app.services.analytics_service import AnalyticsService
+from app.services.inference_service import get_inference
+
+logger = structlog.get_logger()
+
+# Metrics
+ANOMALY_FEED_STREAMS = Gauge('anomaly_feed_streams', 'Open anomaly feed streams')
+ANOMALY_FEED_EVENTS = Counter('anomaly_feed_events_total', 'Anomaly events published')
+ANOMALY_FEED_OVERFLOWS = Counter('anomaly_feed_overflows_total', 'Streams closed because their client fell behind')
+ANOMALY_FEED_RESETS = Counter(
+    'anomaly_feed_resets_total',
+    'Resumes that could not be served from history and told the client to rescan'
+)
+
+
+class TooManyStreams(Exception):
+    """Raised when a user already has the maximum number of open streams."""
+
+
+class FeedEvent(NamedTuple):
+    """One event on a user's feed; ``kind`` is "anomaly" or "reset"."""
+    seq: int
+    kind: str
+    data: Dict[str, Any]
+
+
+class Subscription:
+    """One open stream's queue of pending events.
+
+    Args:
+        queue_size (int): The most events held for the stream before it is closed as too slow.
+    """
+
+    def __init__(self, queue_size: int):
+        self.queue: "asyncio.Queue[FeedEvent]" = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    def offer(self, event: FeedEvent):
+        """Queues an event without waiting, marking the stream overflowed if its queue is full."""
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            ANOMALY_FEED_OVERFLOWS.inc()
+
+
+class _UserFeed:
+    def __init__(self, history: int):
+        self.events: Deque[FeedEvent] = deque(maxlen=history)
+        # The newest seq that has fallen out of ``events``; resuming from before it would skip events
+        self.evicted_seq = 0
+        self.subscribers: Set[Subscription] = set()
+
+
+class AnomalyFeed:
+    """Per-user publish/subscribe of anomaly events with a replay history.
+
+    Event ids are ``"<boot>-<seq>"``: ``seq`` increases with every event the
+    process publishes, and ``boot`` identifies the process, so an id issued
+    before a restart is recognised as unresumable.
+
+    Args:
+        history (int): The events kept per user for resuming.
+        queue_size (int): The events buffered per stream before it is closed as too slow.
+        max_streams (int): The most streams one user may have open at once.
+        max_users (int): The users whose feeds are kept; the least recently used are dropped.
+    """
+
+    def __init__(self, history: int = 256, queue_size: int = 100, max_streams: int = 5, max_users: int = 10000):
+        self.history = history
+        self.queue_size = queue_size
+        self.max_streams = max_streams
+        self.max_users = max_users
+        self.boot = os.urandom(4).hex()
+        self._seq = itertools.count(1)
+        self._feeds: "OrderedDict[Any, _UserFeed]" = OrderedDict()
+
+    def event_id(self, event: FeedEvent) -> str:
+        """Returns the id a client sends back as ``Last-Event-ID`` to resume after ``event``."""
+        return f"{self.boot}-{event.seq}"
+
+    def _feed(self, user_id) -> _UserFeed:
+        feed = self._feeds.get(user_id)
+        if feed is None:
+            feed = self._feeds[user_id] = _UserFeed(self.history)
+        self._feeds.move_to_end(user_id)
+        while len(self._feeds) > self.max_users:
+            idle = next((u for u, f in self._feeds.items() if not f.subscribers), None)
+            if idle is None:
+                break
+            del self._feeds[idle]
+        return feed
+
+    def can_subscribe(self, user_id) -> bool:
+        """Whether the user may open another stream."""
+        feed = self._feeds.get(user_id)
+        return feed is None or len(feed.subscribers) < self.max_streams
+
+    def watched(self, user_id) -> bool:
+        """Whether the user has a feed, i.e. has subscribed recently, so their new anomalies are worth publishing."""
+        return user_id in self._feeds
+
+    def publish(self, user_id, data: Dict[str, Any]) -> FeedEvent:
+        """Records an anomaly on the user's feed and queues it for each of their streams."""
+        feed = self._feed(user_id)
+        event = FeedEvent(next(self._seq), "anomaly", data)
+        if len(feed.events) == feed.events.maxlen:
+            feed.evicted_seq = feed.events[0].seq
+        feed.events.append(event)
+        for subscription in feed.subscribers:
+            subscription.offer(event)
+        ANOMALY_FEED_EVENTS.inc()
+        return event
+
+    def _replay(self, feed: Optional[_UserFeed], last_event_id: str) -> List[FeedEvent]:
+        boot, _, seq = last_event_id.partition("-")
+        if feed is not None and boot == self.boot and seq.isdigit() and int(seq) >= feed.evicted_seq:
+            missed = [event for event in feed.events if event.seq > int(seq)]
+            if len(missed) <= self.queue_size:
+                return missed
+        ANOMALY_FEED_RESETS.inc()
+        return [FeedEvent(0, "reset", {"reason": "history_unavailable"})]
+
+    @contextmanager
+    def subscribe(self, user_id, last_event_id: Optional[str] = None) -> Iterator[Subscription]:
+        """Opens a stream of the user's events, starting with those after ``last_event_id``.
+
+        If the events after ``last_event_id`` are no longer all in the
+        history, or are too many to queue, a single "reset" event is sent
+        instead, telling the client to rescan with ``GET /predictions/anomalies``.
+
+        Args:
+            user_id: The user whose events are streamed.
+            last_event_id (Optional[str]): The id of the last event the client received, if resuming.
+
+        Yields:
+            Subscription: The stream's queue, already holding any replayed events.
+
+        Raises:
+            TooManyStreams: If the user already has ``max_streams`` streams open.
+        """
+        # A feed dropped since the client's last event has lost its history
+        previous = self._feeds.get(user_id)
+        feed = self._feed(user_id)
+        if len(feed.subscribers) >= self.max_streams:
+            raise TooManyStreams(f"At most {self.max_streams} anomaly streams may be open per user")
+        subscription = Subscription(self.queue_size)
+        if last_event_id:
+            for event in self._replay(previous, last_event_id):
+                subscription.offer(event)
+        feed.subscribers.add(subscription)
+        ANOMALY_FEED_STREAMS.inc()
+        try:
+            yield subscription
+        finally:
+            feed.subscribers.discard(subscription)
+            ANOMALY_FEED_STREAMS.dec()
+
+
+def format_sse(feed: AnomalyFeed, event: FeedEvent) -> bytes:
+    """Renders an event in the ``text/event-stream`` format."""
+    data = orjson.dumps(event.data, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+    if event.kind == "reset":
+        return f"event: reset\ndata: {data}\n\n".encode()
+    return f"id: {feed.event_id(event)}\nevent: {event.kind}\ndata: {data}\n\n".encode()
+
+
+async def publish_new_anomalies(user_id, since: datetime) -> int:
+    """Scores the user's expenses written since ``since`` and publishes the anomalous ones.
+
+    The detector sees the user's recent expenses as context, since its
+    features include rolling statistics, but only anomalies among the rows
+    the ingest wrote or updated are published.
+
+    Args:
+        user_id: The user whose transactions were ingested.
+        since (datetime): When the ingest started, in UTC like ``updated_at``.
+
+    Returns:
+        int: The number of anomalies published.
+    """
+    settings = get_settings()
+    inference = get_inference()
+    end_date = datetime.now()
+    async with get_sessionmaker()() as session:
+        service = AnalyticsService(session)
+        changed = await service.get_updated_transaction_ids(user_id, since)
+        if not changed:
+            return 0
+        transactions = await service.get_transaction_records(
+            user_id, end_date - timedelta(days=settings.ANOMALY_FEED_CONTEXT_DAYS), end_date,
+            transaction_type=TransactionType.EXPENSE
+        )
+    anomalies = await inference.run("detect_anomalies", inference.ai_service.detect_anomalies, transactions)
+    feed = get_anomaly_feed()
+    published = 0
+    for anomaly in anomalies:
+        if anomaly["transaction_id"] in changed:
+            feed.publish(user_id, anomaly)
+            published += 1
+    return published
+
+
+_scans: Set[asyncio.Task] = set()
+
+
+def schedule_anomaly_scan(user_id, since: datetime):
+    """Scores an ingest's rows in the background if the user is watching their feed.
+
+    Anomalies among rows ingested while nobody is watching are left to
+    ``GET /predictions/anomalies``.
+    """
+    if not get_anomaly_feed().watched(user_id):
+        return
+
+    async def scan():
+        try:
+            await publish_new_anomalies(user_id, since)
+        except Exception as e:
+            logger.warning("Anomaly scan after ingest failed", user_id=user_id, error=str(e))
+
+    task = asyncio.ensure_future(scan())
+    _scans.add(task)
+    task.add_done_callback(_scans.discard)
+
+
+_anomaly_feed: Optional[AnomalyFeed] = None
+
+
+def get_anomaly_feed() -> AnomalyFeed:
+    """Returns the process-wide anomaly feed, creating it on first use.
+
+    Returns:
+        AnomalyFeed: The feed configured from the ``ANOMALY_FEED_*`` settings.
+    """
+    global _anomaly_feed
+    if _anomaly_feed is None:
+        settings = get_settings()
+        _anomaly_feed = AnomalyFeed(
+            history=settings.ANOMALY_FEED_HISTORY,
+            queue_size=settings.ANOMALY_FEED_QUEUE_SIZE,
+            max_streams=settings.ANOMALY_FEED_MAX_STREAMS,
+        )
+    return _anomaly_feed
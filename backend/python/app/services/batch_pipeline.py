@@ -0,0 +1,333 @@
+"""Nightly batch scoring of every user's new transactions.
+
+The pipeline walks all users by id in chunks. Each chunk's expenses are
+loaded in one query and handed to a pool of worker processes, which score
+the expenses of users with transactions written since the previous run in
+one model call per chunk and generate every user's insights; detection and
+insight generation are CPU-bound and hold the GIL, so processes rather than
+threads are what let them use several cores. Anomalies among the new
+transactions are stored in ``transaction_anomalies`` and the insights
+written to the shared insights store. Each user's per-month summaries and
+sketches are then refreshed into ``month_stats``, so long-window analytics
+merge stored months instead of aggregating them on the first request. The
+anomaly detector can optionally be retrained first, on the most recent
+expenses across all users.
+
+Progress is checkpointed to a JSON file after every wave of chunks, so a
+run that crashes resumes after the last users it finished instead of
+starting over. Redoing the wave that was in flight is harmless: storing a
+chunk replaces whatever an earlier attempt stored for it.
+"""
+import asyncio
+import json
+import os
+import time
+import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+import structlog
+from sqlalchemy import delete, insert, select
+
+from app.core.config import get_settings
+from app.core.database import dispose_engine, get_sessionmaker
+from app.models.transaction import Transaction, TransactionAnomaly, TransactionType, User
+from app.services.ai_service import AIService
+from app.services.analytics_service import AnalyticsService
+from app.services.insights_service import StoredInsights, create_insights_store
+
+logger = structlog.get_logger()
+
+# Stages reported on, in the order a chunk goes through them
+STAGES = ("retrain", "load", "score", "insights", "store", "stats")
+
+# The model each pool worker loads once, rather than once per chunk
+_worker_ai: Optional[AIService] = None
+
+
+def _init_worker(model_path: str):
+    global _worker_ai
+    _worker_ai = AIService(model_path=model_path)
+
+
+def _process_chunk(records: Dict[int, List[Dict[str, Any]]], changed: Dict[int, set],
+                   with_insights: bool) -> Dict[str, Any]:
+    """Scores and generates insights for one chunk of users; runs in a pool worker."""
+    start = time.perf_counter()
+    # The whole chunk is scored in one model call. Earlier expenses are scored
+    # as context for the rolling features, but only anomalies among new ones are kept
+    found = _worker_ai.detect_anomalies_batch({u: t for u, t in records.items() if changed.get(u)})
+    anomalies = {u: [a for a in flagged if a["transaction_id"] in changed[u]] for u, flagged in found.items()}
+    seconds = {"score": time.perf_counter() - start, "insights": 0.0}
+
+    insights = {}
+    if with_insights:
+        start = time.perf_counter()
+        insights = {u: _worker_ai.generate_insights(t) for u, t in records.items()}
+        seconds["insights"] = time.perf_counter() - start
+    return {"anomalies": anomalies, "insights": insights, "seconds": seconds}
+
+
+def _retrain(model_path: str, transactions: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return AIService(model_path=model_path).train_anomaly_detector(transactions)
+
+
+class BatchPipeline:
+    """Scores new transactions and refreshes insights for every user, resumably.
+
+    Args:
+        sessionmaker (Callable): Opens the database sessions users are read and results written with.
+        checkpoint_path (str): The file progress is recorded in.
+        model_path (str): The directory the models are loaded from and retrained into.
+        insights_store: Where generated insights are written, or None to skip the insights stage.
+        workers (int): The scoring processes; 0 scores on a thread of this process instead.
+        chunk_size (int): The users loaded, scored and stored together.
+        window_days (int): The days of expenses loaded per user, as detection context and for insights.
+        retrain (bool): Whether to retrain the anomaly detector before scoring.
+        train_rows (int): The most recent expenses retraining reads.
+        stats_months (int): The whole months of per-month analytics state refreshed per user; 0 skips the stage.
+    """
+
+    def __init__(self, sessionmaker: Callable, checkpoint_path: str, model_path: str, insights_store=None,
+                 workers: int = 0, chunk_size: int = 500, window_days: int = 90, retrain: bool = False,
+                 train_rows: int = 200000, stats_months: int = 0):
+        self.sessionmaker = sessionmaker
+        self.checkpoint_path = checkpoint_path
+        self.model_path = model_path
+        self.insights_store = insights_store
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.window_days = window_days
+        self.retrain = retrain
+        self.train_rows = train_rows
+        self.stats_months = stats_months
+
+    def _load_checkpoint(self) -> Dict[str, Any]:
+        try:
+            with open(self.checkpoint_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _save_checkpoint(self, checkpoint: Dict[str, Any]):
+        """Writes the checkpoint atomically, so a crash mid-write leaves the previous one."""
+        os.makedirs(os.path.dirname(os.path.abspath(self.checkpoint_path)), exist_ok=True)
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _begin(self, checkpoint: Dict[str, Any]) -> Dict[str, Any]:
+        """Returns the unfinished run to resume, or starts a new one."""
+        run = checkpoint.get("run")
+        if run is not None:
+            run["resumes"] += 1
+            logger.info("Resuming batch run", run_id=run["run_id"], after_user_id=run["after_user_id"])
+            return run
+        now = datetime.utcnow()
+        last = checkpoint.get("last_completed")
+        # Transactions written since the previous run started are new; a first run scores the whole window
+        since = last["started_at"] if last else (now - timedelta(days=self.window_days)).isoformat()
+        return {
+            "run_id": uuid.uuid4().hex,
+            "started_at": now.isoformat(),
+            "since": since,
+            "after_user_id": 0,
+            "retrain_pending": self.retrain,
+            "resumes": 0,
+            "users": 0,
+            "chunks": 0,
+            "seconds": 0.0,
+            "stages": {name: {"users": 0, "rows": 0, "seconds": 0.0} for name in STAGES},
+        }
+
+    @staticmethod
+    def _tally(stage: Dict[str, Any], users: int, rows: int, seconds: float):
+        stage["users"] += users
+        stage["rows"] += rows
+        stage["seconds"] += seconds
+
+    def _executor(self) -> Executor:
+        if self.workers > 0:
+            return ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(self.model_path,))
+        return ThreadPoolExecutor(1, thread_name_prefix="batch", initializer=_init_worker,
+                                  initargs=(self.model_path,))
+
+    async def _retrain_models(self, run: Dict[str, Any]):
+        start = time.perf_counter()
+        async with self.sessionmaker() as session:
+            transactions = await AnalyticsService(session).get_latest_transaction_records(
+                self.train_rows, transaction_type=TransactionType.EXPENSE
+            )
+        result = await asyncio.to_thread(_retrain, self.model_path, transactions)
+        if not result.get("success"):
+            logger.warning("Anomaly detector not retrained", reason=result.get("message"))
+        self._tally(run["stages"]["retrain"], 0, len(transactions), time.perf_counter() - start)
+
+    async def _next_chunks(self, after_user_id: int, count: int) -> List[List[int]]:
+        """Returns up to ``count`` chunks of the user ids following ``after_user_id``."""
+        async with self.sessionmaker() as session:
+            stmt = select(User.id).where(User.id > after_user_id).order_by(User.id).limit(self.chunk_size * count)
+            user_ids = list((await session.execute(stmt)).scalars())
+        return [user_ids[i:i + self.chunk_size] for i in range(0, len(user_ids), self.chunk_size)]
+
+    async def _process(self, run: Dict[str, Any], user_ids: List[int], executor: Executor):
+        stages = run["stages"]
+        since = datetime.fromisoformat(run["since"])
+        end_date = datetime.now()
+
+        start = time.perf_counter()
+        async with self.sessionmaker() as session:
+            service = AnalyticsService(session)
+            changed = await service.get_updated_transaction_ids_for_users(user_ids, since)
+            records = await service.get_transaction_records_for_users(
+                user_ids, end_date - timedelta(days=self.window_days), end_date,
+                transaction_type=TransactionType.EXPENSE
+            )
+        self._tally(stages["load"], len(records), sum(map(len, records.values())), time.perf_counter() - start)
+
+        result = await asyncio.get_running_loop().run_in_executor(
+            executor, _process_chunk, records, changed, self.insights_store is not None
+        )
+        scored = result["anomalies"]
+        self._tally(stages["score"], len(scored), sum(len(records[u]) for u in scored), result["seconds"]["score"])
+
+        if self.insights_store is not None:
+            start = time.perf_counter()
+            for user_id, insights in result["insights"].items():
+                await self.insights_store.put(user_id, StoredInsights(insights, end_date, self.window_days))
+            self._tally(stages["insights"], len(result["insights"]),
+                        sum(len(records[u]) for u in result["insights"]),
+                        result["seconds"]["insights"] + time.perf_counter() - start)
+
+        start = time.perf_counter()
+        rows = [
+            {"transaction_id": a["transaction_id"], "user_id": user_id, "anomaly_score": a["anomaly_score"],
+             "severity": a["severity"], "run_id": run["run_id"]}
+            for user_id, found in scored.items() for a in found
+        ]
+        async with self.sessionmaker() as session:
+            if changed:
+                # New transactions that are no longer anomalous lose the flag an earlier run gave them
+                rescored = select(Transaction.id).where(
+                    Transaction.user_id.in_(list(changed)), Transaction.updated_at >= since
+                )
+                await session.execute(
+                    delete(TransactionAnomaly).where(TransactionAnomaly.transaction_id.in_(rescored))
+                )
+            if rows:
+                await session.execute(insert(TransactionAnomaly), rows)
+            await session.commit()
+        self._tally(stages["store"], len(scored), len(rows), time.perf_counter() - start)
+
+        if self.stats_months:
+            start = time.perf_counter()
+            async with self.sessionmaker() as session:
+                service = AnalyticsService(session)
+                for user_id in user_ids:
+                    await service.precompute_months(user_id, self.stats_months)
+                await session.commit()
+            self._tally(stages["stats"], len(user_ids), 0, time.perf_counter() - start)
+
+    @staticmethod
+    def _report(run: Dict[str, Any]) -> Dict[str, Any]:
+        stages = {}
+        for name, stage in run["stages"].items():
+            seconds = stage["seconds"]
+            stages[name] = {
+                **stage,
+                "seconds": round(seconds, 3),
+                "users_per_second": round(stage["users"] / seconds, 1) if seconds else None,
+                "rows_per_second": round(stage["rows"] / seconds, 1) if seconds else None,
+            }
+        return {
+            "run_id": run["run_id"],
+            "since": run["since"],
+            "resumes": run["resumes"],
+            "users": run["users"],
+            "chunks": run["chunks"],
+            "seconds": round(run["seconds"], 3),
+            "stages": stages,
+        }
+
+    async def run(self) -> Dict[str, Any]:
+        """Runs the pipeline to completion, resuming an unfinished run if there is one.
+
+        Stage seconds are summed across chunks, so with several workers they
+        exceed the run's wall-clock ``seconds``; a stage's rates are per worker.
+
+        Returns:
+            Dict[str, Any]: The run's report: users and chunks processed, and users,
+                rows, seconds and throughput per stage, including any earlier attempts.
+        """
+        checkpoint = self._load_checkpoint()
+        run = checkpoint["run"] = self._begin(checkpoint)
+        self._save_checkpoint(checkpoint)
+
+        started = time.perf_counter()
+        if run["retrain_pending"]:
+            await self._retrain_models(run)
+            run["retrain_pending"] = False
+            self._save_checkpoint(checkpoint)
+
+        # Created after retraining, so workers load the new model
+        executor = self._executor()
+        try:
+            while chunks := await self._next_chunks(run["after_user_id"], max(1, self.workers)):
+                results = await asyncio.gather(
+                    *(self._process(run, chunk, executor) for chunk in chunks), return_exceptions=True
+                )
+                for result in results:
+                    if isinstance(result, BaseException):
+                        raise result
+                run["after_user_id"] = chunks[-1][-1]
+                run["chunks"] += len(chunks)
+                run["users"] += sum(map(len, chunks))
+                run["seconds"] += time.perf_counter() - started
+                started = time.perf_counter()
+                self._save_checkpoint(checkpoint)
+        finally:
+            executor.shutdown()
+
+        run["seconds"] += time.perf_counter() - started
+        report = self._report(run)
+        self._save_checkpoint({"last_completed": {"run_id": run["run_id"], "started_at": run["started_at"]}})
+        logger.info("Batch run finished", **report)
+        return report
+
+
+def create_batch_pipeline(workers: Optional[int] = None, retrain: Optional[bool] = None) -> BatchPipeline:
+    """Builds the pipeline from the ``BATCH_PIPELINE_*`` settings.
+
+    Insights are only written when ``INSIGHTS_STORE_BACKEND`` is "redis":
+    a memory store in the batch process would be thrown away with it.
+
+    Args:
+        workers (Optional[int]): Overrides ``BATCH_PIPELINE_WORKERS``.
+        retrain (Optional[bool]): Overrides ``BATCH_PIPELINE_RETRAIN``.
+
+    Returns:
+        BatchPipeline: The configured pipeline.
+    """
+    settings = get_settings()
+    return BatchPipeline(
+        get_sessionmaker(),
+        settings.BATCH_PIPELINE_CHECKPOINT_PATH,
+        settings.ML_MODEL_PATH,
+        insights_store=create_insights_store() if settings.INSIGHTS_STORE_BACKEND == "redis" else None,
+        workers=settings.BATCH_PIPELINE_WORKERS if workers is None else workers,
+        chunk_size=settings.BATCH_PIPELINE_CHUNK_SIZE,
+        window_days=settings.INSIGHTS_WINDOW_DAYS,
+        retrain=settings.BATCH_PIPELINE_RETRAIN if retrain is None else retrain,
+        train_rows=settings.BATCH_PIPELINE_TRAIN_ROWS,
+        stats_months=settings.BATCH_PIPELINE_STATS_MONTHS,
+    )
+
+
+async def run_nightly_batch(workers: Optional[int] = None, retrain: Optional[bool] = None) -> Dict[str, Any]:
+    """Runs the configured pipeline and releases the engine, for the CLI and the Celery task."""
+    try:
+        return await create_batch_pipeline(workers, retrain).run()
+    finally:
+        await dispose_engine()
@@ -0,0 +1,236 @@
+import math
+import os
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+import structlog
+from prometheus_client import Counter
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.models.transaction import Transaction
+
+logger = structlog.get_logger()
+
+# Metrics
+DEDUP_CHECKS = Counter(
+    'ingest_dedup_checks_total',
+    'Reference numbers tested by the ingest bloom filter',
+    ['result']  # new: filter miss, no DB check; duplicate/false_positive: confirmed by the DB
+)
+
+# Bump when the hashing or file layout changes so stale files are rebuilt
+BLOOM_FORMAT_VERSION = 1
+HASH_KEYS = ("trancendos-bf-h1", "trancendos-bf-h2")
+DB_CHECK_CHUNK = 1000
+
+
+class BloomFilter:
+    """A fixed-size bloom filter with vectorized insert and membership tests.
+
+    Keys are hashed in bulk with pandas' SipHash-based ``hash_array`` and
+    the ``k`` bit positions derived by double hashing, so adding or testing a
+    batch of keys costs a few NumPy operations rather than a Python loop.
+
+    Args:
+        capacity (int): The number of keys the filter is sized for.
+        error_rate (float): The target false-positive rate at capacity.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hash_count = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+        self.count = 0
+
+    def _positions(self, keys: Iterable[str]) -> np.ndarray:
+        """Returns a (len(keys), hash_count) array of bit positions."""
+        values = np.asarray(list(keys), dtype=object)
+        h1 = pd.util.hash_array(values, hash_key=HASH_KEYS[0])
+        h2 = pd.util.hash_array(values, hash_key=HASH_KEYS[1]) | np.uint64(1)
+        steps = np.arange(self.hash_count, dtype=np.uint64)
+        return (h1[:, None] + steps[None, :] * h2[:, None]) % np.uint64(self.size)
+
+    def add(self, keys: Iterable[str]):
+        """Adds a batch of keys to the filter."""
+        positions = self._positions(keys).ravel()
+        if positions.size:
+            masks = np.left_shift(1, positions & np.uint64(7)).astype(np.uint8)
+            np.bitwise_or.at(self.bits, positions >> np.uint64(3), masks)
+            self.count += positions.size // self.hash_count
+
+    def contains(self, keys: Iterable[str]) -> np.ndarray:
+        """Tests a batch of keys.
+
+        Returns:
+            np.ndarray: A boolean array; False means the key was definitely never added.
+        """
+        positions = self._positions(keys)
+        if positions.size == 0:
+            return np.zeros(len(positions), dtype=bool)
+        bits = (self.bits[positions >> np.uint64(3)] >> (positions & np.uint64(7)).astype(np.uint8)) & 1
+        return bits.all(axis=1)
+
+
+class ReferenceDeduplicator:
+    """Screens ingested rows for reference numbers that are already stored.
+
+    A bloom filter of every stored reference number answers "definitely new"
+    for most fresh rows without touching the database; only possible
+    duplicates are confirmed, in batched ``IN`` queries. The unique
+    constraint on ``reference_number`` stays the source of truth, so a filter
+    that missed rows written by another worker only costs a conflict at write
+    time, never a wrong result.
+
+    The filter is saved to disk with the highest transaction id it covers and
+    on startup is loaded and caught up from newer rows, or fully rebuilt when
+    the file is missing or incompatible.
+
+    Args:
+        path (str): Where the filter is persisted.
+        capacity (int): The number of reference numbers the filter is sized for.
+        error_rate (float): The target false-positive rate at capacity.
+        scope (str): "global" keys on reference_number alone, "user" on (user_id, reference_number).
+    """
+
+    def __init__(self, path: str, capacity: int = 10_000_000, error_rate: float = 0.01, scope: str = "global"):
+        if scope not in ("global", "user"):
+            raise ValueError(f"Unknown dedup scope: {scope}")
+        self.path = path
+        self.scope = scope
+        self.bloom = BloomFilter(capacity, error_rate)
+        self.max_id = 0
+
+    def _keys(self, user_ids: Iterable, references: Iterable[str]) -> list:
+        if self.scope == "user":
+            return [f"{user_id}:{reference}" for user_id, reference in zip(user_ids, references)]
+        return list(references)
+
+    def add(self, rows: pd.DataFrame):
+        """Records the reference numbers of rows that have been written."""
+        rows = rows[rows["reference_number"].notna()]
+        self.bloom.add(self._keys(rows["user_id"], rows["reference_number"]))
+
+    async def find_duplicates(self, db: AsyncSession, rows: pd.DataFrame) -> pd.Series:
+        """Flags rows whose reference number is already stored.
+
+        Args:
+            db (AsyncSession): The session used to confirm possible duplicates.
+            rows (pd.DataFrame): Validated rows with user_id and reference_number columns.
+
+        Returns:
+            pd.Series: A boolean mask aligned with ``rows``.
+        """
+        references = rows["reference_number"]
+        maybe = references.notna()
+        if maybe.any():
+            maybe[maybe] = self.bloom.contains(self._keys(rows["user_id"][maybe], references[maybe]))
+        DEDUP_CHECKS.labels(result="new").inc(int((references.notna() & ~maybe).sum()))
+
+        candidates = references[maybe].tolist()
+        stored = set()
+        for start in range(0, len(candidates), DB_CHECK_CHUNK):
+            chunk = candidates[start:start + DB_CHECK_CHUNK]
+            result = await db.execute(
+                select(Transaction.user_id, Transaction.reference_number)
+                .where(Transaction.reference_number.in_(chunk))
+            )
+            stored.update(
+                (user_id, reference) if self.scope == "user" else reference
+                for user_id, reference in result.all()
+            )
+
+        keys = zip(rows["user_id"], references) if self.scope == "user" else references
+        duplicates = maybe & pd.Series([key in stored for key in keys], index=rows.index, dtype=bool)
+        DEDUP_CHECKS.labels(result="duplicate").inc(int(duplicates.sum()))
+        DEDUP_CHECKS.labels(result="false_positive").inc(int((maybe & ~duplicates).sum()))
+        return duplicates
+
+    async def catch_up(self, db: AsyncSession, batch_size: int = 50000) -> int:
+        """Adds every stored reference number newer than the filter's watermark.
+
+        Returns:
+            int: The number of rows added.
+        """
+        stmt = (
+            select(Transaction.id, Transaction.user_id, Transaction.reference_number)
+            .where(Transaction.id > self.max_id, Transaction.reference_number.isnot(None))
+            .order_by(Transaction.id)
+            .execution_options(yield_per=batch_size)
+        )
+        added = 0
+        result = await db.stream(stmt)
+        async for partition in result.partitions():
+            ids, user_ids, references = zip(*partition)
+            self.bloom.add(self._keys(user_ids, references))
+            self.max_id = max(self.max_id, ids[-1])
+            added += len(ids)
+        return added
+
+    def save(self):
+        """Writes the filter to ``path`` atomically."""
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        meta = np.array([
+            BLOOM_FORMAT_VERSION, self.bloom.size, self.bloom.hash_count, self.bloom.count, self.max_id,
+            int(self.scope == "user"),
+        ], dtype=np.int64)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, meta=meta, bits=self.bloom.bits)
+        os.replace(tmp_path, self.path)
+
+    def load(self) -> bool:
+        """Reads the filter from ``path`` if it exists and matches this configuration.
+
+        Returns:
+            bool: Whether a compatible filter was loaded.
+        """
+        if not os.path.exists(self.path):
+            return False
+        try:
+            with np.load(self.path) as data:
+                version, size, hash_count, count, max_id, user_scope = data["meta"].tolist()
+                bits = data["bits"]
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Ignoring unreadable dedup filter", path=self.path, error=str(e))
+            return False
+        if (version, size, hash_count, bool(user_scope)) != (
+            BLOOM_FORMAT_VERSION, self.bloom.size, self.bloom.hash_count, self.scope == "user"
+        ):
+            return False
+        self.bloom.bits = bits
+        self.bloom.count = count
+        self.max_id = max_id
+        return True
+
+    async def load_or_rebuild(self, db: AsyncSession):
+        """Loads the persisted filter and catches it up, or rebuilds it from the table."""
+        loaded = self.load()
+        added = await self.catch_up(db)
+        logger.info("Dedup filter ready", loaded_from_disk=loaded, rows_added=added, max_id=self.max_id)
+        self.save()
+
+
+_deduplicator: Optional[ReferenceDeduplicator] = None
+
+
+def get_deduplicator() -> ReferenceDeduplicator:
+    """Returns the process-wide deduplicator, creating an empty one on first use.
+
+    Returns:
+        ReferenceDeduplicator: The deduplicator configured from settings.
+    """
+    global _deduplicator
+    if _deduplicator is None:
+        settings = get_settings()
+        _deduplicator = ReferenceDeduplicator(
+            settings.DEDUP_BLOOM_PATH,
+            capacity=settings.DEDUP_BLOOM_CAPACITY,
+            error_rate=settings.DEDUP_BLOOM_ERROR_RATE,
+            scope=settings.DEDUP_SCOPE,
+        )
+    return _deduplicator
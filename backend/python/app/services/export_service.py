@@ -0,0 +1,119 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import AsyncIterator, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.transaction import Transaction
+
+# Columns written for each exported transaction, in CSV header order
+EXPORT_COLUMNS = (
+    Transaction.id,
+    Transaction.transaction_date,
+    Transaction.amount,
+    Transaction.type,
+    Transaction.category,
+    Transaction.description,
+    Transaction.reference_number,
+    Transaction.created_at,
+    Transaction.updated_at,
+)
+EXPORT_FIELDS = [column.key for column in EXPORT_COLUMNS]
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+class TransactionExporter:
+    """Streams a user's transactions as NDJSON or CSV with constant memory.
+
+    Rows are read through a server-side cursor in partitions of ``chunk_size``
+    and each partition is encoded and yielded before the next one is fetched,
+    so memory use depends on the chunk size rather than the number of rows.
+    """
+
+    def __init__(self, db: AsyncSession, chunk_size: int = 5000):
+        """Initializes the TransactionExporter.
+
+        Args:
+            db (AsyncSession): The session the export cursor runs on.
+            chunk_size (int): The number of rows fetched and encoded per chunk.
+        """
+        self.db = db
+        self.chunk_size = chunk_size
+
+    @staticmethod
+    def _values(row) -> list:
+        """Converts a result row into JSON/CSV friendly values."""
+        return [
+            value.isoformat() if isinstance(value, datetime)
+            else value.value if hasattr(value, "value")
+            else str(value) if field == "amount"
+            else value
+            for field, value in zip(EXPORT_FIELDS, row)
+        ]
+
+    def _encode_ndjson(self, rows) -> str:
+        return "".join(
+            json.dumps(dict(zip(EXPORT_FIELDS, self._values(row))), separators=(",", ":")) + "\n"
+            for row in rows
+        )
+
+    def _encode_csv(self, rows) -> str:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(self._values(row) for row in rows)
+        return buffer.getvalue()
+
+    async def stream(self, user_id, fmt: str = "ndjson", compress: bool = False,
+                     start_date: Optional[datetime] = None,
+                     end_date: Optional[datetime] = None) -> AsyncIterator[bytes]:
+        """Yields the encoded export one chunk at a time.
+
+        Args:
+            user_id: The user whose transactions are exported.
+            fmt (str): "ndjson" or "csv".
+            compress (bool): Whether to gzip the stream.
+            start_date (Optional[datetime]): Only export transactions on or after this date.
+            end_date (Optional[datetime]): Only export transactions on or before this date.
+
+        Yields:
+            bytes: The next chunk of the (optionally gzipped) export.
+
+        Raises:
+            ValueError: If the format is not supported.
+        """
+        if fmt not in MEDIA_TYPES:
+            raise ValueError(f"Unsupported export format: {fmt}")
+        encode = self._encode_csv if fmt == "csv" else self._encode_ndjson
+        # wbits=31 writes a gzip header and trailer around the deflate stream
+        compressor = zlib.compressobj(wbits=31) if compress else None
+
+        def emit(text: str) -> bytes:
+            data = text.encode("utf-8")
+            return compressor.compress(data) if compressor else data
+
+        stmt = (
+            select(*EXPORT_COLUMNS)
+            .where(Transaction.user_id == user_id)
+            .order_by(Transaction.transaction_date, Transaction.id)
+            .execution_options(yield_per=self.chunk_size)
+        )
+        if start_date is not None:
+            stmt = stmt.where(Transaction.transaction_date >= start_date)
+        if end_date is not None:
+            stmt = stmt.where(Transaction.transaction_date <= end_date)
+
+        if fmt == "csv":
+            yield emit(",".join(EXPORT_FIELDS) + "\r\n")
+
+        result = await self.db.stream(stmt)
+        async for partition in result.partitions():
+            chunk = emit(encode(partition))
+            if chunk:
+                yield chunk
+
+        if compressor:
+            yield compressor.flush()
@@ -0,0 +1,142 @@
+"""Runs the synchronous, CPU-bound AIService off the event loop."""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from prometheus_client import Counter, Histogram
+
+from app.core.batching import MicroBatcher
+from app.core.config import get_settings
+from app.services.ai_service import AIService
+
+# Metrics
+INFERENCE_QUEUE_TIME = Histogram(
+    'inference_queue_seconds',
+    'Time inference jobs waited for a free worker thread',
+    ['operation'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+INFERENCE_DURATION = Histogram(
+    'inference_duration_seconds',
+    'Time inference jobs spent running',
+    ['operation'],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+INFERENCE_TIMEOUTS = Counter(
+    'inference_timeouts_total',
+    'Inference requests that timed out',
+    ['operation', 'stage']  # queued: gave up before a worker picked it up; running: gave up mid-job
+)
+
+
+class InferenceService:
+    """Owns the shared AIService and the bounded thread pool its models run in.
+
+    Every call runs in the pool, so a slow prediction never blocks the event
+    loop; the pool's size caps how many run at once (tree-based predict
+    releases the GIL, so workers run in parallel). Jobs whose caller timed
+    out before a worker reached them are skipped rather than run for
+    nobody. Spending predictions are micro-batched in front of the pool.
+
+    Args:
+        ai_service (AIService): The models, loaded once and shared by every request.
+        workers (int): The number of inference threads.
+        timeout (float): Seconds a request waits for its result.
+        batch_size (int): The most spending predictions run in one model call.
+        batch_wait (float): Seconds a spending prediction waits for others to join its batch.
+    """
+
+    def __init__(self, ai_service: AIService, workers: int = 4, timeout: float = 10.0,
+                 batch_size: int = 64, batch_wait: float = 0.005):
+        self.ai_service = ai_service
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="inference")
+        self.spending_batcher = MicroBatcher(
+            ai_service.predict_spending_batch, "spending", batch_size, batch_wait, self.executor
+        )
+
+    async def run(self, operation: str, fn: Callable[..., Any], *args) -> Any:
+        """Runs ``fn(*args)`` on an inference thread.
+
+        Args:
+            operation (str): The metric label for this kind of job.
+            fn (Callable[..., Any]): The blocking function to run.
+            *args: Its arguments.
+
+        Returns:
+            Any: What ``fn`` returned.
+
+        Raises:
+            asyncio.TimeoutError: If the result is not ready within the timeout.
+        """
+        submitted = time.perf_counter()
+        deadline = submitted + self.timeout
+        state = {"started": False}
+
+        def job():
+            started = time.perf_counter()
+            INFERENCE_QUEUE_TIME.labels(operation=operation).observe(started - submitted)
+            if started >= deadline:
+                return None
+            state["started"] = True
+            try:
+                return fn(*args)
+            finally:
+                INFERENCE_DURATION.labels(operation=operation).observe(time.perf_counter() - started)
+
+        future = asyncio.get_running_loop().run_in_executor(self.executor, job)
+        try:
+            return await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            INFERENCE_TIMEOUTS.labels(operation=operation, stage="running" if state["started"] else "queued").inc()
+            raise
+
+    async def predict_spending(self, features: Dict[str, Any]) -> Dict[str, Any]:
+        """Predicts spending for one feature set, batched with concurrent requests.
+
+        Raises:
+            asyncio.TimeoutError: If the prediction is not ready within the timeout.
+        """
+        try:
+            return await asyncio.wait_for(self.spending_batcher.submit(features), self.timeout)
+        except asyncio.TimeoutError:
+            INFERENCE_TIMEOUTS.labels(operation="predict_spending", stage="batched").inc()
+            raise
+
+    def shutdown(self):
+        """Stops the worker threads once queued jobs finish."""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+_inference: Optional[InferenceService] = None
+
+
+def get_inference() -> InferenceService:
+    """Returns the process-wide inference service, loading the models on first use.
+
+    The application lifespan calls this at startup so models are loaded
+    before the first request.
+
+    Returns:
+        InferenceService: The service configured from ``INFERENCE_*`` and ``PREDICTION_BATCH_*`` settings.
+    """
+    global _inference
+    if _inference is None:
+        settings = get_settings()
+        _inference = InferenceService(
+            AIService(model_path=settings.ML_MODEL_PATH),
+            workers=settings.INFERENCE_WORKERS,
+            timeout=settings.INFERENCE_TIMEOUT_SECONDS,
+            batch_size=settings.PREDICTION_BATCH_SIZE,
+            batch_wait=settings.PREDICTION_BATCH_WAIT_MS / 1000,
+        )
+    return _inference
+
+
+def shutdown_inference():
+    """Stops the inference threads and forgets the process-wide service."""
+    global _inference
+    if _inference is not None:
+        _inference.shutdown()
+    _inference = None
@@ -0,0 +1,341 @@
+import csv
+import json
+import time
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from prometheus_client import Counter, Histogram
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.transaction import Transaction, TransactionType
+from app.services.dedup_service import ReferenceDeduplicator
+
+# Metrics
+INGEST_ROWS = Counter('ingest_rows_total', 'Transaction rows processed by bulk ingest', ['outcome'])
+INGEST_BATCH_DURATION = Histogram('ingest_batch_duration_seconds', 'Time to validate and write one ingest batch')
+
+# Columns written by bulk ingest; ids come from the table's own sequence
+INGEST_COLUMNS = [
+    "user_id", "amount", "description", "type", "category",
+    "transaction_date", "reference_number", "created_at", "updated_at",
+]
+# Columns overwritten when an incoming row's reference_number already exists
+UPSERT_COLUMNS = ["amount", "description", "type", "category", "transaction_date", "updated_at"]
+
+# Accepted spellings of each transaction type, resolved with one hash lookup per row
+TYPE_NAMES = {
+    spelling: member.name
+    for member in TransactionType
+    for spelling in (member.name, member.name.lower(), member.name.capitalize())
+}
+
+MAX_AMOUNT = 10 ** 13  # keeps cents exact through float64 parsing
+MAX_ERRORS_REPORTED = 100
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Splits a stream of byte chunks into decoded lines.
+
+    Args:
+        chunks (AsyncIterator[bytes]): The raw request or file body.
+
+    Yields:
+        str: Each non-empty line without its line terminator.
+    """
+    pending = b""
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            line = line.rstrip(b"\r")
+            if line:
+                yield line.decode("utf-8")
+    if pending.strip():
+        yield pending.decode("utf-8")
+
+
+async def iter_batches(lines: AsyncIterator[str], fmt: str = "ndjson",
+                       batch_size: int = 10000) -> AsyncIterator[pd.DataFrame]:
+    """Groups NDJSON or CSV lines into DataFrames of raw values.
+
+    CSV input must start with a header row and must not contain quoted line
+    breaks, since records are split on newlines before parsing.
+
+    Args:
+        lines (AsyncIterator[str]): The input lines.
+        fmt (str): "ndjson" or "csv".
+        batch_size (int): The number of records per DataFrame.
+
+    Yields:
+        pd.DataFrame: One batch of unvalidated records.
+
+    Raises:
+        ValueError: If the format is not supported or an NDJSON line is not an object.
+    """
+    if fmt not in ("ndjson", "csv"):
+        raise ValueError(f"Unsupported ingest format: {fmt}")
+
+    header: Optional[List[str]] = None
+    batch: List[str] = []
+
+    def parse(records: List[str]) -> pd.DataFrame:
+        if fmt == "csv":
+            return pd.DataFrame(list(csv.reader(records)), columns=header)
+        try:
+            # One decoder call per batch is much cheaper than one per line
+            return pd.DataFrame.from_records(json.loads("[" + ",".join(records) + "]"))
+        except (ValueError, TypeError):
+            for number, record in enumerate(records, 1):
+                try:
+                    json.loads(record)
+                except ValueError as e:
+                    raise ValueError(f"Invalid NDJSON record {number} in batch: {e}")
+            raise ValueError("NDJSON records must be JSON objects")
+
+    async for line in lines:
+        if fmt == "csv" and header is None:
+            header = [name.strip() for name in next(csv.reader([line]))]
+            continue
+        batch.append(line)
+        if len(batch) >= batch_size:
+            yield parse(batch)
+            batch = []
+    if batch:
+        yield parse(batch)
+
+
+def validate_batch(raw: pd.DataFrame, user_id: Optional[int] = None,
+                   now: Optional[datetime] = None) -> Tuple[pd.DataFrame, List[Dict[str, Any]]]:
+    """Validates and normalizes one batch of raw records column by column.
+
+    Amounts are rounded to cents, type names normalized, dates parsed as UTC, and
+    long descriptions and categories truncated to fit their columns. Rows
+    repeating a reference_number within the batch keep only the last one.
+
+    Args:
+        raw (pd.DataFrame): The unvalidated records.
+        user_id (Optional[int]): If given, every row is assigned to this user.
+        now (Optional[datetime]): The timestamp used for created_at/updated_at and missing dates.
+
+    Returns:
+        Tuple[pd.DataFrame, List[Dict[str, Any]]]: The valid rows with the
+        ``INGEST_COLUMNS`` columns and an error entry for each rejected row.
+    """
+    now = now or datetime.utcnow()
+
+    def column(name: str) -> pd.Series:
+        return raw[name] if name in raw else pd.Series([None] * len(raw), index=raw.index)
+
+    def text_column(name: str, max_length: Optional[int] = None) -> pd.Series:
+        values = column(name)
+        values = values.astype(str).where(values.notna(), None)
+        if max_length is not None:
+            too_long = values.str.len() > max_length
+            if too_long.any():
+                values[too_long] = values[too_long].str.slice(0, max_length)
+        return values
+
+    errors = pd.Series([None] * len(raw), index=raw.index, dtype=object)
+
+    def reject(mask: pd.Series, message: str):
+        errors[mask & errors.isna()] = message
+
+    amount = pd.to_numeric(column("amount"), errors="coerce")
+    reject(amount.isna(), "amount is missing or not a number")
+    reject(amount.abs() >= MAX_AMOUNT, "amount is out of range")
+
+    kind = column("type").map(TYPE_NAMES)
+    reject(kind.isna(), "type must be INCOME, EXPENSE or TRANSFER")
+
+    if user_id is None:
+        owner = pd.to_numeric(column("user_id"), errors="coerce")
+        reject(owner.isna() | (owner <= 0) | (owner % 1 != 0), "user_id must be a positive integer")
+    else:
+        owner = pd.Series(user_id, index=raw.index)
+
+    raw_dates = column("transaction_date")
+    dates = pd.to_datetime(raw_dates, errors="coerce", utc=True, format="ISO8601").dt.tz_convert(None)
+    missing_date = raw_dates.isna() | (raw_dates.astype(str).str.strip() == "")
+    reject(dates.isna() & ~missing_date, "transaction_date is not a valid date")
+    dates = dates.fillna(pd.Timestamp(now))
+
+    reference = text_column("reference_number")
+    reference = reference.where(reference != "", None)
+    reject(reference.str.len() > 100, "reference_number is longer than 100 characters")
+
+    valid = errors.isna()
+    rows = pd.DataFrame({
+        "user_id": owner[valid].astype(np.int64),
+        "amount": amount[valid].round(2),
+        "description": text_column("description", 500)[valid],
+        "type": kind[valid],
+        "category": text_column("category", 100)[valid],
+        "transaction_date": dates[valid],
+        "reference_number": reference[valid],
+        "created_at": now,
+        "updated_at": now,
+    })
+    # ON CONFLICT cannot touch the same row twice in one statement
+    has_reference = rows["reference_number"].notna()
+    rows = pd.concat([
+        rows[has_reference].drop_duplicates("reference_number", keep="last"),
+        rows[~has_reference],
+    ]).sort_index()
+
+    rejected = [{"row": int(index), "error": message} for index, message in errors[~valid].items()]
+    return rows, rejected
+
+
+class TransactionIngestor:
+    """Writes validated transaction batches with PostgreSQL COPY or batched inserts.
+
+    On PostgreSQL each batch is copied into a temporary staging table and
+    merged with one ``INSERT ... SELECT ... ON CONFLICT`` statement. Other
+    databases (SQLite in tests and local runs) use a single executemany
+    upsert per batch. Conflicting reference numbers either update the
+    existing row, only if it belongs to the same user, or are skipped.
+    """
+
+    def __init__(self, db: AsyncSession, on_conflict: str = "update", batch_size: int = 10000,
+                 dedup: Optional[ReferenceDeduplicator] = None):
+        """Initializes the TransactionIngestor.
+
+        Args:
+            db (AsyncSession): A read-write session on the primary database.
+            on_conflict (str): "update" to upsert existing reference numbers, "skip" to keep them.
+            batch_size (int): The number of rows validated and written per transaction.
+            dedup (Optional[ReferenceDeduplicator]): Screens out already-stored rows before
+                writing in "skip" mode and counts duplicates in "update" mode.
+
+        Raises:
+            ValueError: If the conflict mode is not supported.
+        """
+        if on_conflict not in ("update", "skip"):
+            raise ValueError(f"Unsupported conflict mode: {on_conflict}")
+        self.db = db
+        self.on_conflict = on_conflict
+        self.batch_size = batch_size
+        self.dedup = dedup
+
+    async def _write_copy(self, rows: pd.DataFrame) -> int:
+        """Writes a batch through COPY into a staging table and an upsert.
+
+        Amounts are staged as integer cents and the audit timestamps are bound
+        once in the merge, which keeps per-row Python conversion to a minimum.
+        """
+        table = Transaction.__tablename__
+        staged = [c for c in INGEST_COLUMNS if c not in ("amount", "created_at", "updated_at")] + ["amount_cents"]
+        conn = await self.db.connection()
+        await conn.execute(text(
+            f"CREATE TEMP TABLE IF NOT EXISTS {table}_ingest ON COMMIT DELETE ROWS AS "
+            f"SELECT {', '.join(staged[:-1])}, (amount * 100)::bigint AS amount_cents FROM {table} WITH NO DATA"
+        ))
+        records = zip(
+            rows["user_id"].tolist(),
+            rows["description"].tolist(),
+            rows["type"].tolist(),
+            rows["category"].tolist(),
+            rows["transaction_date"].dt.to_pydatetime().tolist(),
+            rows["reference_number"].tolist(),
+            (rows["amount"] * 100).round().astype(np.int64).tolist(),
+        )
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(f"{table}_ingest", records=list(records), columns=staged)
+
+        if self.on_conflict == "update":
+            conflict = (
+                "DO UPDATE SET " + ", ".join(f"{c} = EXCLUDED.{c}" for c in UPSERT_COLUMNS)
+                + f" WHERE {table}.user_id = EXCLUDED.user_id"
+            )
+        else:
+            conflict = "DO NOTHING"
+        # Ordering by the conflict key gives concurrent ingests a consistent lock order
+        result = await conn.execute(text(
+            f"INSERT INTO {table} ({', '.join(INGEST_COLUMNS)}) "
+            f"SELECT user_id, amount_cents / 100.0, description, type, category, transaction_date, "
+            f"reference_number, :now, :now FROM {table}_ingest ORDER BY reference_number "
+            f"ON CONFLICT (reference_number) {conflict}"
+        ), {"now": rows["created_at"].iloc[0].to_pydatetime()})
+        return result.rowcount
+
+    async def _write_executemany(self, rows: pd.DataFrame) -> int:
+        """Writes a batch with one executemany upsert statement."""
+        dialect = postgresql if self.db.bind.dialect.name == "postgresql" else sqlite
+        stmt = dialect.insert(Transaction.__table__)
+        if self.on_conflict == "update":
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["reference_number"],
+                set_={c: stmt.excluded[c] for c in UPSERT_COLUMNS},
+                where=Transaction.__table__.c.user_id == stmt.excluded.user_id,
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=["reference_number"])
+
+        params = rows.assign(
+            amount=[Decimal(f"{value:.2f}") for value in rows["amount"].tolist()],
+            type=rows["type"].map(TransactionType.__members__),
+            transaction_date=rows["transaction_date"].dt.to_pydatetime(),
+            created_at=rows["created_at"].dt.to_pydatetime(),
+            updated_at=rows["updated_at"].dt.to_pydatetime(),
+        ).to_dict("records")
+        result = await self.db.execute(stmt, params)
+        return result.rowcount if result.rowcount >= 0 else len(params)
+
+    async def ingest(self, batches: AsyncIterator[pd.DataFrame], user_id: Optional[int] = None) -> Dict[str, Any]:
+        """Validates and writes every batch, committing after each one.
+
+        Args:
+            batches (AsyncIterator[pd.DataFrame]): Raw record batches, e.g. from ``iter_batches``.
+            user_id (Optional[int]): If given, every row is assigned to this user.
+
+        Returns:
+            Dict[str, Any]: Counts of received, written, rejected and (with a
+            deduplicator) duplicate rows, the first rejection errors, and the
+            elapsed time and throughput.
+        """
+        use_copy = self.db.bind.dialect.driver == "asyncpg"
+        received = written = duplicates = 0
+        errors: List[Dict[str, Any]] = []
+        rejected = 0
+        start = time.perf_counter()
+
+        async for raw in batches:
+            batch_start = time.perf_counter()
+            rows, batch_errors = validate_batch(raw.reset_index(drop=True), user_id=user_id)
+            for error in batch_errors:
+                error["row"] += received
+            received += len(raw)
+            rejected += len(batch_errors)
+            errors.extend(batch_errors[:MAX_ERRORS_REPORTED - len(errors)])
+
+            if self.dedup is not None and not rows.empty:
+                known = await self.dedup.find_duplicates(self.db, rows)
+                duplicates += int(known.sum())
+                if self.on_conflict == "skip":
+                    rows = rows[~known]
+
+            if not rows.empty:
+                written += await (self._write_copy(rows) if use_copy else self._write_executemany(rows))
+                await self.db.commit()
+                if self.dedup is not None:
+                    self.dedup.add(rows)
+
+            INGEST_ROWS.labels(outcome="written").inc(len(rows))
+            INGEST_ROWS.labels(outcome="rejected").inc(len(batch_errors))
+            INGEST_BATCH_DURATION.observe(time.perf_counter() - batch_start)
+
+        elapsed = time.perf_counter() - start
+        return {
+            "received": received,
+            "written": written,
+            "rejected": rejected,
+            "duplicates": duplicates,
+            "errors": errors,
+            "elapsed_seconds": elapsed,
+            "rows_per_second": received / elapsed if elapsed > 0 else 0.0,
+        }
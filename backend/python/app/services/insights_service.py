@@ -0,0 +1,339 @@
+"""Precomputed AI insights, refreshed in the background for recently active users.
+
+Generating insights reads a user's whole window of transactions and runs it
+through ``AIService``, which is far too slow to do on every request. Instead
+each user's insights are computed ahead of time and kept in a store (Redis,
+or in-process when no Redis is configured), so serving them is one key
+lookup. A background task recomputes them for users who have been active
+recently: right away (after a short debounce) for users who just added
+transactions, and otherwise once they are older than the refresh interval,
+most recently active users first and a bounded number at a time. Users not
+seen recently are left alone until they next ask, when their insights are
+computed on demand.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from contextlib import suppress
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import orjson
+import structlog
+from prometheus_client import Counter, Gauge, Histogram
+
+from app.core.config import get_settings
+from app.core.database import get_sessionmaker
+from app.models.transaction import TransactionType
+from app.services.analytics_service import AnalyticsService
+from app.services.inference_service import get_inference
+
+logger = structlog.get_logger()
+
+# Metrics
+INSIGHTS_LOOKUPS = Counter(
+    'insights_lookups_total',
+    'Insight requests by how they were answered',
+    ['result']  # fresh, stale (served, refresh pending) or miss (computed on demand)
+)
+INSIGHTS_REFRESHES = Counter(
+    'insights_refreshes_total',
+    'Insight computations',
+    ['trigger', 'outcome']  # trigger: background or on_demand; outcome: ok or failed
+)
+INSIGHTS_REFRESH_DURATION = Histogram(
+    'insights_refresh_seconds',
+    'Time taken to compute and store one user\'s insights',
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+INSIGHTS_REFRESH_BACKLOG = Gauge('insights_refresh_backlog', 'Users due an insight refresh in the current cycle')
+
+# Seconds to wait after new transactions arrive before refreshing, so a
+# multi-batch upload triggers one refresh rather than one per batch
+DIRTY_DEBOUNCE_SECONDS = 1.0
+
+
+class StoredInsights(NamedTuple):
+    """A user's precomputed insights and when they were computed."""
+    insights: Dict[str, Any]
+    computed_at: datetime
+    period_days: int
+
+
+class MemoryInsightsStore:
+    """Keeps insights in this process, dropping the least recently used users beyond ``max_users``.
+
+    Args:
+        max_users (int): The number of users whose insights are kept.
+    """
+
+    def __init__(self, max_users: int = 10000):
+        self.max_users = max_users
+        self._entries: "OrderedDict[Any, StoredInsights]" = OrderedDict()
+
+    async def get(self, user_id) -> Optional[StoredInsights]:
+        """Returns the user's stored insights, or None."""
+        stored = self._entries.get(user_id)
+        if stored is not None:
+            self._entries.move_to_end(user_id)
+        return stored
+
+    async def put(self, user_id, stored: StoredInsights):
+        """Stores the user's insights, replacing any previous ones."""
+        self._entries[user_id] = stored
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_users:
+            self._entries.popitem(last=False)
+
+
+class RedisInsightsStore:
+    """Keeps insights in Redis as JSON, shared by every worker.
+
+    Args:
+        redis: An asyncio Redis client.
+        ttl (float): Seconds an entry is kept after it was written.
+    """
+
+    def __init__(self, redis, ttl: float):
+        self.redis = redis
+        self.ttl = ttl
+
+    @staticmethod
+    def _key(user_id) -> str:
+        return f"insights:{user_id}"
+
+    async def get(self, user_id) -> Optional[StoredInsights]:
+        """Returns the user's stored insights, or None."""
+        raw = await self.redis.get(self._key(user_id))
+        if raw is None:
+            return None
+        data = orjson.loads(raw)
+        return StoredInsights(data["insights"], datetime.fromisoformat(data["computed_at"]), data["period_days"])
+
+    async def put(self, user_id, stored: StoredInsights):
+        """Stores the user's insights, replacing any previous ones."""
+        raw = orjson.dumps(stored._asdict(), option=orjson.OPT_SERIALIZE_NUMPY)
+        await self.redis.set(self._key(user_id), raw, ex=max(1, int(self.ttl)))
+
+
+class InsightsRefresher:
+    """Computes users' insights into a store, in the background and on demand.
+
+    Refreshes read from the primary through ``sessionmaker`` rather than a
+    replica, so insights refreshed because of new transactions include them.
+    The dirty and activity bookkeeping is per process: with several workers
+    each refreshes the users it has served, which is harmless with a shared
+    store.
+
+    Args:
+        store: Where insights are kept; a ``MemoryInsightsStore`` or ``RedisInsightsStore``.
+        inference: The ``InferenceService`` whose pool insights are generated on.
+        sessionmaker (Callable): Opens the database sessions transactions are read with.
+        window_days (int): The number of days of transactions insights cover.
+        refresh_interval (float): Seconds after which an active user's insights are recomputed.
+        active_window (float): Seconds since a user's last request during which they count as active.
+        concurrency (int): The most background refreshes run at once.
+    """
+
+    def __init__(self, store, inference, sessionmaker: Callable, window_days: int = 90,
+                 refresh_interval: float = 900.0, active_window: float = 86400.0, concurrency: int = 4):
+        self.store = store
+        self.inference = inference
+        self.sessionmaker = sessionmaker
+        self.window_days = window_days
+        self.refresh_interval = refresh_interval
+        self.active_window = active_window
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._last_active: Dict[Any, float] = {}
+        self._refreshed_at: Dict[Any, float] = {}
+        self._dirty: set = set()
+        self._refreshing: Dict[Any, asyncio.Future] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def touch(self, user_id):
+        """Records that the user was just active."""
+        self._last_active[user_id] = time.monotonic()
+
+    def mark_dirty(self, user_id):
+        """Records that the user has new transactions, so their insights are refreshed soon."""
+        self.touch(user_id)
+        self._dirty.add(user_id)
+        self._wakeup.set()
+
+    def due(self) -> List[Any]:
+        """Returns the users to refresh now, users with new transactions first, then most recently active.
+
+        Users inactive for longer than the active window are forgotten.
+        """
+        now = time.monotonic()
+        for user_id in [u for u, seen in self._last_active.items() if now - seen > self.active_window]:
+            del self._last_active[user_id]
+            self._refreshed_at.pop(user_id, None)
+            self._dirty.discard(user_id)
+        due = [
+            user_id for user_id in self._last_active
+            if user_id in self._dirty or now - self._refreshed_at.get(user_id, float("-inf")) >= self.refresh_interval
+        ]
+        due.sort(key=lambda user_id: (user_id not in self._dirty, -self._last_active[user_id]))
+        return due
+
+    async def _compute(self, user_id, trigger: str) -> StoredInsights:
+        start = time.perf_counter()
+        # Cleared before reading, so transactions written meanwhile mark the user dirty again
+        self._dirty.discard(user_id)
+        try:
+            end_date = datetime.now()
+            async with self.sessionmaker() as session:
+                # Insights analyse spending, so income is left out
+                transactions = await AnalyticsService(session).get_transaction_records(
+                    user_id, end_date - timedelta(days=self.window_days), end_date,
+                    transaction_type=TransactionType.EXPENSE
+                )
+            insights = await self.inference.run(
+                "generate_insights", self.inference.ai_service.generate_insights, transactions
+            )
+            stored = StoredInsights(insights, end_date, self.window_days)
+            await self.store.put(user_id, stored)
+        except Exception:
+            INSIGHTS_REFRESHES.labels(trigger=trigger, outcome="failed").inc()
+            raise
+        self._refreshed_at[user_id] = time.monotonic()
+        INSIGHTS_REFRESHES.labels(trigger=trigger, outcome="ok").inc()
+        INSIGHTS_REFRESH_DURATION.observe(time.perf_counter() - start)
+        return stored
+
+    async def _background(self, user_id) -> StoredInsights:
+        async with self._semaphore:
+            return await self._compute(user_id, "background")
+
+    async def refresh(self, user_id, background: bool = False) -> StoredInsights:
+        """Recomputes and stores the user's insights.
+
+        Concurrent refreshes of the same user share one computation. On-demand
+        refreshes do not wait for a background slot: a user waiting on the
+        response goes ahead of the background backlog.
+
+        Args:
+            user_id: The user whose insights are computed.
+            background (bool): Whether the refresh counts against the background concurrency limit.
+
+        Returns:
+            StoredInsights: The newly stored insights.
+        """
+        future = self._refreshing.get(user_id)
+        if future is None:
+            future = asyncio.ensure_future(
+                self._background(user_id) if background else self._compute(user_id, "on_demand")
+            )
+            self._refreshing[user_id] = future
+            future.add_done_callback(lambda _: self._refreshing.pop(user_id, None))
+        # Shielded so a cancelled request does not abort a refresh others may be waiting on
+        return await asyncio.shield(future)
+
+    async def refresh_due(self):
+        """Refreshes every user that is due, at most ``concurrency`` at a time."""
+        users = self.due()
+        INSIGHTS_REFRESH_BACKLOG.set(len(users))
+        results = await asyncio.gather(*(self.refresh(u, background=True) for u in users), return_exceptions=True)
+        for user_id, result in zip(users, results):
+            if isinstance(result, Exception):
+                logger.warning("Insight refresh failed", user_id=user_id, error=str(result))
+        INSIGHTS_REFRESH_BACKLOG.set(0)
+
+    async def get(self, user_id) -> Tuple[StoredInsights, bool]:
+        """Returns the user's insights, computing them now if none are stored.
+
+        Args:
+            user_id: The user whose insights are requested.
+
+        Returns:
+            Tuple[StoredInsights, bool]: The insights and whether they are stale, i.e.
+                the user has newer transactions or they are older than twice the refresh interval.
+        """
+        self.touch(user_id)
+        try:
+            stored = await self.store.get(user_id)
+        except Exception as e:
+            logger.warning("Insights store unavailable", error=str(e))
+            stored = None
+        if stored is None:
+            INSIGHTS_LOOKUPS.labels(result="miss").inc()
+            return await self.refresh(user_id), False
+
+        age = (datetime.now() - stored.computed_at).total_seconds()
+        stale = user_id in self._dirty or age > 2 * self.refresh_interval
+        INSIGHTS_LOOKUPS.labels(result="stale" if stale else "fresh").inc()
+        return stored, stale
+
+    async def run(self):
+        """Refreshes due users every refresh interval, or shortly after new transactions arrive."""
+        while True:
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.refresh_interval)
+                await asyncio.sleep(DIRTY_DEBOUNCE_SECONDS)
+            self._wakeup.clear()
+            try:
+                await self.refresh_due()
+            except Exception as e:
+                logger.error("Insight refresh cycle failed", error=str(e))
+
+    def start(self):
+        """Starts the background refresh loop."""
+        if self._task is None:
+            self._task = asyncio.ensure_future(self.run())
+
+    async def stop(self):
+        """Stops the background refresh loop."""
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+
+def create_insights_store():
+    """Builds the insights store ``INSIGHTS_STORE_BACKEND`` selects.
+
+    Returns:
+        The ``RedisInsightsStore`` at ``REDIS_URL`` if the backend is "redis",
+            otherwise a ``MemoryInsightsStore``.
+    """
+    settings = get_settings()
+    if settings.INSIGHTS_STORE_BACKEND == "redis" and settings.REDIS_URL:
+        from redis import asyncio as aioredis
+        return RedisInsightsStore(aioredis.from_url(settings.REDIS_URL), ttl=settings.INSIGHTS_ACTIVE_HOURS * 3600)
+    return MemoryInsightsStore()
+
+
+_refresher: Optional[InsightsRefresher] = None
+
+
+def get_insights_refresher() -> InsightsRefresher:
+    """Returns the process-wide insights refresher, creating it on first use.
+
+    Returns:
+        InsightsRefresher: The refresher configured from the ``INSIGHTS_*`` settings, storing
+            into Redis at ``REDIS_URL`` if ``INSIGHTS_STORE_BACKEND`` is "redis".
+    """
+    global _refresher
+    if _refresher is None:
+        settings = get_settings()
+        _refresher = InsightsRefresher(
+            create_insights_store(),
+            get_inference(),
+            get_sessionmaker(),
+            window_days=settings.INSIGHTS_WINDOW_DAYS,
+            refresh_interval=settings.INSIGHTS_REFRESH_SECONDS,
+            active_window=settings.INSIGHTS_ACTIVE_HOURS * 3600,
+            concurrency=settings.INSIGHTS_REFRESH_CONCURRENCY,
+        )
+    return _refresher
+
+
+async def shutdown_insights_refresher():
+    """Stops the background refresh loop and forgets the process-wide refresher."""
+    global _refresher
+    if _refresher is not None:
+        await _refresher.stop()
+    _refresher = None
@@ -0,0 +1,149 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.transaction import Transaction, TransactionType
+
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(transaction_date: Optional[datetime], transaction_id: int) -> str:
+    """Encodes the position after a row as an opaque, URL-safe cursor."""
+    payload = json.dumps(
+        [transaction_date.isoformat() if transaction_date is not None else None, transaction_id],
+        separators=(",", ":")
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """Decodes a cursor produced by ``encode_cursor``.
+
+    Returns:
+        tuple: The (transaction_date, id) of the last row on the previous page; the date is
+            None if that row has no transaction date.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        transaction_date, transaction_id = json.loads(raw)
+        if transaction_date is not None:
+            transaction_date = datetime.fromisoformat(transaction_date)
+        return transaction_date, int(transaction_id)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+class TransactionLister:
+    """Pages through a user's transactions, newest first, with keyset pagination.
+
+    Each page seeks to the rows strictly before the previous page's last
+    (transaction_date, id) instead of skipping rows with OFFSET, so with the
+    ``(user_id, transaction_date, id)`` index every page is a short index
+    range scan however deep the client has paged. Transactions without a
+    transaction date are listed after all dated ones, by id.
+
+    Dated and undated rows are read by separate seeks rather than one query
+    ordering NULLs last: the index only yields one order of NULLs when scanned
+    backward (first on PostgreSQL, last on SQLite), and an OR of the two
+    ranges cannot be one index range, so either would sort every row the
+    user has on every page.
+    """
+
+    def __init__(self, db: AsyncSession):
+        """Initializes the TransactionLister.
+
+        Args:
+            db (AsyncSession): The session used to run the listing queries.
+        """
+        self.db = db
+
+    @staticmethod
+    def _filtered(stmt, user_id, category: Optional[str], transaction_type: Optional[TransactionType]):
+        stmt = stmt.where(Transaction.user_id == user_id)
+        if category is not None:
+            stmt = stmt.where(Transaction.category == category)
+        if transaction_type is not None:
+            stmt = stmt.where(Transaction.type == transaction_type)
+        return stmt
+
+    def dated_query(self, user_id, limit: int, after: Optional[tuple] = None, category: Optional[str] = None,
+                    transaction_type: Optional[TransactionType] = None):
+        """Builds the seek over dated rows, newest first, following the (transaction_date, id) ``after``."""
+        stmt = (
+            select(Transaction)
+            .where(Transaction.transaction_date.is_not(None))
+            .order_by(Transaction.transaction_date.desc(), Transaction.id.desc())
+            .limit(limit)
+        )
+        if after is not None:
+            stmt = stmt.where(tuple_(Transaction.transaction_date, Transaction.id) < after)
+        return self._filtered(stmt, user_id, category, transaction_type)
+
+    def undated_query(self, user_id, limit: int, after_id: Optional[int] = None, category: Optional[str] = None,
+                      transaction_type: Optional[TransactionType] = None):
+        """Builds the seek over rows without a transaction date, by id descending, following ``after_id``."""
+        stmt = (
+            select(Transaction)
+            .where(Transaction.transaction_date.is_(None))
+            # Every date here is NULL, so this is id order; spelled as the index's order so
+            # PostgreSQL, which does not treat IS NULL as pinning the column, still skips the sort
+            .order_by(Transaction.transaction_date.desc(), Transaction.id.desc())
+            .limit(limit)
+        )
+        if after_id is not None:
+            stmt = stmt.where(Transaction.id < after_id)
+        return self._filtered(stmt, user_id, category, transaction_type)
+
+    async def page(self, user_id, limit: int = 50, cursor: Optional[str] = None,
+                   category: Optional[str] = None,
+                   transaction_type: Optional[TransactionType] = None) -> Dict[str, Any]:
+        """Returns one page of transactions.
+
+        Args:
+            user_id: The user whose transactions are listed.
+            limit (int): The maximum number of transactions on the page.
+            cursor (Optional[str]): The ``next_cursor`` of the previous page, or None for the first page.
+            category (Optional[str]): Only list transactions in this category.
+            transaction_type (Optional[TransactionType]): Only list transactions of this type.
+
+        Returns:
+            Dict[str, Any]: The page's ``items``, and ``next_cursor`` (None on the last page).
+
+        Raises:
+            ValueError: If the limit is out of range or the cursor is malformed.
+        """
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+
+        after, after_id = None, None
+        if cursor is not None:
+            transaction_date, transaction_id = decode_cursor(cursor)
+            if transaction_date is None:
+                after_id = transaction_id
+            else:
+                after = (transaction_date, transaction_id)
+
+        rows = []
+        # A cursor on an undated row means every dated row has been listed already
+        if after_id is None:
+            stmt = self.dated_query(user_id, limit + 1, after, category, transaction_type)
+            rows = list((await self.db.execute(stmt)).scalars().all())
+        if len(rows) <= limit:
+            # Fetching one row past the page tells whether another page follows
+            stmt = self.undated_query(user_id, limit + 1 - len(rows), after_id, category, transaction_type)
+            rows += (await self.db.execute(stmt)).scalars().all()
+
+        items = rows[:limit]
+        next_cursor = None
+        if len(rows) > limit:
+            last = items[-1]
+            next_cursor = encode_cursor(last.transaction_date, last.id)
+        return {"items": items, "next_cursor": next_cursor}
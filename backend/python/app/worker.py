@@ -0,0 +1,43 @@
+"""Celery application for the service's scheduled work.
+
+Beat enqueues the nightly batch pipeline at ``BATCH_PIPELINE_HOUR`` UTC.
+The pipeline starts its own pool of scoring processes, which Celery's
+prefork workers (being daemonic) cannot, so its queue is consumed by a
+solo worker. With ``CELERY_TASK_ALWAYS_EAGER`` set, ``.delay()`` runs the
+task in the calling process and no broker is needed.
+
+Usage:
+    celery -A app.worker worker --beat --pool solo --queues batch
+    celery -A app.worker call app.worker.nightly_batch
+"""
+import asyncio
+from typing import Any, Dict, Optional
+
+from celery import Celery
+from celery.schedules import crontab
+
+from app.core.config import get_settings
+from app.services.batch_pipeline import run_nightly_batch
+
+settings = get_settings()
+
+celery_app = Celery("trancendos", broker=settings.CELERY_BROKER_URL, backend=settings.CELERY_RESULT_BACKEND)
+celery_app.conf.update(
+    timezone="UTC",
+    task_always_eager=settings.CELERY_TASK_ALWAYS_EAGER,
+    task_routes={"app.worker.nightly_batch": {"queue": "batch"}},
+    # A run that dies with its worker is redelivered and resumes from its checkpoint
+    task_acks_late=True,
+    beat_schedule={
+        "nightly-batch": {
+            "task": "app.worker.nightly_batch",
+            "schedule": crontab(hour=settings.BATCH_PIPELINE_HOUR, minute=0),
+        },
+    },
+)
+
+
+@celery_app.task(name="app.worker.nightly_batch")
+def nightly_batch(workers: Optional[int] = None, retrain: Optional[bool] = None) -> Dict[str, Any]:
+    """Runs the nightly batch pipeline and returns its report."""
+    return asyncio.run(run_nightly_batch(workers=workers, retrain=retrain))
@@ -0,0 +1,70 @@
+"""Benchmark tail latency under overload with and without admission control.
+
+Simulates a heavy endpoint whose requests each need ``--service-ms`` of a
+worker pool with ``--capacity`` slots, and offers it ``--overload`` times
+the load it can sustain. Without admission control every request queues
+and latency grows with the backlog; with it, excess requests are shed
+with 503 and admitted ones keep a bounded latency.
+
+Usage:
+    python -m benchmarks.bench_admission --requests 2000 --overload 2
+"""
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from app.core.admission import AdmissionController, Overloaded
+
+
+async def run(args, controller) -> dict:
+    pool = asyncio.Semaphore(args.capacity)
+    latencies, shed = [], 0
+
+    async def work():
+        async with pool:
+            await asyncio.sleep(args.service_ms / 1000)
+
+    async def request():
+        nonlocal shed
+        start = time.perf_counter()
+        try:
+            if controller is None:
+                await work()
+            else:
+                async with controller.admit():
+                    await work()
+        except Overloaded:
+            shed += 1
+            return
+        latencies.append(time.perf_counter() - start)
+
+    interval = args.service_ms / 1000 / args.capacity / args.overload
+    tasks = []
+    for _ in range(args.requests):
+        tasks.append(asyncio.ensure_future(request()))
+        await asyncio.sleep(interval)
+    await asyncio.gather(*tasks)
+    ms = np.array(latencies) * 1000
+    return {"served": len(ms), "shed": shed, "p50": np.percentile(ms, 50), "p99": np.percentile(ms, 99)}
+
+
+async def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--requests", type=int, default=2000)
+    p.add_argument("--capacity", type=int, default=8)
+    p.add_argument("--service-ms", type=float, default=20.0)
+    p.add_argument("--overload", type=float, default=2.0)
+    p.add_argument("--max-wait", type=float, default=0.2)
+    args = p.parse_args()
+
+    controller = AdmissionController("bench", args.capacity, max_queue=4 * args.capacity, max_wait=args.max_wait)
+    print(f"{'mode':>10} {'served':>7} {'shed':>6} {'p50 ms':>8} {'p99 ms':>8}")
+    for mode, c in (("none", None), ("admission", controller)):
+        r = await run(args, c)
+        print(f"{mode:>10} {r['served']:>7} {r['shed']:>6} {r['p50']:>8.1f} {r['p99']:>8.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
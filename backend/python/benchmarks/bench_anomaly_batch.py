@@ -0,0 +1,56 @@
+"""Benchmark anomaly detection per user against one scoring pass over many users.
+
+Trains the anomaly detector on synthetic expenses, then scores ``--users``
+users holding between 0 and ``--max-per-user`` transactions each: once
+with ``AIService.detect_anomalies`` per user, as the nightly batch used to,
+and once with ``AIService.detect_anomalies_batch`` over all of them.
+
+Usage:
+    python -m benchmarks.bench_anomaly_batch --users 5000 --max-per-user 40
+"""
+import argparse
+import random
+import tempfile
+from datetime import datetime, timedelta
+
+from app.services.ai_service import AIService
+from benchmarks.common import CATEGORIES, Timer
+
+
+def user_transactions(rng: random.Random, user_id: int, count: int) -> list:
+    start = datetime(2023, 1, 1)
+    return [
+        {"id": user_id * 1000 + i, "amount": round(rng.lognormvariate(3, 1), 2), "category": rng.choice(CATEGORIES),
+         "description": f"Merchant {rng.randint(1, 500)}", "transaction_date": start + timedelta(hours=13 * i)}
+        for i in range(count)
+    ]
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--users", type=int, default=5000)
+    p.add_argument("--max-per-user", type=int, default=40)
+    args = p.parse_args()
+    rng = random.Random(0)
+    transactions_by_user = {
+        user_id: user_transactions(rng, user_id, rng.randint(0, args.max_per_user))
+        for user_id in range(1, args.users + 1)
+    }
+    rows = sum(map(len, transactions_by_user.values()))
+
+    service = AIService(model_path=tempfile.mkdtemp())
+    service.train_anomaly_detector([t for ts in transactions_by_user.values() for t in ts][:20000])
+
+    with Timer() as timer:
+        per_user = {u: service.detect_anomalies(ts) for u, ts in transactions_by_user.items()}
+    print(f"per-user: {args.users} users, {rows} rows, {timer.elapsed:.2f}s ({rows / timer.elapsed:.0f} rows/s)")
+
+    with Timer() as timer:
+        batched = service.detect_anomalies_batch(transactions_by_user)
+    print(f"batched:  {args.users} users, {rows} rows, {timer.elapsed:.2f}s ({rows / timer.elapsed:.0f} rows/s)")
+
+    assert batched == per_user, "batched scoring flagged different transactions"
+
+
+if __name__ == "__main__":
+    main()
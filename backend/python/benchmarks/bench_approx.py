@@ -0,0 +1,83 @@
+"""Benchmark approximate (sketch) analytics against exact aggregation.
+
+Seeds one user with ``--rows`` transactions over three years and times the
+overview for a long window both ways. The approximate path is timed cold
+(building the per-month sketches), precomputed (a fresh process loading the
+sketches the nightly batch persisted) and warm (merging cached sketches),
+and its estimates are compared with the exact figures.
+
+Usage:
+    python -m benchmarks.bench_approx --rows 500000
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import distinct, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.transaction import Transaction
+from app.services import analytics_service
+from app.services.analytics_service import AnalyticsService
+from benchmarks.common import Timer, parser, seed, setup_engine
+
+DAYS = 3650
+
+
+async def exact(service: AnalyticsService, start: datetime, end: datetime) -> dict:
+    return {
+        "income": await service.get_total_income(1, start, end),
+        "expenses": await service.get_total_expenses(1, start, end),
+        "count": await service.get_transaction_count(1, start, end),
+        "categories": await service.get_top_spending_categories(1, start, end, limit=None),
+        "merchants": (await service.db.execute(
+            select(func.count(distinct(Transaction.description))).where(*service._window(1, start, end))
+        )).scalar(),
+    }
+
+
+async def main():
+    args = parser(__doc__.splitlines()[0], rows=500000).parse_args()
+    engine = await setup_engine(args.database_url)
+    await seed(engine, args.rows)
+    end = datetime.now()
+    start = end - timedelta(days=DAYS)
+
+    async with AsyncSession(engine) as session:
+        service = AnalyticsService(session)
+        with Timer() as exact_timer:
+            truth = await exact(service, start, end)
+        analytics_service._month_sketches.clear()
+        with Timer() as cold:
+            await service.get_approximate_summary(1, start, end)
+        with Timer() as precompute:
+            await service.precompute_months(1, DAYS // 30)
+            await session.commit()
+        analytics_service._month_sketches.clear()
+        analytics_service._month_summaries.clear()
+        with Timer() as persisted:
+            await service.get_approximate_summary(1, start, end)
+        with Timer() as warm:
+            approx = await service.get_approximate_summary(1, start, end)
+
+    print(f"{'mode':>12} {'seconds':>9}")
+    print(f"{'exact':>12} {exact_timer.elapsed:>9.3f}")
+    print(f"{'approx cold':>12} {cold.elapsed:>9.3f}")
+    print(f"{'precompute':>12} {precompute.elapsed:>9.3f}")
+    print(f"{'approx saved':>12} {persisted.elapsed:>9.3f}")
+    print(f"{'approx warm':>12} {warm.elapsed:>9.3f}")
+
+    bounds = approx["error_bounds"]
+    exact_spend = {c["category"]: c["total_spent"] for c in truth["categories"]}
+    worst = max(abs(c["total_spent"] - exact_spend[c["category"]]) for c in approx["categories"])
+    print(f"category spend: worst error {worst:,.2f} (bound {bounds['category_spend_abs']:,.2f} "
+          f"at {bounds['category_confidence']:.0%} confidence)")
+    merchants_error = abs(approx["distinct_merchants"] - truth["merchants"]) / truth["merchants"]
+    print(f"distinct merchants: {approx['distinct_merchants']} vs {truth['merchants']} "
+          f"({merchants_error:.2%}, standard error {bounds['distinct_merchants_rel']:.2%})")
+    print(f"totals exact: {approx['total_expenses'] == float(truth['expenses'])} "
+          f"count exact: {approx['transaction_count'] == truth['count']}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,56 @@
+"""Benchmark aggregating amounts as Decimals against integer cents.
+
+Times the per-day totals behind the spending endpoints both ways: summing
+``amount`` (every row and group total arrives as a ``Decimal`` and is
+converted with ``float``) and summing ``amount * 100`` as bigint cents into
+int64 NumPy arrays, as ``AnalyticsService`` now does. Also reports the
+largest difference between float-summed and cent-summed totals.
+
+Usage:
+    python -m benchmarks.bench_cents --rows 1000000
+"""
+import asyncio
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.transaction import Transaction
+from app.services.analytics_service import AMOUNT_CENTS, sum_cents, to_amount
+from benchmarks.common import Timer, parser, seed, setup_engine
+
+
+async def main():
+    args = parser(__doc__.splitlines()[0], rows=1000000).parse_args()
+    engine = await setup_engine(args.database_url)
+    await seed(engine, args.rows)
+    day = func.date(Transaction.transaction_date)
+
+    async with AsyncSession(engine) as session:
+        # Raw amounts, as the endpoints used to pull them for NumPy
+        with Timer() as decimal_rows:
+            amounts = (await session.execute(select(Transaction.amount))).scalars().all()
+            values = np.array([float(a) for a in amounts])
+            float_total = values.sum()
+        with Timer() as cent_rows:
+            cents = np.fromiter((await session.execute(select(AMOUNT_CENTS))).scalars(), dtype=np.int64)
+            cent_total = int(cents.sum())
+
+        # Grouped per-day totals
+        with Timer() as decimal_daily:
+            stmt = select(day, func.sum(Transaction.amount)).group_by(day)
+            decimal_totals = np.array([float(t) for _, t in (await session.execute(stmt)).all()])
+        with Timer() as cent_daily:
+            stmt = select(day, sum_cents()).group_by(day)
+            cent_totals = np.array([t for _, t in (await session.execute(stmt)).all()], dtype=np.int64)
+
+    print(f"{'query':>10} {'decimal ms':>11} {'cents ms':>9}")
+    print(f"{'rows':>10} {decimal_rows.elapsed * 1000:>11.1f} {cent_rows.elapsed * 1000:>9.1f}")
+    print(f"{'daily':>10} {decimal_daily.elapsed * 1000:>11.1f} {cent_daily.elapsed * 1000:>9.1f}")
+    print(f"total drift: {abs(float_total - to_amount(cent_total)):.2e}, "
+          f"daily drift: {np.abs(decimal_totals - to_amount(cent_totals)).max():.2e}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
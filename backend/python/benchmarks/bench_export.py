@@ -0,0 +1,48 @@
+"""Benchmark the streaming transaction export.
+
+Reports rows/sec and peak Python heap for increasing row counts; the peak
+should stay flat as the row count grows because rows are streamed in chunks.
+
+Usage:
+    python -m benchmarks.bench_export --rows 200000
+"""
+import asyncio
+import tracemalloc
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.export_service import TransactionExporter
+from benchmarks.common import Timer, parser, seed, setup_engine
+
+
+async def run_export(engine, fmt: str, compress: bool):
+    """Drains one export and returns (bytes, seconds, peak heap bytes)."""
+    async with AsyncSession(engine) as session:
+        tracemalloc.start()
+        size = 0
+        with Timer() as timer:
+            async for chunk in TransactionExporter(session).stream(1, fmt=fmt, compress=compress):
+                size += len(chunk)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return size, timer.elapsed, peak
+
+
+async def main():
+    args = parser(__doc__.splitlines()[0], rows=200000).parse_args()
+    engine = await setup_engine(args.database_url, args.users)
+    seeded = 0
+    print(f"{'rows':>10} {'format':>8} {'gzip':>5} {'rows/sec':>12} {'MB out':>8} {'peak heap MB':>13}")
+    for rows in (args.rows // 4, args.rows // 2, args.rows):
+        await seed(engine, rows - seeded, offset=seeded)
+        seeded = rows
+        for fmt in ("ndjson", "csv"):
+            for compress in (False, True):
+                size, elapsed, peak = await run_export(engine, fmt, compress)
+                print(f"{rows:>10} {fmt:>8} {str(compress):>5} {rows / elapsed:>12,.0f} "
+                      f"{size / 1e6:>8.1f} {peak / 1e6:>13.2f}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
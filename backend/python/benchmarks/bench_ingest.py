@@ -0,0 +1,56 @@
+"""Benchmark bulk transaction ingest.
+
+Reports parse+validate throughput on its own and end-to-end ingest
+throughput. PostgreSQL (via --database-url) uses COPY; the default SQLite
+database uses the batched executemany fallback.
+
+Usage:
+    python -m benchmarks.bench_ingest --rows 200000 --database-url postgresql://...
+"""
+import asyncio
+import json
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.ingest_service import TransactionIngestor, iter_batches, iter_lines, validate_batch
+from benchmarks.common import Timer, generate_rows, parser, setup_engine
+
+
+def build_feed(rows: int, users: int) -> bytes:
+    """Renders synthetic transactions as an NDJSON feed."""
+    return "".join(
+        json.dumps({
+            **row,
+            "amount": str(row["amount"]),
+            "type": row["type"].value,
+            "transaction_date": row["transaction_date"].isoformat(),
+        }, default=str) + "\n"
+        for row in generate_rows(rows, users)
+    ).encode()
+
+
+async def chunks(data: bytes, size: int = 1 << 20):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+async def main():
+    args = parser(__doc__.splitlines()[0], rows=200000).parse_args()
+    feed = build_feed(args.rows, args.users)
+    engine = await setup_engine(args.database_url, args.users)
+
+    with Timer() as timer:
+        async for batch in iter_batches(iter_lines(chunks(feed))):
+            validate_batch(batch)
+    print(f"{'parse + validate':<26}{args.rows / timer.elapsed:>12,.0f} rows/sec")
+
+    for label in ("insert", "upsert replay"):
+        async with AsyncSession(engine) as session:
+            report = await TransactionIngestor(session).ingest(iter_batches(iter_lines(chunks(feed))))
+        print(f"{label + ' (' + engine.dialect.driver + ')':<26}{report['rows_per_second']:>12,.0f} rows/sec "
+              f"({report['written']} written, {report['rejected']} rejected)")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,70 @@
+"""Benchmark keyset pagination against OFFSET for deep transaction pages.
+
+Times fetching page N (of ``--page-size`` rows, newest first) both ways. The
+OFFSET query has to walk past every earlier row, so its latency grows with
+the page number; the keyset query seeks straight to the cursor.
+
+Usage:
+    python -m benchmarks.bench_listing --rows 1000000 --page-size 50
+"""
+import asyncio
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.transaction import Transaction
+from app.services.listing_service import TransactionLister, encode_cursor
+from benchmarks.common import Timer, parser, seed, setup_engine
+
+REPEATS = 5
+
+
+async def best_of(fn) -> float:
+    """Runs ``fn`` REPEATS times and returns the fastest time in milliseconds."""
+    timings = []
+    for _ in range(REPEATS):
+        with Timer() as timer:
+            await fn()
+        timings.append(timer.elapsed)
+    return min(timings) * 1000
+
+
+async def main():
+    p = parser(__doc__.splitlines()[0], rows=1000000)
+    p.add_argument("--page-size", type=int, default=50)
+    args = p.parse_args()
+    engine = await setup_engine(args.database_url)
+    await seed(engine, args.rows)
+
+    newest_first = (Transaction.transaction_date.desc(), Transaction.id.desc())
+    last_page = args.rows // args.page_size - 1
+    print(f"{'page':>8} {'offset ms':>10} {'keyset ms':>10}")
+    async with AsyncSession(engine) as session:
+        for page in sorted({1, 100, 1000, 10000, last_page}):
+            if page > last_page:
+                continue
+            offset = page * args.page_size
+
+            async def by_offset():
+                stmt = (select(Transaction).where(Transaction.user_id == 1)
+                        .order_by(*newest_first).offset(offset).limit(args.page_size))
+                (await session.execute(stmt)).scalars().all()
+                session.expunge_all()
+
+            # The cursor a client would hold after reading the previous page
+            previous = (await session.execute(
+                select(Transaction.transaction_date, Transaction.id).where(Transaction.user_id == 1)
+                .order_by(*newest_first).offset(offset - 1).limit(1)
+            )).one()
+            cursor = encode_cursor(*previous)
+
+            async def by_keyset():
+                await TransactionLister(session).page(1, limit=args.page_size, cursor=cursor)
+                session.expunge_all()
+
+            print(f"{page:>8} {await best_of(by_offset):>10.2f} {await best_of(by_keyset):>10.2f}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,68 @@
+"""Benchmark the per-request overhead of the HTTP metrics middleware.
+
+Drives a minimal ASGI app directly (no server or client, so the
+middleware's own cost is not hidden by I/O) with and without
+``MetricsMiddleware`` and reports the difference per request in
+microseconds; the target is under 20us.
+
+Usage:
+    python -m benchmarks.bench_metrics_middleware --requests 100000
+"""
+import argparse
+import asyncio
+
+from app.core.metrics import MetricsMiddleware
+from benchmarks.common import Timer
+
+
+class Route:
+    path = "/api/v1/analytics/overview"
+
+
+async def app(scope, receive, send):
+    # What the router does on a match, then a small JSON response
+    scope["route"] = Route
+    await send({"type": "http.response.start", "status": 200,
+                "headers": [(b"content-type", b"application/json")]})
+    await send({"type": "http.response.body", "body": b'{"status": "ok"}'})
+
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def send(message):
+    pass
+
+
+async def per_request_us(asgi, requests: int, headers) -> float:
+    with Timer() as timer:
+        for _ in range(requests):
+            scope = {"type": "http", "method": "GET", "path": "/api/v1/analytics/overview",
+                     "root_path": "", "headers": headers}
+            await asgi(scope, receive, send)
+    return timer.elapsed / requests * 1e6
+
+
+async def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--requests", type=int, default=100000)
+    args = p.parse_args()
+    headers = [(b"host", b"localhost"), (b"accept", b"application/json"),
+               (b"traceparent", b"00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01")]
+
+    wrapped = MetricsMiddleware(app)
+    with_exemplars = MetricsMiddleware(app, exemplars=True)
+    for asgi in (app, wrapped, with_exemplars):
+        await per_request_us(asgi, args.requests // 10, headers)  # warm up
+
+    bare = await per_request_us(app, args.requests, headers)
+    print(f"{'app':>22} {'us/request':>11} {'overhead us':>12}")
+    print(f"{'bare':>22} {bare:>11.2f} {'':>12}")
+    for name, asgi in (("metrics", wrapped), ("metrics + exemplars", with_exemplars)):
+        timing = await per_request_us(asgi, args.requests, headers)
+        print(f"{name:>22} {timing:>11.2f} {timing - bare:>12.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,48 @@
+"""Benchmark the batch analytics overview against one overview per user.
+
+The per-user path issues the same service calls as ``/analytics/overview``
+for every user; the batch path runs one grouped query per chunk of users.
+
+Usage:
+    python -m benchmarks.bench_overview_batch --rows 500000 --users 2000
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.analytics_service import AnalyticsService
+from benchmarks.common import Timer, parser, seed, setup_engine
+
+
+async def per_user(service: AnalyticsService, users: int, start: datetime, end: datetime) -> int:
+    for user_id in range(1, users + 1):
+        await service.get_total_income(user_id, start, end)
+        await service.get_total_expenses(user_id, start, end)
+        await service.get_transaction_count(user_id, start, end)
+        await service.get_top_spending_categories(user_id, start, end)
+    return users * 4
+
+
+async def main():
+    args = parser(__doc__.splitlines()[0], rows=500000).parse_args()
+    engine = await setup_engine(args.database_url, args.users)
+    await seed(engine, args.rows, args.users)
+    end = datetime.now()
+    start = end - timedelta(days=365)
+
+    async with AsyncSession(engine) as session:
+        service = AnalyticsService(session)
+        with Timer() as timer:
+            queries = await per_user(service, args.users, start, end)
+        print(f"per-user: {args.users} users, {queries} queries, {timer.elapsed:.2f}s")
+
+        with Timer() as timer:
+            count = len([o async for o in service.get_overviews(None, start, end)])
+        chunks = -(-args.users // 1000)
+        print(f"batch:    {count} users, {chunks} grouped queries, {timer.elapsed:.2f}s")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
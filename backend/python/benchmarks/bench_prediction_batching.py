@@ -0,0 +1,92 @@
+"""Benchmark spending predictions per request against micro-batched predictions.
+
+Trains the spending model on synthetic transactions, then has
+``--clients`` concurrent clients each request ``--requests`` predictions.
+Unbatched, every request runs ``AIService.predict_spending`` in a worker
+thread; batched, requests go through a ``MicroBatcher`` in front of
+``AIService.predict_spending_batch``. Reports throughput and latency.
+
+Usage:
+    python -m benchmarks.bench_prediction_batching --clients 500 --requests 4
+"""
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app.core.batching import MicroBatcher
+from app.services.ai_service import AIService
+from benchmarks.common import CATEGORIES
+
+# The scaler is fitted on a DataFrame and applied to arrays, in both paths alike
+warnings.filterwarnings("ignore", message="X does not have valid feature names")
+
+
+def trained_service() -> AIService:
+    rng = random.Random(0)
+    start = datetime(2023, 1, 1)
+    transactions = [
+        {"amount": rng.uniform(5, 500), "category": rng.choice(CATEGORIES),
+         "transaction_date": start + timedelta(hours=rng.randint(0, 24 * 365))}
+        for _ in range(5000)
+    ]
+    service = AIService(model_path=tempfile.mkdtemp())
+    service.train_spending_predictor(transactions)
+    return service
+
+
+def request(rng: random.Random) -> dict:
+    return {"day_of_week": rng.randint(0, 6), "day_of_month": rng.randint(1, 28), "month": rng.randint(1, 12),
+            "hour": rng.randint(0, 23), "category_encoded": rng.randint(0, 7),
+            "rolling_mean_7d": rng.uniform(5, 500), "rolling_std_7d": rng.uniform(0, 100)}
+
+
+async def run(clients: int, requests: int, predict) -> dict:
+    latencies = []
+
+    async def client(seed):
+        rng = random.Random(seed)
+        for _ in range(requests):
+            start = time.perf_counter()
+            await predict(request(rng))
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(seed) for seed in range(clients)))
+    elapsed = time.perf_counter() - start
+    ms = np.array(latencies) * 1000
+    return {"rps": len(ms) / elapsed, "p50": np.percentile(ms, 50), "p99": np.percentile(ms, 99)}
+
+
+async def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--clients", type=int, default=500)
+    p.add_argument("--requests", type=int, default=4)
+    p.add_argument("--workers", type=int, default=4)
+    p.add_argument("--max-batch", type=int, default=64)
+    p.add_argument("--max-wait-ms", type=float, default=5.0)
+    args = p.parse_args()
+    service = trained_service()
+    executor = ThreadPoolExecutor(args.workers)
+    loop = asyncio.get_running_loop()
+
+    async def unbatched(features):
+        return await loop.run_in_executor(executor, service.predict_spending, features)
+
+    batcher = MicroBatcher(service.predict_spending_batch, "bench", args.max_batch, args.max_wait_ms / 1000, executor)
+
+    print(f"{'mode':>10} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    for mode, predict in (("per-call", unbatched), ("batched", batcher.submit)):
+        r = await run(args.clients, args.requests, predict)
+        print(f"{mode:>10} {r['rps']:>9.0f} {r['p50']:>9.1f} {r['p99']:>9.1f}")
+    executor.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
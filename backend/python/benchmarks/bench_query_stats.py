@@ -0,0 +1,56 @@
+"""Benchmark the per-query cost of request SQL instrumentation.
+
+Runs the same small query repeatedly on an engine without the listeners, on
+an instrumented engine outside any tracked request (an unsampled request),
+and inside ``track_queries`` (a sampled request), and reports the time per
+query in microseconds.
+
+Usage:
+    python -m benchmarks.bench_query_stats --rows 1000 --queries 20000
+"""
+import asyncio
+
+from sqlalchemy import event, select
+
+from app.core.query_stats import _after_cursor_execute, _before_cursor_execute, instrument_engine, track_queries
+from app.models.transaction import Transaction
+from benchmarks.common import Timer, parser, seed, setup_engine
+
+
+async def per_query_us(engine, queries: int) -> float:
+    stmt = select(Transaction.id).where(Transaction.user_id == 1).limit(1)
+    async with engine.connect() as conn:
+        with Timer() as timer:
+            for _ in range(queries):
+                await conn.execute(stmt)
+    return timer.elapsed / queries * 1e6
+
+
+async def main():
+    p = parser(__doc__.splitlines()[0], rows=1000)
+    p.add_argument("--queries", type=int, default=20000)
+    args = p.parse_args()
+    engine = await setup_engine(args.database_url)
+    await seed(engine, args.rows)
+
+    # create_engine attaches the listeners when sampling is on; start from a bare engine
+    for name, fn in (("before_cursor_execute", _before_cursor_execute),
+                     ("after_cursor_execute", _after_cursor_execute)):
+        if event.contains(engine.sync_engine, name, fn):
+            event.remove(engine.sync_engine, name, fn)
+    await per_query_us(engine, args.queries // 10)  # warm up
+    bare = await per_query_us(engine, args.queries)
+    instrument_engine(engine)
+    unsampled = await per_query_us(engine, args.queries)
+    with track_queries("bench", n_plus_one_threshold=args.queries + 1):
+        sampled = await per_query_us(engine, args.queries)
+
+    print(f"{'engine':>22} {'us/query':>9}")
+    print(f"{'no listeners':>22} {bare:>9.1f}")
+    print(f"{'unsampled request':>22} {unsampled:>9.1f}")
+    print(f"{'sampled request':>22} {sampled:>9.1f}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,91 @@
+"""Benchmark analytics response serialization: response_model path vs orjson.
+
+For each endpoint's response model, with payloads shaped like the service
+output, compares FastAPI's default path (construct and validate the model,
+validate and serialize it against ``response_model``, render with stdlib
+json) with the fast path (``model_construct`` rendered by
+``FastJSONResponse``).
+
+Usage:
+    python -m benchmarks.bench_serialization
+"""
+import argparse
+import asyncio
+import random
+from datetime import datetime
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.core.responses import FastJSONResponse
+from app.schemas.analytics import (
+    AnalyticsResponse,
+    CategoryAnalysisResponse,
+    SpendingPatternResponse,
+    TrendAnalysisResponse,
+)
+from benchmarks.common import Timer
+
+
+def payloads(points: int, categories: int) -> dict:
+    rng = random.Random(0)
+    top = [{"category": f"Category {i}", "total_spent": rng.random() * 1000, "transaction_count": i}
+           for i in range(categories)]
+    now = datetime.now()
+    return {
+        "overview": (AnalyticsResponse, dict(
+            period_days=30, total_income=5000.0, total_expenses=3200.5, net_savings=1799.5, savings_rate=36.0,
+            transaction_count=420, top_categories=top[:5], generated_at=now)),
+        "spending-patterns": (SpendingPatternResponse, dict(
+            period_days=3650, avg_daily_spending=80.1, max_spending_day=900.0, min_spending_day=1.0,
+            spending_volatility=40.2, p50_daily_spending=60.0, p90_daily_spending=150.0,
+            p99_daily_spending=600.0, generated_at=now,
+            monthly_trends={f"{2015 + m // 12}-{m % 12 + 1:02d}": {"income": 5000.0, "expenses": 3000.0,
+                                                                   "net_savings": 2000.0} for m in range(120)})),
+        "category-analysis": (CategoryAnalysisResponse, dict(
+            period_days=365, category=None, generated_at=now,
+            analysis_data={"total_expenses": 50000.0, "categories": [
+                {**c, "average_transaction": 12.5, "share_of_expenses": 1.5} for c in top]})),
+        "trends": (TrendAnalysisResponse, dict(
+            trend_type="spending", period="daily", generated_at=now,
+            trend_data=[{"period": f"2024-01-{i % 28 + 1:02d}", "value": rng.random() * 100}
+                        for i in range(points)])),
+    }
+
+
+async def default_path(model, fields, field):
+    content = await serialize_response(field=field, response_content=model(**fields), is_coroutine=True)
+    return JSONResponse(content).body
+
+
+async def fast_path(model, fields, field):
+    return FastJSONResponse(model.model_construct(**fields)).body
+
+
+async def per_call_ms(fn, *args, repeats: int) -> float:
+    await fn(*args)
+    with Timer() as timer:
+        for _ in range(repeats):
+            await fn(*args)
+    return timer.elapsed / repeats * 1000
+
+
+async def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--points", type=int, default=5000, help="Points in the trends payload")
+    p.add_argument("--categories", type=int, default=200, help="Categories in the category analysis")
+    p.add_argument("--repeats", type=int, default=200)
+    args = p.parse_args()
+
+    print(f"{'endpoint':>18} {'KB':>7} {'default ms':>11} {'orjson ms':>10} {'speedup':>8}")
+    for name, (model, fields) in payloads(args.points, args.categories).items():
+        field = create_response_field(name="response", type_=model, mode="serialization")
+        size = len(await fast_path(model, fields, field)) / 1024
+        default = await per_call_ms(default_path, model, fields, field, repeats=args.repeats)
+        fast = await per_call_ms(fast_path, model, fields, field, repeats=args.repeats)
+        print(f"{name:>18} {size:>7.1f} {default:>11.3f} {fast:>10.3f} {default / fast:>7.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,47 @@
+"""Benchmark cached against uncached access-token verification.
+
+Decodes the same HS256 token with python-jose on every call, as
+``get_current_user`` did, and through ``VerifiedTokenCache``, and reports
+the time per call in microseconds.
+
+Usage:
+    python -m benchmarks.bench_token_cache --calls 20000
+"""
+import argparse
+import time
+
+from jose import jwt
+
+from app.core.token_cache import VerifiedTokenCache
+from benchmarks.common import Timer
+
+SECRET = "benchmark-secret"
+
+
+def verify(token: str) -> dict:
+    return jwt.decode(token, SECRET, algorithms=["HS256"])
+
+
+def per_call_us(fn, calls: int) -> float:
+    with Timer() as timer:
+        for _ in range(calls):
+            fn()
+    return timer.elapsed / calls * 1e6
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--calls", type=int, default=20000)
+    args = p.parse_args()
+    token = jwt.encode({"sub": "1", "user_id": 1, "jti": "bench", "exp": time.time() + 3600}, SECRET)
+    cache = VerifiedTokenCache()
+
+    uncached = per_call_us(lambda: verify(token), args.calls)
+    cached = per_call_us(lambda: cache.get_or_verify(token, verify), args.calls)
+    print(f"{'path':>10} {'us/call':>8}")
+    print(f"{'verify':>10} {uncached:>8.2f}")
+    print(f"{'cached':>10} {cached:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
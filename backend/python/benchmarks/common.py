@@ -0,0 +1,86 @@
+"""Shared helpers for the benchmark scripts.
+
+Benchmarks run against a throwaway SQLite file by default; pass
+``--database-url`` to point them at a PostgreSQL instance for realistic numbers.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import insert
+
+from app.core.database import create_engine
+from app.models.transaction import Base, Transaction, TransactionType, User
+
+CATEGORIES = ["Groceries", "Transport", "Rent", "Utilities", "Entertainment", "Dining", "Health", "Travel"]
+
+
+def parser(description: str, rows: int) -> argparse.ArgumentParser:
+    """Builds the argument parser shared by all benchmarks."""
+    p = argparse.ArgumentParser(description=description)
+    p.add_argument("--rows", type=int, default=rows, help="Number of transactions to seed")
+    p.add_argument("--users", type=int, default=1, help="Number of users the rows are spread across")
+    p.add_argument("--database-url", default=None, help="Database to benchmark (defaults to a temp SQLite file)")
+    return p
+
+
+async def setup_engine(database_url=None, users: int = 1):
+    """Creates the benchmark engine, its tables and ``users`` users."""
+    if database_url is None:
+        database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    engine = create_engine(database_url, name="bench")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User), [
+            {"id": i, "username": f"bench{i}", "email": f"bench{i}@example.com"} for i in range(1, users + 1)
+        ])
+    return engine
+
+
+def generate_rows(count: int, users: int = 1, offset: int = 0):
+    """Yields synthetic transaction rows spread over the last three years.
+
+    ``offset`` shifts the row numbering so repeated calls produce distinct
+    reference numbers.
+    """
+    rng = random.Random(offset)
+    start = datetime.now() - timedelta(days=3 * 365)
+    for i in range(offset, offset + count):
+        yield {
+            "user_id": i % users + 1,
+            "amount": Decimal(rng.randint(100, 50000)) / 100,
+            "type": TransactionType.INCOME if rng.random() < 0.1 else TransactionType.EXPENSE,
+            "category": rng.choice(CATEGORIES),
+            "description": f"Merchant {rng.randint(1, 500)}",
+            "transaction_date": start + timedelta(minutes=rng.randint(0, 3 * 365 * 24 * 60)),
+            "created_at": start,
+            "updated_at": start,
+            "reference_number": f"BENCH-{i}",
+        }
+
+
+async def seed(engine, count: int, users: int = 1, offset: int = 0, batch: int = 20000):
+    """Inserts synthetic transactions in batches."""
+    rows = generate_rows(count, users, offset)
+    while True:
+        chunk = [row for _, row in zip(range(batch), rows)]
+        if not chunk:
+            break
+        async with engine.begin() as conn:
+            await conn.execute(insert(Transaction), chunk)
+
+
+class Timer:
+    """Context manager that records elapsed wall-clock seconds."""
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
@@ -5,23 +5,23 @@ from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from contextlib import asynccontextmanager
 import structlog
 import uvicorn
-from prometheus_client import make_asgi_app, Counter, Histogram, Gauge
+from prometheus_client import make_asgi_app
 
 from app.core.config import get_settings
-from app.core.database import create_tables
+from app.core.database import create_tables, dispose_engine, get_sessionmaker
+from app.core.metrics import MetricsMiddleware
 from app.api.v1.router import api_router
 from app.core.security import verify_token
+from app.core.token_cache import get_shared_revocations, get_token_cache, shutdown_shared_revocations
 from app.core.logging import setup_logging
+from app.services.dedup_service import get_deduplicator
+from app.services.inference_service import get_inference, shutdown_inference
+from app.services.insights_service import get_insights_refresher, shutdown_insights_refresher
 
 # Setup logging
 setup_logging()
 logger = structlog.get_logger()
 
-# Metrics
-REQUEST_COUNT = Counter('http_requests_total', 'Total HTTP requests', ['method', 'endpoint'])
-REQUEST_DURATION = Histogram('http_request_duration_seconds', 'HTTP request duration')
-ACTIVE_CONNECTIONS = Gauge('active_connections', 'Active connections')
-
 settings = get_settings()
 
 @asynccontextmanager
@@ -30,8 +30,12 @@ async def lifespan(app: FastAPI):
     Asynchronous context manager for the FastAPI application's lifespan.
 
     This context manager handles the startup and shutdown events of the application.
-    During startup, it logs a message and creates the necessary database tables.
-    During shutdown, it logs a message.
+    During startup, it logs a message, creates the necessary database tables and
+    loads the ingest dedup filter and the AI models and starts the insights
+    refresher and, with Redis configured, the sync of token revocations
+    between workers. During shutdown, it logs a message, stops the revocation
+    sync, the insights refresher and the inference threads, saves the dedup
+    filter and closes the database connection pool.
 
     Args:
         app (FastAPI): The FastAPI application instance.
@@ -39,9 +43,20 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting Luminous-MastermindAI service")
     await create_tables()
+    async with get_sessionmaker()() as session:
+        await get_deduplicator().load_or_rebuild(session)
+    get_inference()
+    get_insights_refresher().start()
+    if settings.REDIS_URL:
+        get_shared_revocations().start()
     yield
     # Shutdown
     logger.info("Shutting down Luminous-MastermindAI service")
+    await shutdown_shared_revocations()
+    await shutdown_insights_refresher()
+    shutdown_inference()
+    get_deduplicator().save()
+    await dispose_engine()
 
 app = FastAPI(
     title="Luminous-MastermindAI",
@@ -69,6 +84,9 @@ app.add_middleware(
     allowed_hosts=settings.ALLOWED_HOSTS
 )
 
+# Added last so it is outermost and times everything, including rejected hosts and CORS preflights
+app.add_middleware(MetricsMiddleware, exemplars=settings.METRICS_EXEMPLARS)
+
 # Include API routes
 app.include_router(api_router, prefix="/api/v1")
 
@@ -110,6 +128,9 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     """
     Dependency to get the current user from the authentication token.
 
+    Verified payloads are cached until the token expires, so repeat requests
+    with the same token skip signature verification.
+
     Args:
         credentials (HTTPAuthorizationCredentials): The HTTP Authorization credentials.
 
@@ -121,7 +142,7 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     """
     try:
         token = credentials.credentials
-        payload = verify_token(token)
+        payload = get_token_cache().get_or_verify(token, verify_token)
         return payload
     except Exception as e:
         logger.error("Authentication failed", error=str(e))
@@ -2,6 +2,9 @@ import pytest
 from unittest.mock import MagicMock, AsyncMock, patch
 import sys
 import types
+from decimal import Decimal
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
 from pydantic import BaseModel
 from datetime import datetime
 from typing import List, Dict, Any, Optional
@@ -18,12 +21,19 @@ class DummyAnalyticsResponse(BaseModel):
     top_categories: list
     generated_at: datetime
 
+class DummyBatchOverviewRequest(BaseModel):
+    user_ids: Optional[List[int]] = None
+    days: int = 30
+
 class DummySpendingPatternResponse(BaseModel):
     period_days: int
     avg_daily_spending: float
     max_spending_day: float
     min_spending_day: float
     spending_volatility: float
+    p50_daily_spending: float = 0.0
+    p90_daily_spending: float = 0.0
+    p99_daily_spending: float = 0.0
     monthly_trends: dict
     generated_at: datetime
 
@@ -42,46 +52,156 @@ class DummyTrendAnalysisResponse(BaseModel):
 # Create mock modules and inject dummy models
 mock_schemas_analytics = types.ModuleType('app.schemas.analytics')
 mock_schemas_analytics.AnalyticsResponse = DummyAnalyticsResponse
+mock_schemas_analytics.BatchOverviewRequest = DummyBatchOverviewRequest
 mock_schemas_analytics.SpendingPatternResponse = DummySpendingPatternResponse
 mock_schemas_analytics.CategoryAnalysisResponse = DummyCategoryAnalysisResponse
 mock_schemas_analytics.TrendAnalysisResponse = DummyTrendAnalysisResponse
-sys.modules['app.schemas.analytics'] = mock_schemas_analytics
 
-# Mock other missing dependencies
-sys.modules['app.core.database'] = MagicMock()
-sys.modules['app.models.transaction'] = MagicMock()
-sys.modules['app.services.analytics_service'] = MagicMock()
-sys.modules['main'] = MagicMock()
+# Real modules the endpoint imports are loaded first: patch.dict drops modules
+# first imported inside the block, and re-importing one that registers
+# Prometheus metrics would fail
+import app.core.singleflight  # noqa: F401
+from app.services.analytics_service import day_window
+
+# The service is mocked, but the endpoints' date windows come from the real helper
+mock_analytics_service = MagicMock()
+mock_analytics_service.day_window = day_window
 
-# Import the endpoint after mocking
-from app.api.v1.endpoints.analytics import get_spending_patterns
+# Mock other dependencies only while the endpoint module is imported, so the
+# real modules stay importable for the rest of the test session
+with patch.dict(sys.modules, {
+    'app.schemas.analytics': mock_schemas_analytics,
+    'app.core.database': MagicMock(),
+    'app.models.transaction': MagicMock(),
+    'app.services.analytics_service': mock_analytics_service,
+    'main': MagicMock(),
+}):
+    # Import the endpoint after mocking
+    from app.api.v1.endpoints import analytics
+    from app.api.v1.endpoints.analytics import get_spending_patterns
 
 @pytest.mark.asyncio
-@patch('app.api.v1.endpoints.analytics.AnalyticsService')
-async def test_get_spending_patterns_handles_invalid_data(MockAnalyticsService):
+@patch.object(analytics, 'AnalyticsService')
+async def test_get_spending_patterns_reports_streaming_stats(MockAnalyticsService):
     """
-    Tests that the endpoint correctly handles non-numeric data from the service
-    by filtering it out before performing calculations, instead of crashing.
+    Tests that the endpoint reports the merged spending statistics, including
+    the daily spending percentiles, from a single service call.
     """
     # Arrange
+    stats = {
+        "avg_daily_spending": 20.17,
+        "max_spending_day": 30.5,
+        "min_spending_day": 10.0,
+        "spending_volatility": 8.3,
+        "p50_daily_spending": 20.0,
+        "p90_daily_spending": 28.4,
+        "p99_daily_spending": 30.3,
+        "monthly_trends": {"2024-01": {"income": 0.0, "expenses": 60.5, "net_savings": -60.5}},
+    }
     mock_service_instance = MockAnalyticsService.return_value
-    # Return a mix of valid and invalid data
-    mock_service_instance.get_daily_spending = AsyncMock(return_value=[10, 20, 'a', None, 30.5])
-    mock_service_instance.get_monthly_trends = AsyncMock(return_value={})
+    mock_service_instance.get_spending_stats = AsyncMock(return_value=stats)
 
-    mock_db = MagicMock()
-
-    # Act: This will currently raise an exception due to the bug
-    # The fix will make this code path return a valid response.
+    # Act
     response = await get_spending_patterns(
         days=90,
         current_user={"user_id": "test_user"},
-        db=mock_db
+        db=MagicMock()
+    )
+
+    # Assert
+    assert mock_service_instance.get_spending_stats.await_count == 1
+    assert response.period_days == 90
+    assert response.model_dump(exclude={"period_days", "generated_at"}) == stats
+
+
+@patch.object(analytics, 'AnalyticsService')
+def test_analytics_etag_returns_304_without_aggregating(MockAnalyticsService):
+    """
+    Tests that a matching If-None-Match short-circuits with 304 before any
+    aggregation runs, and that a changed watermark produces a new ETag.
+    """
+    service = MockAnalyticsService.return_value
+    service.get_watermark = AsyncMock(return_value=(3, datetime(2024, 1, 1)))
+    service.get_total_income = AsyncMock(return_value=Decimal("100"))
+    service.get_total_expenses = AsyncMock(return_value=Decimal("40"))
+    service.get_transaction_count = AsyncMock(return_value=3)
+    service.get_top_spending_categories = AsyncMock(return_value=[])
+
+    app = FastAPI()
+    app.include_router(analytics.router)
+    app.dependency_overrides[analytics.get_current_user] = lambda: {"user_id": 1}
+    app.dependency_overrides[analytics.get_read_db] = lambda: MagicMock()
+    client = TestClient(app)
+
+    first = client.get("/overview?days=30")
+    etag = first.headers["etag"]
+    assert first.status_code == 200
+    assert etag.startswith('W/"')
+
+    cached = client.get("/overview?days=30", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == etag
+    assert service.get_total_income.await_count == 1
+
+    # Different parameters or new data change the ETag
+    assert client.get("/overview?days=7").headers["etag"] != etag
+    service.get_watermark.return_value = (4, datetime(2024, 1, 2))
+    refreshed = client.get("/overview?days=30", headers={"If-None-Match": etag})
+    assert refreshed.status_code == 200
+    assert refreshed.headers["etag"] != etag
+
+
+@pytest.mark.asyncio
+@patch.object(analytics, 'AnalyticsService')
+async def test_identical_concurrent_requests_are_coalesced(MockAnalyticsService):
+    """
+    Tests that concurrent identical overview requests run the aggregation once,
+    while a request with different parameters runs its own.
+    """
+    import asyncio
+
+    async def slow_total(*args):
+        await asyncio.sleep(0.01)
+        return Decimal("100")
+
+    service = MockAnalyticsService.return_value
+    service.get_total_income = AsyncMock(side_effect=slow_total)
+    service.get_total_expenses = AsyncMock(return_value=Decimal("40"))
+    service.get_transaction_count = AsyncMock(return_value=3)
+    service.get_top_spending_categories = AsyncMock(return_value=[])
+
+    user = {"user_id": 1}
+    responses = await asyncio.gather(
+        *[analytics.get_analytics_overview(days=30, current_user=user, db=MagicMock()) for _ in range(4)],
+        analytics.get_analytics_overview(days=7, current_user=user, db=MagicMock()),
     )
 
-    # Assert that the calculation is based on filtered, valid data ([10, 20, 30.5])
-    valid_data = [10, 20, 30.5]
-    assert response.avg_daily_spending == pytest.approx(np.mean(valid_data))
-    assert response.max_spending_day == pytest.approx(np.max(valid_data))
-    assert response.min_spending_day == pytest.approx(np.min(valid_data))
-    assert response.spending_volatility == pytest.approx(np.std(valid_data))
+    assert service.get_total_income.await_count == 2
+    assert all(r.net_savings == 60.0 for r in responses)
+
+
+@pytest.mark.asyncio
+@patch.object(analytics, 'AnalyticsService')
+async def test_batch_overview_uses_the_same_day_window_as_single_overviews(MockAnalyticsService):
+    """
+    Tests that the batch overview aggregates over whole days, like /overview,
+    so a user's batch line matches their single overview for the same period.
+    """
+    from contextlib import asynccontextmanager
+
+    async def overviews(user_ids, start_date, end_date):
+        yield {"user_id": 1, "total_income": 0.0}
+
+    @asynccontextmanager
+    async def read_session():
+        yield MagicMock()
+
+    MockAnalyticsService.return_value.get_overviews = MagicMock(side_effect=overviews)
+    with patch.object(analytics, 'read_session', read_session):
+        response = await analytics.get_analytics_overview_batch(
+            DummyBatchOverviewRequest(user_ids=[1], days=30), current_user={"user_id": 9, "scopes": ["admin"]}
+        )
+        lines = [line async for line in response.body_iterator]
+
+    assert MockAnalyticsService.return_value.get_overviews.call_args.args == ([1], *day_window(30))
+    assert b'"period_days":30' in lines[0]
@@ -0,0 +1,76 @@
+import asyncio
+import sys
+from contextlib import contextmanager
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# Real modules the endpoint imports are loaded first: patch.dict drops modules
+# first imported inside the block, and re-importing one that registers
+# Prometheus metrics would fail
+import app.services.anomaly_feed  # noqa: F401
+from app.core.stream_tokens import issue_stream_token
+
+with patch.dict(sys.modules, {'main': MagicMock()}):
+    from app.api.v1.endpoints import anomaly_stream
+
+
+class ClosingFeed:
+    """A feed whose streams hold one event and are already overflowed, so they close after the preamble."""
+
+    def __init__(self):
+        self.subscribers = []
+
+    def can_subscribe(self, user_id):
+        return True
+
+    @contextmanager
+    def subscribe(self, user_id, last_event_id=None):
+        self.subscribers.append(user_id)
+        queue = asyncio.Queue()
+        queue.put_nowait(object())
+        yield SimpleNamespace(queue=queue, overflowed=True)
+
+
+def make_client():
+    app = FastAPI()
+    app.include_router(anomaly_stream.router, prefix="/stream")
+    app.dependency_overrides[anomaly_stream.get_current_user] = lambda: {"user_id": 7}
+    return TestClient(app)
+
+
+@patch.object(anomaly_stream, 'get_anomaly_feed')
+def test_stream_opens_with_a_stream_token_and_no_authorization_header(mock_get_feed):
+    """
+    Tests that a client that cannot send headers, like EventSource, opens the
+    stream with the token the authenticated token endpoint issued.
+    """
+    feed = mock_get_feed.return_value = ClosingFeed()
+    client = make_client()
+
+    issued = client.post("/stream/token", headers={"Authorization": "Bearer abc"}).json()
+    assert issued["expires_in"] > 0
+
+    response = client.get("/stream/anomalies", params={"token": issued["token"]})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.text.startswith("retry: ")
+    assert feed.subscribers == [7]
+
+
+@patch.object(anomaly_stream, 'get_anomaly_feed')
+def test_stream_rejects_forged_or_expired_tokens(mock_get_feed):
+    """
+    Tests that the stream answers 401 to an expired token or one signed with another key.
+    """
+    client = make_client()
+
+    expired = issue_stream_token(7, ttl=-1)
+    forged = issue_stream_token(7, secret="another-key")
+    assert client.get("/stream/anomalies", params={"token": expired}).status_code == 401
+    assert client.get("/stream/anomalies", params={"token": forged}).status_code == 401
+    assert client.get("/stream/anomalies", params={"token": "garbage"}).status_code == 401
+    mock_get_feed.assert_not_called()
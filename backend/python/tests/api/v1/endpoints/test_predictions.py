@@ -0,0 +1,64 @@
+import asyncio
+import sys
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from fastapi import HTTPException
+
+# Real modules the endpoint imports are loaded first: patch.dict drops modules
+# first imported inside the block, and re-importing one that registers
+# Prometheus metrics would fail
+import app.core.batching  # noqa: F401
+import app.services.inference_service  # noqa: F401
+from app.models.transaction import TransactionType
+
+with patch.dict(sys.modules, {
+    'app.core.database': MagicMock(),
+    'app.services.analytics_service': MagicMock(),
+    'main': MagicMock(),
+}):
+    from app.api.v1.endpoints import predictions
+    from app.api.v1.endpoints.predictions import detect_anomalies, predict_spending
+    from app.schemas.predictions import SpendingPredictionRequest
+
+
+@pytest.mark.asyncio
+@patch.object(predictions, 'get_inference')
+@patch.object(predictions, 'AnalyticsService')
+async def test_detect_anomalies_scans_the_window_on_the_inference_pool(MockAnalyticsService, mock_get_inference):
+    """
+    Tests that the endpoint loads the user's expenses, not their income, and
+    hands the blocking detector to the inference pool rather than calling it inline.
+    """
+    transactions = [{"id": 1, "amount": 20.0}, {"id": 2, "amount": 9000.0}]
+    MockAnalyticsService.return_value.get_transaction_records = AsyncMock(return_value=transactions)
+    inference = mock_get_inference.return_value
+    inference.run = AsyncMock(return_value=[{"transaction_id": 2, "anomaly_score": -0.7}])
+
+    response = await detect_anomalies(days=30, current_user={"user_id": 7}, db=MagicMock())
+
+    assert MockAnalyticsService.return_value.get_transaction_records.await_args.kwargs == {
+        "transaction_type": TransactionType.EXPENSE
+    }
+    operation, fn, records = inference.run.await_args.args
+    assert operation == "detect_anomalies"
+    assert fn is inference.ai_service.detect_anomalies
+    assert records is transactions
+    inference.ai_service.detect_anomalies.assert_not_called()
+    assert response.transactions_scanned == 2
+    assert response.anomalies == [{"transaction_id": 2, "anomaly_score": -0.7}]
+
+
+@pytest.mark.asyncio
+@patch.object(predictions, 'get_inference')
+async def test_predict_spending_answers_504_on_timeout(mock_get_inference):
+    """
+    Tests that a prediction that does not finish in time fails fast with 504
+    instead of holding the request open.
+    """
+    mock_get_inference.return_value.predict_spending = AsyncMock(side_effect=asyncio.TimeoutError)
+
+    with pytest.raises(HTTPException) as error:
+        await predict_spending(SpendingPredictionRequest(hour=9), current_user={"user_id": 7})
+
+    assert error.value.status_code == 504
@@ -0,0 +1,14 @@
+import pytest_asyncio
+
+from app.core.database import create_engine
+from app.models.transaction import Base
+
+
+@pytest_asyncio.fixture
+async def sqlite_engine(tmp_path):
+    """Provides an engine bound to a fresh SQLite database with all tables created."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}", name="test")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from app.core import admission as admission_module
+from app.core.admission import ADMISSION_QUEUE_DEPTH, AdmissionController, Overloaded, admission
+
+
+@pytest.mark.asyncio
+async def test_concurrency_is_limited_and_waiters_run_in_order():
+    """Test that at most ``limit`` requests run at once and queued ones are admitted FIFO."""
+    controller = AdmissionController("test-fifo", limit=2, max_queue=10, max_wait=5)
+    running, peak, order = 0, 0, []
+
+    async def request(i):
+        nonlocal running, peak
+        async with controller.admit():
+            running += 1
+            peak = max(peak, running)
+            order.append(i)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+    await asyncio.gather(*(request(i) for i in range(6)))
+    assert peak == 2
+    assert order == list(range(6))
+    assert controller.in_flight == 0
+    assert controller.service_time > 0
+
+
+@pytest.mark.asyncio
+async def test_requests_are_shed_when_the_queue_is_full_or_too_slow():
+    """Test the queue_full, deadline and timeout rejections, leaving the accounting intact."""
+    controller = AdmissionController("test-shed", limit=1, max_queue=1, max_wait=0.05)
+    await controller.acquire()
+
+    waiter = asyncio.ensure_future(controller.acquire())
+    await asyncio.sleep(0)
+    with pytest.raises(Overloaded) as full:
+        await controller.acquire()
+    assert full.value.reason == "queue_full"
+
+    with pytest.raises(Overloaded) as timed_out:
+        await waiter
+    assert timed_out.value.reason == "timeout"
+    assert ADMISSION_QUEUE_DEPTH.labels(route="test-shed")._value.get() == 0
+
+    # Slots have been held for a second on average, so a 50ms deadline cannot be met
+    controller.service_time = 1.0
+    with pytest.raises(Overloaded) as deadline:
+        await controller.acquire()
+    assert deadline.value.reason == "deadline"
+    assert deadline.value.retry_after >= 1.0
+
+    controller.release(1.0)
+    assert controller.in_flight == 0
+    await controller.acquire()
+    assert controller.in_flight == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiters_leave_the_queue():
+    """Test that a waiter cancelled by its client does not hold on to a slot."""
+    controller = AdmissionController("test-cancel", limit=1, max_queue=5, max_wait=5)
+    await controller.acquire()
+    waiter = asyncio.ensure_future(controller.acquire())
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+
+    controller.release(0.01)
+    assert controller.in_flight == 0
+
+
+def test_dependency_answers_503_with_retry_after(monkeypatch):
+    """Test that a shed request gets 503 and a Retry-After header."""
+    app = FastAPI()
+
+    @app.get("/admission-test", dependencies=[Depends(admission("heavy"))])
+    async def endpoint():
+        return {"ok": True}
+
+    client = TestClient(app)
+    assert client.get("/admission-test").json() == {"ok": True}
+
+    busy = AdmissionController("/admission-test", limit=1, max_queue=0, max_wait=1)
+    busy.in_flight = 1
+    monkeypatch.setitem(admission_module._controllers, "/admission-test", busy)
+    response = client.get("/admission-test")
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) >= 1
+
+    with pytest.raises(ValueError):
+        admission("medium")
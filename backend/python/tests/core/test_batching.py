@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+
+from app.core.batching import BATCH_SIZE, MicroBatcher
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_batches_and_get_their_own_results():
+    """Test that concurrent submissions are grouped up to max_batch and fanned back out in order."""
+    batches = []
+
+    def square(items):
+        batches.append(list(items))
+        return [item * item for item in items]
+
+    batcher = MicroBatcher(square, "test-square", max_batch=4, max_wait=0.01)
+    results = await asyncio.gather(*(batcher.submit(i) for i in range(10)))
+
+    assert results == [i * i for i in range(10)]
+    assert [len(batch) for batch in batches] == [4, 4, 2]
+    assert BATCH_SIZE.labels(batcher="test-square")._sum.get() == 10
+
+
+@pytest.mark.asyncio
+async def test_a_lone_call_runs_after_max_wait():
+    """Test that a single call is not held back longer than max_wait."""
+    batcher = MicroBatcher(lambda items: [item + 1 for item in items], "test-lone", max_batch=100, max_wait=0.005)
+    assert await asyncio.wait_for(batcher.submit(1), timeout=1) == 2
+
+
+@pytest.mark.asyncio
+async def test_batch_errors_reach_every_caller_and_cancelled_callers_are_skipped():
+    """Test that a failing batch raises in each caller, and a cancelled caller's item is not run."""
+    def fail(items):
+        raise ValueError("model unavailable")
+
+    failing = MicroBatcher(fail, "test-fail", max_batch=8, max_wait=0.005)
+    results = await asyncio.gather(failing.submit(1), failing.submit(2), return_exceptions=True)
+    assert all(isinstance(r, ValueError) for r in results)
+
+    seen = []
+    batcher = MicroBatcher(lambda items: seen.extend(items) or list(items), "test-cancel", max_wait=0.01)
+    cancelled = asyncio.ensure_future(batcher.submit("gone"))
+    kept = asyncio.ensure_future(batcher.submit("kept"))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    assert await kept == "kept"
+    assert seen == ["kept"]
@@ -0,0 +1,149 @@
+from datetime import datetime
+
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import database
+from app.core.database import ReplicaRouter, create_engine, to_async_url
+from app.models.transaction import Base
+from app.services.analytics_service import AnalyticsService
+from tests.factories import insert_transactions, make_transaction
+
+
+def _sample(name, engine):
+    return REGISTRY.get_sample_value(name, {"engine": engine}) or 0
+
+
+def test_to_async_url_swaps_sync_drivers():
+    """Test that sync driver names are converted to their asyncio drivers."""
+    assert to_async_url("postgresql://u:p@db:5432/app").drivername == "postgresql+asyncpg"
+    assert to_async_url("postgresql+psycopg2://u:p@db/app").drivername == "postgresql+asyncpg"
+    assert to_async_url("sqlite:///./app.db").drivername == "sqlite+aiosqlite"
+    assert to_async_url("postgresql+asyncpg://u:p@db/app").drivername == "postgresql+asyncpg"
+
+
+def test_create_engine_configures_pool_and_statement_cache(monkeypatch):
+    """Test that pool sizing and the prepared-statement cache come from settings."""
+    monkeypatch.setenv("DB_POOL_SIZE", "7")
+    monkeypatch.setenv("DB_MAX_OVERFLOW", "3")
+    monkeypatch.setenv("DB_STATEMENT_CACHE_SIZE", "250")
+
+    engine = create_engine("postgresql://u:p@db:5432/app")
+
+    assert engine.url.query["prepared_statement_cache_size"] == "250"
+    assert engine.pool.size() == 7
+    assert engine.pool._max_overflow == 3
+
+
+@pytest.mark.asyncio
+async def test_pool_checkouts_are_reported(tmp_path):
+    """Test that checkouts and checkout wait time are exported to Prometheus."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", name="pool-test")
+    checkouts_before = _sample("db_pool_checkouts_total", "pool-test")
+    waits_before = _sample("db_pool_wait_seconds_count", "pool-test")
+
+    for _ in range(3):
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            assert _sample("db_pool_checked_out", "pool-test") == 1
+
+    assert _sample("db_pool_checkouts_total", "pool-test") - checkouts_before == 3
+    assert _sample("db_pool_wait_seconds_count", "pool-test") - waits_before == 3
+    assert _sample("db_pool_checked_out", "pool-test") == 0
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_get_db_yields_session_after_create_tables(monkeypatch, tmp_path):
+    """Test that get_db yields a working session bound to DATABASE_URL."""
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'app.db'}")
+    await database.dispose_engine()
+    try:
+        await database.create_tables()
+
+        sessions = database.get_db()
+        session = await sessions.__anext__()
+        assert isinstance(session, AsyncSession)
+        result = await session.execute(text("SELECT COUNT(*) FROM transactions"))
+        assert result.scalar() == 0
+        await sessions.aclose()
+    finally:
+        await database.dispose_engine()
+
+
+async def _replica(tmp_path, name, rows):
+    engine = create_engine(f"sqlite:///{tmp_path / name}.db", name=name)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    await insert_transactions(engine, [make_transaction() for _ in range(rows)])
+    return engine
+
+
+async def _count_transactions(router):
+    engine = await router.choose()
+    async with AsyncSession(engine) as session:
+        return await AnalyticsService(session).get_transaction_count(
+            1, datetime(2000, 1, 1), datetime(2100, 1, 1)
+        )
+
+
+@pytest.mark.asyncio
+async def test_router_round_robins_across_replicas(tmp_path):
+    """Test that analytics reads alternate between two replica stand-ins."""
+    # Each database holds a different number of rows so the count reveals which one served the read
+    primary, first, second = [await _replica(tmp_path, n, rows) for n, rows in (("primary", 1), ("r0", 2), ("r1", 3))]
+    router = ReplicaRouter(primary, [first, second])
+
+    assert [await _count_transactions(router) for _ in range(4)] == [2, 3, 2, 3]
+    for engine in (primary, first, second):
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_router_skips_lagging_replica_and_falls_back_to_primary(tmp_path):
+    """Test that lagging replicas are skipped and the primary serves when all lag."""
+    primary, first, second = [await _replica(tmp_path, n, rows) for n, rows in (("primary", 1), ("r0", 2), ("r1", 3))]
+    router = ReplicaRouter(primary, [first, second], max_lag=5.0)
+    lag = {first: 30.0, second: 0.5}
+
+    async def fake_probe(engine):
+        return lag[engine], 0.001
+
+    router._probe = fake_probe
+    assert [await _count_transactions(router) for _ in range(3)] == [3, 3, 3]
+
+    lag[second] = 60.0
+    await router.refresh()
+    assert await _count_transactions(router) == 1
+    for engine in (primary, first, second):
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_router_least_latency_prefers_fastest_replica(tmp_path):
+    """Test that the least-latency strategy routes to the replica with the lowest probe latency."""
+    primary, first, second = [await _replica(tmp_path, n, rows) for n, rows in (("primary", 1), ("r0", 2), ("r1", 3))]
+    router = ReplicaRouter(primary, [first, second], strategy="least_latency")
+    latency = {first: 0.050, second: 0.002}
+
+    async def fake_probe(engine):
+        return 0.0, latency[engine]
+
+    router._probe = fake_probe
+    assert [await _count_transactions(router) for _ in range(3)] == [3, 3, 3]
+    for engine in (primary, first, second):
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_router_marks_unreachable_replica_unhealthy(tmp_path):
+    """Test that a replica whose probe fails is excluded from routing."""
+    primary = await _replica(tmp_path, "primary", 1)
+    broken = create_engine(f"sqlite:///{tmp_path / 'missing' / 'replica.db'}", name="broken")
+    router = ReplicaRouter(primary, [broken])
+
+    assert await router.choose() is primary
+    assert router.lag[broken] == float("inf")
+    await primary.dispose()
@@ -0,0 +1,33 @@
+import numpy as np
+
+from app.core.downsample import bucket_min_max_avg, lttb
+
+
+def test_lttb_keeps_end_points_and_spikes():
+    """Test that LTTB returns exactly max_points sorted indices including the extremes."""
+    rng = np.random.default_rng(0)
+    x = np.arange(100000)
+    y = rng.normal(size=x.size)
+    y[31337], y[77777] = 40.0, -40.0
+
+    kept = lttb(x, y, 500)
+
+    assert len(kept) == 500
+    assert kept[0] == 0 and kept[-1] == x.size - 1
+    assert (np.diff(kept) > 0).all()
+    assert {31337, 77777} <= set(kept.tolist())
+
+
+def test_lttb_returns_short_series_unchanged():
+    """Test that series no longer than max_points are not thinned."""
+    assert lttb(np.arange(10), np.arange(10), 10).tolist() == list(range(10))
+
+
+def test_bucket_min_max_avg():
+    """Test bucket statistics over evenly split buckets."""
+    reduced = bucket_min_max_avg(np.arange(12, dtype=float), 4)
+
+    assert reduced["start"].tolist() == [0, 3, 6, 9]
+    assert reduced["min"].tolist() == [0, 3, 6, 9]
+    assert reduced["max"].tolist() == [2, 5, 8, 11]
+    assert reduced["avg"].tolist() == [1, 4, 7, 10]
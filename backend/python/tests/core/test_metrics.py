@@ -0,0 +1,76 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from app.core.metrics import ACTIVE_CONNECTIONS, MetricsMiddleware
+
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def _app(**options):
+    app = FastAPI()
+
+    @app.get("/metrics-test/items/{item_id}")
+    async def read_item(item_id: int):
+        assert ACTIVE_CONNECTIONS._value.get() >= 1
+        return {"id": item_id, "padding": "x" * 100}
+
+    inner = FastAPI()
+
+    @inner.get("/ping/{count}")
+    async def ping(count: int):
+        return "pong"
+
+    async def plain(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    app.mount("/metrics-test/mounted", inner)
+    app.mount("/metrics-test/plain", plain)
+    app.add_middleware(MetricsMiddleware, **options)
+    return TestClient(app)
+
+
+def test_requests_are_labelled_by_route_template_and_status():
+    """Test that counts, latency and sizes are recorded under the route template."""
+    client = _app()
+    endpoint = "/metrics-test/items/{item_id}"
+    before = _sample("http_requests_total", method="GET", endpoint=endpoint, status="200")
+
+    body = client.get("/metrics-test/items/1").content
+    client.get("/metrics-test/items/2")
+    client.get("/metrics-test/items/not-a-number")
+
+    assert _sample("http_requests_total", method="GET", endpoint=endpoint, status="200") == before + 2
+    assert _sample("http_requests_total", method="GET", endpoint=endpoint, status="422") >= 1
+    assert _sample("http_request_duration_seconds_count", method="GET", endpoint=endpoint) >= 3
+    assert _sample("http_response_size_bytes_sum", method="GET", endpoint=endpoint) >= 2 * len(body)
+    assert ACTIVE_CONNECTIONS._value.get() == 0
+
+
+def test_unmatched_and_mounted_paths_do_not_use_the_raw_path():
+    """Test that unknown paths share one label and mounted apps keep their templates or mount path."""
+    client = _app()
+    before = _sample("http_requests_total", method="GET", endpoint="<unmatched>", status="404")
+    client.get("/metrics-test/nothing/here/123")
+    client.get("/metrics-test/mounted/ping/3")
+    client.get("/metrics-test/plain/anything")
+
+    assert _sample("http_requests_total", method="GET", endpoint="<unmatched>", status="404") == before + 1
+    assert _sample("http_requests_total", method="GET", endpoint="/metrics-test/mounted/ping/{count}",
+                   status="200") >= 1
+    assert _sample("http_requests_total", method="GET", endpoint="/metrics-test/plain", status="200") >= 1
+    assert _sample("http_requests_total", method="GET", endpoint="/metrics-test/nothing/here/123",
+                   status="404") == 0
+
+
+def test_trace_ids_are_attached_as_exemplars():
+    """Test that a traceparent header's trace id becomes the latency exemplar when enabled."""
+    from prometheus_client.openmetrics.exposition import generate_latest
+    trace_id = "4bf92f3577b34da6a3ce929d0e0e4736"
+    _app(exemplars=True).get("/metrics-test/items/5", headers={
+        "traceparent": f"00-{trace_id}-00f067aa0ba902b7-01",
+    })
+    assert f'trace_id="{trace_id}"'.encode() in generate_latest(REGISTRY)
@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+from fastapi import APIRouter, Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import select, text
+
+from app.core import query_stats
+from app.core.query_stats import (
+    DB_N_PLUS_ONE,
+    DB_REQUEST_QUERIES,
+    request_queries,
+    statement_shape,
+    track_queries,
+)
+from app.models.transaction import Transaction
+
+
+def _observed(histogram, endpoint):
+    return histogram.labels(endpoint=endpoint)._sum.get()
+
+
+def test_statement_shape_ignores_literals_and_in_list_length():
+    """Test that statements differing only in literals or IN-list size share a shape."""
+    assert statement_shape("SELECT * FROM t WHERE id IN (?, ?, ?) AND x = 5") == \
+        statement_shape("SELECT  *\nFROM t WHERE id IN (?) AND x = 12")
+    assert statement_shape("SELECT * FROM t WHERE name = 'a'") == "SELECT * FROM t WHERE name = ?"
+    assert statement_shape("SELECT * FROM t WHERE id = $1") != statement_shape("SELECT * FROM u WHERE id = $1")
+
+
+@pytest.mark.asyncio
+async def test_track_queries_counts_statements_and_flags_n_plus_one(sqlite_engine):
+    """Test that a tracked block records its statements and a repeated shape is reported."""
+    endpoint = "/test/n-plus-one"
+    async with sqlite_engine.connect() as conn:
+        with track_queries(endpoint, n_plus_one_threshold=3) as queries:
+            await conn.execute(text("SELECT 1"))
+            for user_id in range(5):
+                await conn.execute(select(Transaction.id).where(Transaction.user_id == user_id))
+
+    assert queries.count == 6
+    assert queries.total >= queries.slowest > 0
+    assert queries.slowest_statement is not None
+    assert len(queries.repeated(3)) == 1
+    assert _observed(DB_REQUEST_QUERIES, endpoint) == 6
+    assert DB_N_PLUS_ONE.labels(endpoint=endpoint)._value.get() == 1
+
+
+@pytest.mark.asyncio
+async def test_unsampled_and_concurrent_requests_are_kept_apart(sqlite_engine):
+    """Test that unsampled blocks record nothing and concurrent blocks only see their own queries."""
+    async def run(endpoint, statements, sample_rate=1.0):
+        async with sqlite_engine.connect() as conn:
+            with track_queries(endpoint, sample_rate) as queries:
+                for _ in range(statements):
+                    await conn.execute(text("SELECT 1"))
+                    await asyncio.sleep(0)
+        return queries
+
+    unsampled, first, second = await asyncio.gather(run("/test/off", 3, 0.0), run("/test/a", 2), run("/test/b", 4))
+    assert unsampled is None
+    assert (first.count, second.count) == (2, 4)
+    assert query_stats._current.get() is None
+
+
+def test_dependency_labels_metrics_with_the_route_template(sqlite_engine, monkeypatch):
+    """Test that the router dependency tracks queries run by the endpoint under its route template."""
+    monkeypatch.setattr(query_stats, "_settings", type("S", (), {
+        "DB_QUERY_SAMPLE_RATE": 1.0, "DB_N_PLUS_ONE_THRESHOLD": 10,
+    })())
+    router = APIRouter(dependencies=[Depends(request_queries)])
+
+    @router.get("/items/{item_id}")
+    async def read_item(item_id: int):
+        async with sqlite_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            await conn.execute(text("SELECT 2"))
+        return {"id": item_id}
+
+    app = FastAPI()
+    app.include_router(router, prefix="/test")
+    assert TestClient(app).get("/test/items/7").json() == {"id": 7}
+    assert _observed(DB_REQUEST_QUERIES, "/test/items/{item_id}") == 2
@@ -0,0 +1,175 @@
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from app.core import rate_limit as rate_limit_module
+from app.core.rate_limit import (
+    RATE_LIMIT_FALLBACKS,
+    Limit,
+    MemoryBuckets,
+    RateLimiter,
+    get_rate_limiter,
+    parse_limits,
+    parse_networks,
+    rate_limit,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeRedis:
+    """Records script calls and answers them with ``reply``, or raises it if it is an exception."""
+
+    def __init__(self, reply):
+        self.reply = reply
+        self.calls = []
+
+    def register_script(self, script):
+        async def run(keys, args):
+            self.calls.append((keys, args))
+            if isinstance(self.reply, Exception):
+                raise self.reply
+            return self.reply
+        return run
+
+
+def test_parse_limits():
+    """Test that "group=count/seconds" entries become capacities and refill rates."""
+    assert parse_limits("default=120/60, analytics=10/5") == {
+        "default": Limit(120.0, 2.0), "analytics": Limit(10.0, 2.0),
+    }
+    with pytest.raises(ValueError):
+        parse_limits("analytics=10")
+
+
+def test_memory_buckets_allow_bursts_then_refill(monkeypatch):
+    """Test that a bucket admits its capacity at once, then one request per refill interval."""
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limit_module.time, "monotonic", clock)
+    buckets = MemoryBuckets()
+    user = [("user", Limit(3, 1.0))]
+
+    assert [buckets.take(user).allowed for _ in range(4)] == [True, True, True, False]
+    assert buckets.take(user).retry_after == pytest.approx(1.0)
+    clock.now += 1.0
+    assert buckets.take(user).allowed
+    assert not buckets.take(user).allowed
+
+
+def test_every_bucket_must_have_a_token(monkeypatch):
+    """Test that an exhausted user bucket limits the request without draining the IP bucket."""
+    monkeypatch.setattr(rate_limit_module.time, "monotonic", FakeClock())
+    buckets = MemoryBuckets()
+    user, ip = ("user", Limit(1, 0.1)), ("ip", Limit(2, 0.1))
+
+    assert buckets.take([user, ip]) == (True, 0.0, 0)
+    assert not buckets.take([user, ip]).allowed
+    # The denied request left the shared IP bucket's last token for someone else
+    assert buckets.take([("other", Limit(1, 0.1)), ip]).allowed
+
+
+@pytest.mark.asyncio
+async def test_redis_is_called_once_per_check_with_all_buckets():
+    """Test that one script call covers the user and IP buckets, with the IP limit scaled."""
+    redis = FakeRedis([0, 1500, 0])
+    limiter = RateLimiter({"default": Limit(10, 1.0)}, redis, secret="s", ip_multiplier=4)
+
+    decision = await limiter.check("analytics", "token", "10.0.0.1")
+    assert decision == (False, 1.5, 0)
+    assert len(redis.calls) == 1
+    keys, args = redis.calls[0]
+    assert [key.split(":")[1:3] for key in keys] == [["analytics", "user"], ["analytics", "ip"]]
+    assert "token" not in "".join(keys) and "10.0.0.1" not in "".join(keys)
+    assert args == [10, 0.001, 40, 0.004, 1]
+
+
+@pytest.mark.asyncio
+async def test_falls_back_in_process_while_redis_is_down():
+    """Test that a Redis failure switches to in-process buckets without retrying Redis every request."""
+    redis = FakeRedis(ConnectionError("refused"))
+    limiter = RateLimiter({"default": Limit(2, 0.01)}, redis)
+    fallbacks = RATE_LIMIT_FALLBACKS._value.get()
+
+    results = [(await limiter.check("analytics", "token", None)).allowed for _ in range(3)]
+    assert results == [True, True, False]
+    assert len(redis.calls) == 1
+    assert RATE_LIMIT_FALLBACKS._value.get() == fallbacks + 3
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_is_not_counted_as_a_fallback():
+    """Test that in-process buckets chosen by configuration do not count as Redis failures."""
+    limiter = RateLimiter({"default": Limit(2, 0.01)})
+    fallbacks = RATE_LIMIT_FALLBACKS._value.get()
+
+    await limiter.check("analytics", "token", None)
+    assert RATE_LIMIT_FALLBACKS._value.get() == fallbacks
+
+
+def test_empty_secret_is_refused_outside_debug(monkeypatch):
+    """Test that the limiter is not built with an empty hashing key unless debugging."""
+    monkeypatch.setattr(rate_limit_module, "_rate_limiter", None)
+    monkeypatch.setenv("RATE_LIMIT_SECRET", "")
+    monkeypatch.setenv("RATE_LIMIT_BACKEND", "memory")
+    monkeypatch.setenv("DEBUG", "false")
+    with pytest.raises(ValueError):
+        get_rate_limiter()
+
+    monkeypatch.setenv("DEBUG", "true")
+    assert get_rate_limiter() is not None
+
+
+def test_client_ip_is_forwarded_only_by_trusted_proxies():
+    """Test that X-Forwarded-For is believed from a trusted proxy, and only its nearest untrusted hop."""
+    limiter = RateLimiter({"default": Limit(1, 1.0)}, trusted_proxies=parse_networks("10.0.0.0/8, 127.0.0.1"))
+
+    assert limiter.client_ip("203.0.113.9", ["198.51.100.1"]) == "203.0.113.9"
+    assert limiter.client_ip("10.0.0.2", ["198.51.100.1"]) == "198.51.100.1"
+    # A client-supplied entry to the left of the proxy's does not move the bucket
+    assert limiter.client_ip("10.0.0.2", ["6.6.6.6, 198.51.100.1"]) == "198.51.100.1"
+    assert limiter.client_ip("10.0.0.2", ["198.51.100.1", "10.0.0.7"]) == "198.51.100.1"
+    assert limiter.client_ip("10.0.0.2", []) == "10.0.0.2"
+
+
+def test_dependency_answers_429_with_retry_after(monkeypatch):
+    """Test that a client over its group's limit gets 429 and a Retry-After header."""
+    monkeypatch.setattr(rate_limit_module, "_rate_limiter", RateLimiter({"default": Limit(2, 0.5)}))
+    app = FastAPI()
+
+    @app.get("/rate-limit-test", dependencies=[Depends(rate_limit("analytics"))])
+    async def endpoint():
+        return {"ok": True}
+
+    client = TestClient(app)
+    headers = {"Authorization": "Bearer abc"}
+    assert [client.get("/rate-limit-test", headers=headers).status_code for _ in range(2)] == [200, 200]
+    limited = client.get("/rate-limit-test", headers=headers)
+    assert limited.status_code == 429
+    assert int(limited.headers["Retry-After"]) >= 1
+
+
+def test_proxied_clients_get_their_own_ip_buckets(monkeypatch):
+    """Test that clients behind the proxy are limited per forwarded address, not as one proxy address."""
+    limiter = RateLimiter({"default": Limit(1, 0.01)}, ip_multiplier=1, trusted_proxies=parse_networks("127.0.0.1"))
+    monkeypatch.setattr(rate_limit_module, "_rate_limiter", limiter)
+    app = FastAPI()
+
+    @app.get("/rate-limit-test", dependencies=[Depends(rate_limit("analytics"))])
+    async def endpoint():
+        return {"ok": True}
+
+    async def via_proxy(scope, receive, send):
+        # Every connection reaches the app from the local proxy
+        await app({**scope, "client": ("127.0.0.1", 40000)}, receive, send)
+
+    client = TestClient(via_proxy)
+    first = {"X-Forwarded-For": "198.51.100.1"}
+    assert client.get("/rate-limit-test", headers=first).status_code == 200
+    assert client.get("/rate-limit-test", headers=first).status_code == 429
+    assert client.get("/rate-limit-test", headers={"X-Forwarded-For": "198.51.100.2"}).status_code == 200
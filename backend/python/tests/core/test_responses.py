@@ -0,0 +1,71 @@
+import orjson
+import numpy as np
+import pytest
+from datetime import datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Dict, List
+
+from fastapi import Depends, FastAPI, Request
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+
+from app.core.responses import FastJSONResponse, fast_json
+
+
+class Period(str, Enum):
+    daily = "daily"
+
+
+class Report(BaseModel):
+    period: str
+    points: List[Dict[str, Any]]
+    generated_at: datetime
+
+
+def test_fast_json_response_encodes_service_values_natively():
+    """Test that models, Decimals, NumPy values, enums and datetimes are rendered without conversion."""
+    report = Report.model_construct(
+        period=Period.daily,
+        points=[{"value": np.float64(1.5), "count": np.int64(2), "total": Decimal("10.25")}],
+        generated_at=datetime(2024, 1, 1, 12),
+    )
+    body = orjson.loads(FastJSONResponse({"report": report, "series": np.arange(3)}).body)
+
+    assert body == {
+        "report": {
+            "period": "daily",
+            "points": [{"value": 1.5, "count": 2, "total": 10.25}],
+            "generated_at": "2024-01-01T12:00:00",
+        },
+        "series": [0, 1, 2],
+    }
+
+
+def test_fast_json_skips_response_model_and_keeps_dependency_headers():
+    """Test the decorated endpoint in an app, and called directly."""
+    def set_headers(request: Request):
+        request.state.response_headers = {"ETag": 'W/"abc"'}
+
+    @fast_json
+    async def report(days: int = 7):
+        return Report.model_construct(period="daily", points=[{"days": days}], generated_at=datetime(2024, 1, 1))
+
+    app = FastAPI()
+    app.get("/report", response_model=Report, dependencies=[Depends(set_headers)])(report)
+    response = TestClient(app).get("/report?days=3")
+
+    assert response.status_code == 200
+    assert response.headers["etag"] == 'W/"abc"'
+    assert response.json()["points"] == [{"days": 3}]
+    assert "Report" in str(app.openapi()["paths"]["/report"]["get"]["responses"]["200"])
+
+
+@pytest.mark.asyncio
+async def test_fast_json_passes_model_through_outside_requests():
+    """Test that calling the endpoint function directly still returns its model."""
+    @fast_json
+    async def report():
+        return Report.model_construct(period="daily", points=[], generated_at=datetime(2024, 1, 1))
+
+    assert isinstance(await report(), Report)
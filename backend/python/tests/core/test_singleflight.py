@@ -0,0 +1,73 @@
+import asyncio
+import pytest
+
+from app.core.singleflight import SINGLEFLIGHT_CALLS, SingleFlight
+
+
+def _calls(group, role):
+    return SINGLEFLIGHT_CALLS.labels(group=group, role=role)._value.get()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_computation():
+    """Test that identical concurrent calls run once and all receive the result."""
+    flight = SingleFlight("test-share")
+    runs = []
+
+    async def compute():
+        runs.append(1)
+        await asyncio.sleep(0.01)
+        return {"value": 42}
+
+    results = await asyncio.gather(*[flight.do("key", compute) for _ in range(5)])
+
+    assert len(runs) == 1
+    assert all(result is results[0] for result in results)
+    assert _calls("test-share", "leader") == 1
+    assert _calls("test-share", "follower") == 4
+
+    # Nothing is cached once the call completes
+    await flight.do("key", compute)
+    assert len(runs) == 2
+
+
+@pytest.mark.asyncio
+async def test_different_keys_run_separately_and_errors_are_shared():
+    """Test that keys are independent and a leader's exception reaches its followers."""
+    flight = SingleFlight("test-errors")
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    async def succeed():
+        return "ok"
+
+    results = await asyncio.gather(
+        flight.do("bad", fail), flight.do("bad", fail), flight.do("good", succeed), return_exceptions=True
+    )
+    assert [type(r) for r in results[:2]] == [RuntimeError, RuntimeError]
+    assert results[2] == "ok"
+
+
+@pytest.mark.asyncio
+async def test_follower_takes_over_when_leader_is_cancelled():
+    """Test that cancelling the leader does not fail the requests waiting on it."""
+    flight = SingleFlight("test-cancel")
+    started = asyncio.Event()
+
+    async def compute():
+        started.set()
+        await asyncio.sleep(0.01)
+        return "done"
+
+    leader = asyncio.create_task(flight.do("key", compute))
+    await started.wait()
+    follower = asyncio.create_task(flight.do("key", compute))
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    assert await follower == "done"
+    # Each call is counted once, by the role it started in
+    assert _calls("test-cancel", "leader") == 1
+    assert _calls("test-cancel", "follower") == 1
@@ -0,0 +1,78 @@
+import json
+import numpy as np
+import pytest
+
+from app.core.stats import RunningMoments, TDigest
+
+
+def test_running_moments_match_numpy_however_the_stream_is_split():
+    """Test that batched updates and merges give the exact mean, std and range."""
+    values = np.random.default_rng(1).normal(100, 15, 10000)
+    batched = RunningMoments()
+    for chunk in np.array_split(values, 37):
+        batched.update(chunk)
+    merged = RunningMoments()
+    for chunk in np.array_split(values, 5):
+        merged.merge(RunningMoments().update(chunk))
+
+    for moments in (batched, merged):
+        assert moments.count == 10000
+        assert moments.mean == pytest.approx(values.mean())
+        assert moments.std == pytest.approx(values.std())
+        assert (moments.min, moments.max) == (values.min(), values.max())
+
+
+def test_tdigest_quantiles_have_small_rank_error_after_merging():
+    """Test that merged digests estimate p50/p90/p99 within 0.5% rank error."""
+    values = np.random.default_rng(2).lognormal(3, 1, 100000)
+    digest = TDigest()
+    for chunk in np.array_split(values, 60):
+        digest.merge(TDigest().update(chunk))
+
+    assert len(digest.means) <= digest.compression
+    for q in (0.5, 0.9, 0.99):
+        rank = (values <= digest.quantile(q)).mean()
+        assert rank == pytest.approx(q, abs=0.005)
+    assert digest.quantile(0) == values.min()
+    assert digest.quantile(1) == values.max()
+
+
+def test_summaries_round_trip_through_json():
+    """Test that serialized summaries restore to the same state."""
+    values = np.arange(1, 101, dtype=float)
+    moments = RunningMoments.from_dict(json.loads(json.dumps(RunningMoments().update(values).to_dict())))
+    digest = TDigest.from_dict(json.loads(json.dumps(TDigest().update(values).to_dict())))
+
+    assert (moments.count, moments.mean, moments.max) == (100, 50.5, 100)
+    assert digest.quantile(0.5) == pytest.approx(50.5, abs=1)
+    assert RunningMoments.from_dict(RunningMoments().to_dict()).count == 0
+    assert TDigest.from_dict(TDigest().to_dict()).quantile(0.5) == 0.0
+
+
+def test_count_min_sketch_never_undercounts_and_stays_within_bound():
+    """Test count-min estimates against exact per-key sums."""
+    import pandas as pd
+    from app.core.stats import CountMinSketch
+    rng = np.random.default_rng(3)
+    keys = [f"category-{k}" for k in rng.integers(0, 500, 20000)]
+    weights = rng.random(20000) * 100
+    exact = pd.Series(weights).groupby(keys).sum()
+
+    sketch = CountMinSketch()
+    for chunk in np.array_split(np.arange(20000), 4):
+        sketch.merge(CountMinSketch().update([keys[i] for i in chunk], weights[chunk]))
+    estimates = sketch.estimate(exact.index)
+
+    assert (estimates >= exact.to_numpy() - 1e-6).all()
+    assert ((estimates - exact.to_numpy()) <= sketch.error_bound).mean() >= sketch.confidence
+    assert CountMinSketch.from_dict(sketch.to_dict()).estimate(["category-1"]) == sketch.estimate(["category-1"])
+
+
+def test_hyperloglog_counts_distinct_keys_within_its_error():
+    """Test HyperLogLog estimates for small and large cardinalities, across merges."""
+    from app.core.stats import HyperLogLog
+    for distinct in (100, 50000):
+        left = HyperLogLog().update([f"merchant-{i}" for i in range(distinct)])
+        right = HyperLogLog().update([f"merchant-{i}" for i in range(distinct // 2, distinct)])
+        merged = HyperLogLog.from_dict(left.merge(right).to_dict())
+        assert merged.count() == pytest.approx(distinct, rel=3 * merged.relative_error)
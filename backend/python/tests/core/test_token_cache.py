@@ -0,0 +1,161 @@
+import asyncio
+import time
+
+import pytest
+
+from app.core.token_cache import (
+    TOKEN_CACHE_LOOKUPS,
+    TOKEN_CACHE_SIZE,
+    SharedRevocations,
+    TokenRevoked,
+    VerifiedTokenCache,
+)
+
+
+class CountingVerifier:
+    """Stands in for verify_token, decoding tokens of the form "sub:jti:exp"."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, token):
+        self.calls += 1
+        sub, jti, exp = token.split(":")
+        return {"sub": sub, "jti": jti, "exp": float(exp) if exp else None}
+
+
+class FakeRedis:
+    """The strings and sets of one Redis server, shared by every client given it."""
+
+    def __init__(self):
+        self.values = {}
+
+    async def get(self, key):
+        value = self.values.get(key)
+        return None if value is None else str(value).encode()
+
+    async def incr(self, key):
+        self.values[key] = self.values.get(key, 0) + 1
+        return self.values[key]
+
+    async def sadd(self, key, member):
+        self.values.setdefault(key, set()).add(member.encode())
+
+    async def smembers(self, key):
+        return set(self.values.get(key, set()))
+
+
+def _lookups(result):
+    return TOKEN_CACHE_LOOKUPS.labels(result=result)._value.get()
+
+
+def test_repeat_tokens_are_served_from_cache_until_exp():
+    """Test that a token is verified once, then served from cache until it expires."""
+    cache, verify = VerifiedTokenCache(), CountingVerifier()
+    token = f"alice:t1:{time.time() + 60}"
+    hits = _lookups("hit")
+
+    assert cache.get_or_verify(token, verify)["sub"] == "alice"
+    assert cache.get_or_verify(token, verify) == cache.get_or_verify(token, verify)
+    assert verify.calls == 1
+    assert _lookups("hit") == hits + 2
+
+    expired = f"bob:t2:{time.time() - 1}"
+    cache.get_or_verify(expired, verify)
+    cache.get_or_verify(expired, verify)
+    no_exp = "carol:t3:"
+    cache.get_or_verify(no_exp, verify)
+    cache.get_or_verify(no_exp, verify)
+    assert verify.calls == 5
+
+
+def test_cache_is_bounded_and_evicts_least_recently_used():
+    """Test that the oldest unused entry is dropped once the cache is full."""
+    cache, verify = VerifiedTokenCache(max_size=2), CountingVerifier()
+    exp = time.time() + 60
+    first, second, third = (f"u{i}:t{i}:{exp}" for i in range(3))
+    cache.get_or_verify(first, verify)
+    cache.get_or_verify(second, verify)
+    cache.get_or_verify(first, verify)
+    cache.get_or_verify(third, verify)
+    assert verify.calls == 3
+
+    cache.get_or_verify(first, verify)
+    assert verify.calls == 3
+    cache.get_or_verify(second, verify)
+    assert verify.calls == 4
+
+
+def test_revocation_bumps_the_generation_and_denies_tokens():
+    """Test that revoking a token id or subject invalidates cached payloads and rejects the tokens."""
+    cache, verify = VerifiedTokenCache(), CountingVerifier()
+    exp = time.time() + 60
+    kept, revoked, other = f"alice:t1:{exp}", f"alice:t2:{exp}", f"mallory:t3:{exp}"
+    for token in (kept, revoked, other):
+        cache.get_or_verify(token, verify)
+
+    cache.revoke(jti="t2")
+    assert cache.generation == 1
+    with pytest.raises(TokenRevoked):
+        cache.get_or_verify(revoked, verify)
+    assert cache.get_or_verify(kept, verify)["jti"] == "t1"
+    assert verify.calls == 5
+
+    cache.sync(2, {"t2"}, {"mallory"})
+    with pytest.raises(TokenRevoked):
+        cache.get_or_verify(other, verify)
+    cache.get_or_verify(kept, verify)
+    cache.get_or_verify(kept, verify)
+    assert verify.calls == 7
+
+
+def test_size_gauge_follows_removals():
+    """Test that the entries gauge drops when stale or expired entries are removed, not only on inserts."""
+    cache, verify = VerifiedTokenCache(), CountingVerifier()
+    token = f"alice:t1:{time.time() + 60}"
+    cache.get_or_verify(token, verify)
+    assert TOKEN_CACHE_SIZE._value.get() == 1
+
+    cache.revoke(jti="t1")
+    with pytest.raises(TokenRevoked):
+        cache.get_or_verify(token, verify)
+    assert TOKEN_CACHE_SIZE._value.get() == 0
+
+
+@pytest.mark.asyncio
+async def test_revocation_on_one_instance_is_seen_by_another():
+    """Test that a token revoked through one worker's sync is rejected by a second worker after it polls."""
+    redis, verify = FakeRedis(), CountingVerifier()
+    first, second = VerifiedTokenCache(), VerifiedTokenCache()
+    first_sync, second_sync = SharedRevocations(first, redis), SharedRevocations(second, redis)
+    token = f"alice:t1:{time.time() + 60}"
+    second.get_or_verify(token, verify)
+
+    await first_sync.revoke(jti="t1")
+    with pytest.raises(TokenRevoked):
+        first.get_or_verify(token, verify)
+    # Served from the second worker's cache until it polls the shared generation
+    assert second.get_or_verify(token, verify)["jti"] == "t1"
+
+    await second_sync.pull()
+    assert second.generation == first.generation == 1
+    with pytest.raises(TokenRevoked):
+        second.get_or_verify(token, verify)
+
+
+@pytest.mark.asyncio
+async def test_revocation_sync_polls_in_the_background():
+    """Test that the started loop picks up revocations made elsewhere without an explicit pull."""
+    redis = FakeRedis()
+    cache = VerifiedTokenCache()
+    sync = SharedRevocations(cache, redis, interval=0.01)
+    sync.start()
+    try:
+        await SharedRevocations(VerifiedTokenCache(), redis).revoke(subject="mallory")
+        for _ in range(100):
+            if cache.generation:
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        await sync.stop()
+    assert cache.revoked_subjects == {"mallory"}
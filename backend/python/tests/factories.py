@@ -0,0 +1,29 @@
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import insert
+
+from app.models.transaction import Transaction, TransactionType
+
+
+def make_transaction(user_id=1, amount="10.00", type=TransactionType.EXPENSE, category="Groceries",
+                     transaction_date=None, **fields):
+    """Builds a row dict for inserting a transaction."""
+    now = datetime.utcnow()
+    return {
+        "user_id": user_id,
+        "amount": Decimal(amount),
+        "type": type,
+        "category": category,
+        "description": fields.pop("description", f"{category} purchase"),
+        "transaction_date": transaction_date or now,
+        "created_at": now,
+        "updated_at": fields.pop("updated_at", now),
+        **fields,
+    }
+
+
+async def insert_transactions(engine, rows):
+    """Inserts transaction row dicts in a single statement."""
+    async with engine.begin() as conn:
+        await conn.execute(insert(Transaction), rows)
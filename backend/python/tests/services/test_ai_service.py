@@ -29,13 +29,13 @@ def mock_transactions():
     ]
 
 @pytest.fixture
-def ai_service():
+def ai_service(tmp_path):
     """Fixture to create an AIService instance with mocked models."""
     with patch('joblib.load') as mock_joblib_load, \
          patch('joblib.dump') as mock_joblib_dump, \
          patch('os.path.exists', return_value=True):
 
-        service = AIService()
+        service = AIService(model_path=str(tmp_path))
         # Mock the models to avoid actual loading/training
         service.spending_model = MagicMock()
         service.anomaly_detector = MagicMock()
@@ -193,3 +193,65 @@ def test_detect_anomalies_success(ai_service, mock_transactions):
     assert anomalies[0]["transaction_id"] == 1
     assert anomalies[1]["transaction_id"] == 4
     assert anomalies[0]["severity"] == "high"
+
+def test_predict_spending_batch(ai_service):
+    """Test that a batch is predicted with one call per tree and one result per feature set."""
+    tree_a, tree_b = MagicMock(), MagicMock()
+    tree_a.predict.return_value = np.array([1.0, 3.0])
+    tree_b.predict.return_value = np.array([3.0, 5.0])
+    ai_service.spending_model.estimators_ = [tree_a, tree_b]
+    ai_service.scaler.transform.return_value = np.zeros((2, 7))
+
+    results = ai_service.predict_spending_batch([{'day_of_week': 1}, {'month': 5}])
+
+    assert [r["predicted_amount"] for r in results] == [2.0, 4.0]
+    assert [r["confidence"] for r in results] == [0.5, 0.5]
+    tree_a.predict.assert_called_once()
+    assert ai_service.scaler.transform.call_args[0][0].shape == (2, 7)
+
+def test_predict_spending_batch_no_model(ai_service):
+    """Test that every request in a batch reports a missing model."""
+    ai_service.spending_model = None
+    assert [r["success"] for r in ai_service.predict_spending_batch([{}, {}])] == [False, False]
+
+class FormulaDetector:
+    """A stand-in detector whose scores depend on every feature, including the rolling and category ones."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def decision_function(self, X):
+        self.calls += 1
+        X = np.asarray(X, dtype=float)
+        return 0.3 - X[:, 0] / (X[:, 6] + 1) + 0.05 * X[:, 5] + 0.001 * X[:, 7]
+
+    def predict(self, X):
+        return np.where(self.decision_function(X) < 0, -1, 1)
+
+def test_detect_anomalies_batch_matches_per_user_detection(ai_service):
+    """Test that scoring users together flags the same transactions as scoring each user alone, in one model call."""
+    ai_service.scaler = MagicMock(transform=lambda X: np.asarray(X, dtype=float))
+    ai_service.anomaly_detector = FormulaDetector()
+    categories = ['Groceries', 'Transport', None, 'Rent']
+    transactions_by_user = {
+        user_id: [
+            {'id': user_id * 100 + i, 'amount': float((i * 37 + user_id * 11) % 90 + 5),
+             'category': categories[(i + user_id) % 4], 'description': f'Purchase {i}',
+             'transaction_date': datetime(2023, 1, 1, 8) + pd.Timedelta(hours=7 * i + user_id)}
+            for i in range(count)
+        ]
+        for user_id, count in [(1, 12), (2, 1), (3, 0), (4, 9)]
+    }
+
+    expected = {user_id: ai_service.detect_anomalies(t) for user_id, t in transactions_by_user.items()}
+    ai_service.anomaly_detector.calls = 0
+    results = ai_service.detect_anomalies_batch(transactions_by_user)
+
+    assert results == expected
+    assert sum(map(len, results.values())) > 0
+    assert ai_service.anomaly_detector.calls == 1
+
+def test_detect_anomalies_batch_no_model(ai_service, mock_transactions):
+    """Test that every user gets an empty result when the detector is not trained."""
+    ai_service.anomaly_detector = None
+    assert ai_service.detect_anomalies_batch({1: mock_transactions, 2: []}) == {1: [], 2: []}
@@ -0,0 +1,336 @@
+import pytest
+import pytest_asyncio
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.transaction import TransactionType
+from app.services.analytics_service import AnalyticsService, day_window
+from tests.factories import insert_transactions, make_transaction
+
+START = datetime(2024, 1, 1)
+END = datetime(2024, 3, 31, 23, 59)
+
+
+@pytest_asyncio.fixture
+async def service(sqlite_engine):
+    """Fixture providing an AnalyticsService over a small seeded history."""
+    await insert_transactions(sqlite_engine, [
+        make_transaction(amount="3000.00", type=TransactionType.INCOME, category="Salary",
+                         transaction_date=datetime(2024, 1, 1, 9)),
+        make_transaction(amount="100.00", category="Groceries", transaction_date=datetime(2024, 1, 2, 10)),
+        make_transaction(amount="50.50", category="Groceries", transaction_date=datetime(2024, 1, 2, 18)),
+        make_transaction(amount="40.00", category="Transport", transaction_date=datetime(2024, 1, 5, 8)),
+        make_transaction(amount="3000.00", type=TransactionType.INCOME, category="Salary",
+                         transaction_date=datetime(2024, 2, 1, 9)),
+        make_transaction(amount="900.00", category="Rent", transaction_date=datetime(2024, 2, 3, 9)),
+        # Another user's and out-of-window rows must never be counted
+        make_transaction(user_id=2, amount="999.00", transaction_date=datetime(2024, 1, 3)),
+        make_transaction(amount="999.00", transaction_date=START - timedelta(days=1)),
+    ])
+    async with AsyncSession(sqlite_engine) as session:
+        yield AnalyticsService(session)
+
+
+@pytest.mark.asyncio
+async def test_totals_and_count(service):
+    """Test income, expense and count totals for one user's window."""
+    assert await service.get_total_income(1, START, END) == Decimal("6000.00")
+    assert await service.get_total_expenses(1, START, END) == Decimal("1090.50")
+    assert await service.get_transaction_count(1, START, END) == 6
+
+
+@pytest.mark.asyncio
+async def test_top_spending_categories(service):
+    """Test that categories are ordered by amount spent."""
+    top = await service.get_top_spending_categories(1, START, END, limit=2)
+    assert [c["category"] for c in top] == ["Rent", "Groceries"]
+    assert top[1] == {"category": "Groceries", "total_spent": 150.5, "transaction_count": 2}
+
+
+@pytest.mark.asyncio
+async def test_daily_spending_and_monthly_trends(service):
+    """Test per-day spending and per-month rollups."""
+    assert await service.get_daily_spending(1, START, END) == [150.5, 40.0, 900.0]
+
+    trends = await service.get_monthly_trends(1, START, END)
+    assert trends["2024-01"] == {"income": 3000.0, "expenses": 190.5, "net_savings": 2809.5}
+    assert trends["2024-02"]["expenses"] == 900.0
+
+
+@pytest.mark.asyncio
+async def test_category_analysis(service):
+    """Test single-category and all-category summaries."""
+    groceries = await service.analyze_category(1, "Groceries", START, END)
+    assert groceries["transaction_count"] == 2
+    assert groceries["largest_transaction"] == 100.0
+    assert groceries["share_of_expenses"] == pytest.approx(150.5 / 1090.5 * 100)
+
+    everything = await service.analyze_all_categories(1, START, END)
+    assert everything["total_expenses"] == pytest.approx(1090.5)
+    assert len(everything["categories"]) == 3
+
+
+@pytest.mark.asyncio
+async def test_trend_analysis_rejects_unknown_period(service):
+    """Test that unsupported periods are rejected."""
+    with pytest.raises(ValueError):
+        await service.get_trend_analysis(1, period="hourly")
+
+
+@pytest.mark.asyncio
+async def test_batch_overviews_match_single_user_queries(service, sqlite_engine):
+    """Test that the batch overview agrees with the per-user methods, one query per chunk."""
+    from sqlalchemy import event, insert
+    from app.models.transaction import User
+    async with sqlite_engine.begin() as conn:
+        await conn.execute(insert(User), [
+            {"id": i, "username": f"user{i}", "email": f"user{i}@example.com"} for i in (1, 2, 3)
+        ])
+
+    statements = []
+    event.listen(sqlite_engine.sync_engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    overviews = [o async for o in service.get_overviews([1, 2, 3], START, END, chunk_size=2)]
+    assert len(statements) == 2
+
+    first = overviews[0]
+    assert first["user_id"] == 1
+    assert first["total_income"] == float(await service.get_total_income(1, START, END))
+    assert first["total_expenses"] == float(await service.get_total_expenses(1, START, END))
+    assert first["transaction_count"] == await service.get_transaction_count(1, START, END)
+    assert first["top_categories"] == await service.get_top_spending_categories(1, START, END)
+    assert first["savings_rate"] == pytest.approx((6000 - 1090.5) / 6000 * 100)
+
+    assert overviews[1]["total_expenses"] == 999.0
+    assert overviews[2] == {
+        "user_id": 3, "total_income": 0.0, "total_expenses": 0.0, "net_savings": 0.0,
+        "savings_rate": 0.0, "transaction_count": 0, "top_categories": [],
+    }
+
+    # Without ids every user is reported, in id order
+    assert [o["user_id"] async for o in service.get_overviews(None, START, END)] == [1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_watermark_changes_with_new_or_updated_rows(service, sqlite_engine):
+    """Test that the watermark moves when the user's transactions change, and only then."""
+    from sqlalchemy import update
+    from app.models.transaction import Transaction
+    before = await service.get_watermark(1)
+    assert before[0] == 7
+    assert await service.get_watermark(1) == before
+
+    await insert_transactions(sqlite_engine, [make_transaction(user_id=2)])
+    assert await service.get_watermark(1) == before
+
+    async with sqlite_engine.begin() as conn:
+        await conn.execute(update(Transaction).where(Transaction.id == 1).values(
+            amount=Decimal("1.00"), updated_at=datetime(2099, 1, 1)
+        ))
+    assert await service.get_watermark(1) == (7, datetime(2099, 1, 1))
+
+
+@pytest.fixture(autouse=True)
+def clear_month_summaries():
+    """Fixture isolating the process-wide per-month state caches between tests."""
+    from app.services import analytics_service
+    analytics_service._month_summaries.clear()
+    analytics_service._month_sketches.clear()
+    yield
+    analytics_service._month_summaries.clear()
+    analytics_service._month_sketches.clear()
+
+
+def _count_daily_queries(engine):
+    from sqlalchemy import event
+    statements = []
+    event.listen(engine.sync_engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    return lambda: sum("GROUP BY date(" in s for s in statements)
+
+
+@pytest.mark.asyncio
+async def test_spending_stats_match_exact_computation(service):
+    """Test that merged month summaries agree with the per-day figures."""
+    import numpy as np
+    stats = await service.get_spending_stats(1, START, END)
+    daily = await service.get_daily_spending(1, START, END)
+
+    assert stats["avg_daily_spending"] == pytest.approx(np.mean(daily))
+    assert stats["spending_volatility"] == pytest.approx(np.std(daily))
+    assert stats["max_spending_day"] == max(daily)
+    assert stats["min_spending_day"] == min(daily)
+    assert stats["p50_daily_spending"] == pytest.approx(np.median(daily))
+    assert min(daily) <= stats["p90_daily_spending"] <= stats["p99_daily_spending"] <= max(daily)
+    assert stats["monthly_trends"] == await service.get_monthly_trends(1, START, END)
+
+
+@pytest.mark.asyncio
+async def test_spending_stats_reuse_month_summaries_until_data_changes(service, sqlite_engine):
+    """Test that whole months are only re-aggregated when their transactions change."""
+    from sqlalchemy import update
+    from app.models.transaction import Transaction
+    daily_queries = _count_daily_queries(sqlite_engine)
+
+    first = await service.get_spending_stats(1, START, END)
+    assert daily_queries() == 2  # January-February summaries, then the partial March edge
+    assert await service.get_spending_stats(1, START, END) == first
+    assert daily_queries() == 3  # only the edge
+
+    # A new January transaction refreshes January alone
+    await insert_transactions(sqlite_engine, [make_transaction(amount="500.00", transaction_date=datetime(2024, 1, 20))])
+    refreshed = await service.get_spending_stats(1, START, END)
+    assert daily_queries() == 5
+    assert refreshed["max_spending_day"] == 900.0
+    assert refreshed["monthly_trends"]["2024-01"]["expenses"] == 690.5
+
+    # An update may move a transaction between months, so every month is recomputed
+    async with sqlite_engine.begin() as conn:
+        await conn.execute(update(Transaction).where(Transaction.amount == Decimal("900.00")).values(
+            transaction_date=datetime(2024, 1, 3), updated_at=datetime(2099, 1, 1)
+        ))
+    moved = await service.get_spending_stats(1, START, END)
+    assert moved["monthly_trends"]["2024-02"]["expenses"] == 0.0
+    assert moved["monthly_trends"]["2024-01"]["expenses"] == 1590.5
+
+
+@pytest.mark.asyncio
+async def test_precomputed_months_are_reused_after_a_restart(service, sqlite_engine, monkeypatch):
+    """Test that months persisted by the batch serve a fresh process without re-aggregating them."""
+    from app.services import analytics_service
+    expected_stats = await service.get_spending_stats(1, START, END)
+    expected_summary = await service.get_approximate_summary(1, START, END)
+    await service.precompute_months(1, 120)
+    await service.db.commit()
+
+    analytics_service._month_summaries.clear()
+    analytics_service._month_sketches.clear()
+    async with AsyncSession(sqlite_engine) as session:
+        fresh = AnalyticsService(session)
+        built = []
+        for name in ("_build_month_summaries", "_build_month_sketches"):
+            original = getattr(fresh, name)
+
+            async def recording(user_id, start, end, original=original):
+                built.append(start)
+                return await original(user_id, start, end)
+
+            monkeypatch.setattr(fresh, name, recording)
+        assert await fresh.get_spending_stats(1, START, END) == expected_stats
+        assert await fresh.get_approximate_summary(1, START, END) == expected_summary
+
+    # Only the partial March edge was read from the transactions table
+    assert built == [datetime(2024, 3, 1)] * 2
+
+
+def test_month_state_cache_is_bounded_by_bytes():
+    """Test that the least recently used users are evicted once the packed state exceeds the byte budget."""
+    from app.services.analytics_service import MonthStateCache
+    cache = MonthStateCache(max_users=10, max_bytes=100)
+    cache.put(1, (1, None), {"2024-01": b"x" * 60})
+    cache.put(2, (1, None), {"2024-01": b"x" * 30})
+    cache.put(3, (1, None), {"2024-01": b"x" * 30})
+
+    assert cache.pop(1) is None
+    assert cache.nbytes == 60 and len(cache) == 2
+    cache.put(4, (1, None), {"2024-01": b"x" * 500})  # a single oversized user is still kept
+    assert len(cache) == 1 and cache.nbytes == 500
+
+
+@pytest.mark.asyncio
+async def test_approximate_summary_agrees_with_exact_queries(service):
+    """Test that sketch answers match the exact methods on a small history, with bounds attached."""
+    summary = await service.get_approximate_summary(1, START, END)
+
+    assert summary["total_income"] == float(await service.get_total_income(1, START, END))
+    assert summary["total_expenses"] == float(await service.get_total_expenses(1, START, END))
+    assert summary["transaction_count"] == await service.get_transaction_count(1, START, END)
+    exact = await service.get_top_spending_categories(1, START, END, limit=None)
+    assert summary["categories"] == exact
+    assert summary["distinct_merchants"] == 4  # one description per category
+    assert summary["error_bounds"]["category_spend_abs"] == pytest.approx(1090.5 * 2.718281828 / 256)
+
+    single = await service.get_approximate_category_analysis(1, START, END, "Groceries")
+    assert single["analysis_data"]["total_spent"] == 150.5
+    assert single["analysis_data"]["share_of_expenses"] == pytest.approx(150.5 / 1090.5 * 100)
+
+
+@pytest.mark.asyncio
+async def test_trend_analysis_downsamples_long_series(service, sqlite_engine):
+    """Test that daily trends are reduced to max_points with either method."""
+    today = datetime.now().replace(hour=12, minute=0, second=0, microsecond=0)
+    await insert_transactions(sqlite_engine, [
+        make_transaction(user_id=3, amount=f"{10 + i % 7}.00", transaction_date=today - timedelta(days=i))
+        for i in range(300)
+    ])
+
+    full = await service.get_trend_analysis(3, period="daily", days=400)
+    lttb_points = await service.get_trend_analysis(3, period="daily", days=400, max_points=50)
+    minmax_points = await service.get_trend_analysis(3, period="daily", days=400, max_points=50,
+                                                     downsample="minmax")
+
+    assert len(full) == 300
+    assert len(lttb_points) == len(minmax_points) == 50
+    assert lttb_points[0] == full[0] and lttb_points[-1] == full[-1]
+    assert {p["period"] for p in lttb_points} <= {p["period"] for p in full}
+    assert all(p["min"] <= p["value"] <= p["max"] for p in minmax_points)
+    assert min(p["min"] for p in minmax_points) == 10.0
+    with pytest.raises(ValueError):
+        await service.get_trend_analysis(3, period="daily", max_points=2)
+
+
+@pytest.mark.asyncio
+async def test_trend_periods_are_labelled_by_their_first_day(service, sqlite_engine):
+    """Test that weekly points are labelled by their Monday and monthly points by the 1st of the month."""
+    today = datetime.now().replace(hour=12, minute=0, second=0, microsecond=0)
+    dates = [today - timedelta(days=d) for d in (40, 20, 1)]
+    await insert_transactions(sqlite_engine, [
+        make_transaction(user_id=4, amount="10.00", transaction_date=d) for d in dates
+    ])
+
+    weekly = await service.get_trend_analysis(4, period="weekly", days=60)
+    monthly = await service.get_trend_analysis(4, period="monthly", days=60)
+
+    mondays = {(d - timedelta(days=d.weekday())).strftime("%Y-%m-%d") for d in dates}
+    assert {p["period"] for p in weekly if p["value"]} == mondays
+    assert weekly[0]["period"] == min(mondays)
+    assert {p["period"] for p in monthly if p["value"]} == {d.strftime("%Y-%m-01") for d in dates}
+    assert all(p["period"].endswith("-01") for p in monthly)
+    assert sum(p["value"] for p in weekly) == sum(p["value"] for p in monthly) == 30.0
+
+
+@pytest.mark.asyncio
+async def test_amounts_are_aggregated_exactly_in_cents(sqlite_engine):
+    """Test that sums of amounts that are inexact in binary floating point come out exact."""
+    await insert_transactions(sqlite_engine, [
+        make_transaction(amount=amount, category="Coffee", transaction_date=datetime(2024, 1, 2, hour))
+        for hour, amount in enumerate(["0.10", "0.20", "0.10", "0.20", "0.10", "0.20", "19.99"], start=8)
+    ])
+    async with AsyncSession(sqlite_engine) as session:
+        service = AnalyticsService(session)
+        assert await service.get_total_expenses(1, START, END) == Decimal("20.89")
+        assert await service.get_daily_spending(1, START, END) == [20.89]
+        assert (await service.get_monthly_trends(1, START, END))["2024-01"]["expenses"] == 20.89
+        assert (await service.analyze_category(1, "Coffee", START, END))["largest_transaction"] == 19.99
+        assert (await service.get_spending_stats(1, START, END))["monthly_trends"]["2024-01"]["expenses"] == 20.89
+        overview = [o async for o in service.get_overviews([1], START, END)][0]
+        assert overview["top_categories"] == [{"category": "Coffee", "total_spent": 20.89, "transaction_count": 7}]
+
+
+def test_day_window_depends_only_on_the_date():
+    """Test that the window runs from midnight ``days`` ago to the end of today, whatever the time of day."""
+    start, end = day_window(30, today=date(2024, 3, 31))
+    assert start == datetime(2024, 3, 1)
+    assert end.date() == date(2024, 3, 31) and end > datetime(2024, 3, 31, 23, 59, 59)
+
+
+@pytest.mark.asyncio
+async def test_transaction_records_can_be_limited_to_expenses(service):
+    """Test that records come oldest first and that the type filter leaves income out."""
+    records = await service.get_transaction_records(1, START, END)
+    assert [r["amount"] for r in records] == [3000.0, 100.0, 50.5, 40.0, 3000.0, 900.0]
+    assert records[0]["type"] == TransactionType.INCOME.value
+
+    expenses = await service.get_transaction_records(1, START, END, transaction_type=TransactionType.EXPENSE)
+    assert [r["amount"] for r in expenses] == [100.0, 50.5, 40.0, 900.0]
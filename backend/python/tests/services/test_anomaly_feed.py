@@ -0,0 +1,103 @@
+from contextlib import asynccontextmanager
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.services import anomaly_feed
+from app.services.anomaly_feed import AnomalyFeed, TooManyStreams, format_sse, publish_new_anomalies
+
+
+def drain(subscription):
+    events = []
+    while not subscription.queue.empty():
+        events.append(subscription.queue.get_nowait())
+    return events
+
+
+@pytest.mark.asyncio
+async def test_events_fan_out_to_every_stream_of_the_user_only():
+    """Test that each of a user's streams receives their events and other users' streams do not."""
+    feed = AnomalyFeed()
+    with feed.subscribe(1) as first, feed.subscribe(1) as second, feed.subscribe(2) as other:
+        event = feed.publish(1, {"transaction_id": 7, "anomaly_score": -0.6})
+
+        assert drain(first) == drain(second) == [event]
+        assert drain(other) == []
+
+    message = format_sse(feed, event).decode()
+    assert message.startswith(f"id: {feed.boot}-{event.seq}\nevent: anomaly\n")
+    assert '"transaction_id":7' in message and message.endswith("\n\n")
+
+
+@pytest.mark.asyncio
+async def test_resuming_replays_missed_events_or_asks_for_a_rescan():
+    """Test resume from Last-Event-ID, and the reset sent when the history cannot cover the gap."""
+    feed = AnomalyFeed(history=3)
+    events = [feed.publish(1, {"n": n}) for n in range(3)]
+
+    with feed.subscribe(1, feed.event_id(events[0])) as resumed:
+        assert [e.data["n"] for e in drain(resumed)] == [1, 2]
+    with feed.subscribe(1, "another-process-3") as restarted:
+        assert [e.kind for e in drain(restarted)] == ["reset"]
+
+    # Two more events push events 0 and 1 out of the three-event history
+    feed.publish(1, {"n": 3})
+    feed.publish(1, {"n": 4})
+    with feed.subscribe(1, feed.event_id(events[0])) as too_old:
+        assert [e.kind for e in drain(too_old)] == ["reset"]
+    with feed.subscribe(1, feed.event_id(events[2])) as recent:
+        assert [e.data["n"] for e in drain(recent)] == [3, 4]
+
+
+@pytest.mark.asyncio
+async def test_slow_streams_are_cut_off_without_blocking_the_publisher():
+    """Test that a full stream is marked overflowed, and resuming from its last event recovers the rest."""
+    feed = AnomalyFeed(queue_size=2)
+    with feed.subscribe(1) as slow:
+        events = [feed.publish(1, {"n": n}) for n in range(4)]
+        assert slow.overflowed
+        delivered = slow.queue.get_nowait()
+
+    with feed.subscribe(1, feed.event_id(delivered)) as resumed:
+        # Three missed events do not fit a two-event queue, so the client is told to rescan
+        assert [e.kind for e in drain(resumed)] == ["reset"]
+    with feed.subscribe(1, feed.event_id(events[1])) as resumed:
+        assert [e.data["n"] for e in drain(resumed)] == [2, 3]
+
+
+@pytest.mark.asyncio
+async def test_streams_per_user_are_limited():
+    """Test that a user cannot open more than max_streams streams."""
+    feed = AnomalyFeed(max_streams=1)
+    with feed.subscribe(1):
+        assert not feed.can_subscribe(1)
+        with pytest.raises(TooManyStreams):
+            with feed.subscribe(1):
+                pass
+    assert feed.can_subscribe(1)
+
+
+@pytest.mark.asyncio
+async def test_only_anomalies_among_ingested_rows_are_published(monkeypatch):
+    """Test that the ingest scan scores with context but publishes only rows the ingest wrote."""
+    feed = AnomalyFeed()
+    monkeypatch.setattr(anomaly_feed, "_anomaly_feed", feed)
+
+    @asynccontextmanager
+    async def session():
+        yield None
+
+    detected = [{"transaction_id": 1, "anomaly_score": -0.9}, {"transaction_id": 5, "anomaly_score": -0.7}]
+    inference = SimpleNamespace(ai_service=SimpleNamespace(detect_anomalies=None), run=AsyncMock(return_value=detected))
+    monkeypatch.setattr(anomaly_feed, "get_inference", lambda: inference)
+    monkeypatch.setattr(anomaly_feed, "get_sessionmaker", lambda: session)
+
+    with patch.object(anomaly_feed, "AnalyticsService") as MockAnalyticsService, feed.subscribe(1) as stream:
+        service = MockAnalyticsService.return_value
+        service.get_updated_transaction_ids = AsyncMock(return_value={5, 6})
+        service.get_transaction_records = AsyncMock(return_value=[{"id": i} for i in range(1, 7)])
+
+        assert await publish_new_anomalies(1, datetime(2024, 1, 1)) == 1
+        assert [e.data["transaction_id"] for e in drain(stream)] == [5]
@@ -0,0 +1,122 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.models.transaction import MonthStats, Transaction, TransactionAnomaly, TransactionType, User
+from app.services import batch_pipeline
+from app.services.batch_pipeline import BatchPipeline
+from app.services.insights_service import MemoryInsightsStore
+from tests.factories import insert_transactions, make_transaction
+
+
+class FakeAIService:
+    """Flags expenses of 1000 or more, records the users it scored, and fails once for ``fail_user``."""
+
+    scored = []
+    fail_user = None
+
+    def __init__(self, model_path):
+        self.model_path = model_path
+
+    def detect_anomalies_batch(self, transactions_by_user):
+        FakeAIService.scored.extend(transactions_by_user)
+        if FakeAIService.fail_user in transactions_by_user:
+            FakeAIService.fail_user = None
+            raise RuntimeError("worker crashed")
+        return {
+            user_id: [{"transaction_id": t["id"], "anomaly_score": -0.6, "severity": "high"}
+                      for t in transactions if t["amount"] >= 1000]
+            for user_id, transactions in transactions_by_user.items()
+        }
+
+    def generate_insights(self, transactions):
+        return {"spending_trends": [], "savings_opportunities": [], "budget_recommendations": [],
+                "risk_alerts": [], "transactions": len(transactions)}
+
+
+@pytest.fixture
+def fake_ai(monkeypatch):
+    FakeAIService.scored = []
+    FakeAIService.fail_user = None
+    monkeypatch.setattr(batch_pipeline, "AIService", FakeAIService)
+    return FakeAIService
+
+
+async def seed(engine, users: int):
+    async with engine.begin() as conn:
+        await conn.execute(insert(User), [
+            {"id": i, "username": f"user{i}", "email": f"user{i}@example.com"} for i in range(1, users + 1)
+        ])
+    yesterday = datetime.now() - timedelta(days=1)
+    await insert_transactions(engine, [
+        make_transaction(user_id=u, amount=amount, transaction_date=yesterday, reference_number=f"REF-{u}-{amount}")
+        for u in range(1, users + 1) for amount in ("20.00", "1500.00")
+    ] + [make_transaction(user_id=1, amount="5000.00", type=TransactionType.INCOME, reference_number="SALARY")])
+
+
+async def anomalies(engine):
+    async with engine.connect() as conn:
+        return (await conn.execute(
+            select(TransactionAnomaly.user_id, Transaction.amount)
+            .join(Transaction, Transaction.id == TransactionAnomaly.transaction_id)
+            .order_by(TransactionAnomaly.user_id)
+        )).all()
+
+
+@pytest.mark.asyncio
+async def test_new_expenses_are_scored_stored_and_not_rescored(sqlite_engine, tmp_path, fake_ai):
+    """Test that a run stores anomalies and insights, and the next run scores only transactions written since."""
+    await seed(sqlite_engine, users=3)
+    store = MemoryInsightsStore()
+    pipeline = BatchPipeline(async_sessionmaker(sqlite_engine), str(tmp_path / "checkpoint.json"), str(tmp_path),
+                             insights_store=store, chunk_size=2, stats_months=2)
+
+    report = await pipeline.run()
+
+    assert [(user_id, float(amount)) for user_id, amount in await anomalies(sqlite_engine)] == [
+        (1, 1500.0), (2, 1500.0), (3, 1500.0)
+    ]
+    assert report["users"] == 3 and report["chunks"] == 2
+    assert report["stages"]["score"]["users"] == 3 and report["stages"]["score"]["rows"] == 6
+    assert report["stages"]["store"]["rows"] == 3
+    assert (await store.get(2)).insights["transactions"] == 2
+    assert report["stages"]["stats"]["users"] == 3
+    async with sqlite_engine.connect() as conn:
+        stored = (await conn.execute(select(MonthStats.user_id, MonthStats.kind))).all()
+    assert len(stored) == 3 * 2 * 2  # two months of summaries and sketches per user
+
+    # User 2's large expense is corrected; only user 2 is rescored and the stale flag is cleared
+    async with sqlite_engine.begin() as conn:
+        await conn.execute(update(Transaction).where(Transaction.reference_number == "REF-2-1500.00")
+                           .values(amount=15, updated_at=datetime.utcnow()))
+    fake_ai.scored = []
+    report = await pipeline.run()
+
+    assert fake_ai.scored == [2]
+    assert [user_id for user_id, _ in await anomalies(sqlite_engine)] == [1, 3]
+    assert report["stages"]["score"]["users"] == 1
+
+
+@pytest.mark.asyncio
+async def test_a_crashed_run_resumes_after_the_last_finished_chunk(sqlite_engine, tmp_path, fake_ai):
+    """Test that a run failing part way resumes from its checkpoint instead of rescoring finished users."""
+    await seed(sqlite_engine, users=3)
+    checkpoint_path = tmp_path / "checkpoint.json"
+    pipeline = BatchPipeline(async_sessionmaker(sqlite_engine), str(checkpoint_path), str(tmp_path), chunk_size=1)
+
+    fake_ai.fail_user = 2
+    with pytest.raises(RuntimeError):
+        await pipeline.run()
+    checkpoint = json.loads(checkpoint_path.read_text())
+    assert checkpoint["run"]["after_user_id"] == 1
+
+    fake_ai.scored = []
+    report = await pipeline.run()
+
+    assert fake_ai.scored == [2, 3]
+    assert report["resumes"] == 1 and report["users"] == 3
+    assert [user_id for user_id, _ in await anomalies(sqlite_engine)] == [1, 2, 3]
+    assert "run" not in json.loads(checkpoint_path.read_text())
@@ -0,0 +1,93 @@
+import json
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.dedup_service import BloomFilter, ReferenceDeduplicator
+from app.services.ingest_service import TransactionIngestor, iter_batches, iter_lines
+from tests.factories import insert_transactions, make_transaction
+
+
+async def _feed(*references):
+    yield "".join(
+        json.dumps({"amount": "5.00", "type": "EXPENSE", "reference_number": ref}) + "\n" for ref in references
+    ).encode()
+
+
+def _count_queries(engine):
+    """Counts SELECTs against transactions issued on ``engine``."""
+    from sqlalchemy import event
+    queries = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "transactions" in statement:
+            queries.append(statement)
+    return queries
+
+
+@pytest_asyncio.fixture
+async def session(sqlite_engine):
+    """Fixture providing a session over 1000 stored reference numbers for user 1."""
+    await insert_transactions(sqlite_engine, [make_transaction(reference_number=f"OLD-{i}") for i in range(1000)])
+    async with AsyncSession(sqlite_engine) as session:
+        yield session
+
+
+def test_bloom_filter_has_no_false_negatives_and_bounded_false_positives():
+    """Test membership guarantees at the configured error rate."""
+    bloom = BloomFilter(capacity=10000, error_rate=0.01)
+    bloom.add([f"key-{i}" for i in range(10000)])
+
+    assert bloom.contains([f"key-{i}" for i in range(10000)]).all()
+    false_positive_rate = bloom.contains([f"other-{i}" for i in range(10000)]).mean()
+    assert false_positive_rate < 0.03
+
+
+@pytest.mark.asyncio
+async def test_rebuild_save_and_catch_up(session, sqlite_engine, tmp_path):
+    """Test that a saved filter is reloaded and only newer rows are scanned."""
+    path = str(tmp_path / "bloom.npz")
+    dedup = ReferenceDeduplicator(path, capacity=10000)
+    await dedup.load_or_rebuild(session)
+    assert dedup.max_id == 1000
+
+    await insert_transactions(sqlite_engine, [make_transaction(reference_number="NEW-1")])
+    reloaded = ReferenceDeduplicator(path, capacity=10000)
+    assert reloaded.load()
+    assert await reloaded.catch_up(session) == 1
+    assert reloaded.bloom.contains(["OLD-5", "NEW-1"]).all()
+
+    # A filter sized differently cannot reuse the file and is rebuilt
+    assert not ReferenceDeduplicator(path, capacity=500).load()
+
+
+@pytest.mark.asyncio
+async def test_only_possible_duplicates_are_checked_in_the_database(session, sqlite_engine, tmp_path):
+    """Test that fresh reference numbers skip the DB and duplicates are confirmed in batches."""
+    dedup = ReferenceDeduplicator(str(tmp_path / "bloom.npz"), capacity=10000)
+    await dedup.load_or_rebuild(session)
+    queries = _count_queries(sqlite_engine)
+
+    # Replayed feed: 50 already stored rows plus 950 fresh ones
+    feed = _feed(*[f"OLD-{i}" for i in range(50)], *[f"FRESH-{i}" for i in range(950)])
+    report = await TransactionIngestor(session, on_conflict="skip", dedup=dedup).ingest(
+        iter_batches(iter_lines(feed)), user_id=1
+    )
+
+    assert report["duplicates"] == 50
+    assert report["written"] == 950
+    assert len(queries) == 1  # one batched IN query instead of one lookup per row
+    assert dedup.bloom.contains(["FRESH-1"]).all()
+
+
+@pytest.mark.asyncio
+async def test_user_scope_keys_on_owner(session, tmp_path):
+    """Test that per-user scope does not treat another user's reference as a duplicate."""
+    dedup = ReferenceDeduplicator(str(tmp_path / "bloom.npz"), capacity=10000, scope="user")
+    await dedup.load_or_rebuild(session)
+
+    report = await TransactionIngestor(session, on_conflict="skip", dedup=dedup).ingest(
+        iter_batches(iter_lines(_feed("OLD-1"))), user_id=2
+    )
+    assert report["duplicates"] == 0
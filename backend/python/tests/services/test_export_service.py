@@ -0,0 +1,68 @@
+import csv
+import gzip
+import io
+import json
+import pytest
+import pytest_asyncio
+from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.export_service import EXPORT_FIELDS, TransactionExporter
+from tests.factories import insert_transactions, make_transaction
+
+
+@pytest_asyncio.fixture
+async def session(sqlite_engine):
+    """Fixture providing a session over five transactions for user 1 and one for user 2."""
+    await insert_transactions(sqlite_engine, [
+        make_transaction(amount=f"{i}.25", transaction_date=datetime(2024, 1, i + 1), reference_number=f"REF-{i}")
+        for i in range(5)
+    ] + [make_transaction(user_id=2, amount="1.00", reference_number="OTHER")])
+    async with AsyncSession(sqlite_engine) as session:
+        yield session
+
+
+async def _collect(exporter, *args, **kwargs):
+    return [chunk async for chunk in exporter.stream(*args, **kwargs)]
+
+
+@pytest.mark.asyncio
+async def test_ndjson_export_streams_in_chunks(session):
+    """Test that NDJSON rows are yielded one partition at a time."""
+    chunks = await _collect(TransactionExporter(session, chunk_size=2), 1)
+
+    assert len(chunks) == 3
+    rows = [json.loads(line) for line in b"".join(chunks).decode().splitlines()]
+    assert [r["reference_number"] for r in rows] == [f"REF-{i}" for i in range(5)]
+    assert rows[1]["amount"] == "1.25"
+    assert rows[0]["type"] == "EXPENSE"
+    assert rows[0]["transaction_date"] == "2024-01-01T00:00:00"
+
+
+@pytest.mark.asyncio
+async def test_csv_export_with_date_filter(session):
+    """Test CSV output with a header row and date filtering."""
+    chunks = await _collect(
+        TransactionExporter(session), 1, fmt="csv",
+        start_date=datetime(2024, 1, 2), end_date=datetime(2024, 1, 3)
+    )
+
+    rows = list(csv.reader(io.StringIO(b"".join(chunks).decode())))
+    assert rows[0] == EXPORT_FIELDS
+    assert [r[EXPORT_FIELDS.index("reference_number")] for r in rows[1:]] == ["REF-1", "REF-2"]
+
+
+@pytest.mark.asyncio
+async def test_gzip_export_round_trips(session):
+    """Test that the compressed stream is a single valid gzip member."""
+    chunks = await _collect(TransactionExporter(session, chunk_size=2), 1, compress=True)
+
+    lines = gzip.decompress(b"".join(chunks)).decode().splitlines()
+    assert len(lines) == 5
+
+
+@pytest.mark.asyncio
+async def test_unknown_format_is_rejected(session):
+    """Test that unsupported formats raise before any query runs."""
+    with pytest.raises(ValueError):
+        await _collect(TransactionExporter(session), 1, fmt="xml")
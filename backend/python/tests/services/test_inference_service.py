@@ -0,0 +1,76 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.services.inference_service import INFERENCE_QUEUE_TIME, INFERENCE_TIMEOUTS, InferenceService
+
+
+class FakeAIService:
+    """Records which thread each call ran on; ``gate`` holds calls until it is set."""
+
+    def __init__(self):
+        self.threads = []
+        self.calls = []
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def detect_anomalies(self, transactions):
+        self.threads.append(threading.current_thread().name)
+        self.calls.append(transactions)
+        self.gate.wait(5)
+        return [t for t in transactions if t["amount"] > 100]
+
+    def predict_spending_batch(self, features_list):
+        self.threads.append(threading.current_thread().name)
+        return [{"success": True, "predicted_amount": float(f["hour"]), "message": "ok"} for f in features_list]
+
+
+@pytest.mark.asyncio
+async def test_inference_runs_on_the_pool_and_records_queue_time():
+    """Test that jobs run on the inference threads, not the event loop, and their queue time is observed."""
+    ai_service = FakeAIService()
+    inference = InferenceService(ai_service, workers=2, timeout=5)
+    observed = INFERENCE_QUEUE_TIME.labels(operation="test-run")._sum.get()
+
+    anomalies = await inference.run("test-run", ai_service.detect_anomalies, [{"amount": 50}, {"amount": 500}])
+
+    assert anomalies == [{"amount": 500}]
+    assert ai_service.threads[0].startswith("inference")
+    assert INFERENCE_QUEUE_TIME.labels(operation="test-run")._sum.get() > observed
+    inference.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_jobs_that_time_out_in_the_queue_are_never_run():
+    """Test that a request stuck behind a busy pool times out and its job is skipped."""
+    ai_service = FakeAIService()
+    ai_service.gate.clear()
+    inference = InferenceService(ai_service, workers=1, timeout=0.05)
+    queued = INFERENCE_TIMEOUTS.labels(operation="test-queued", stage="queued")._value.get()
+
+    busy = asyncio.ensure_future(inference.run("test-busy", ai_service.detect_anomalies, ["first"]))
+    await asyncio.sleep(0)
+    with pytest.raises(asyncio.TimeoutError):
+        await inference.run("test-queued", ai_service.detect_anomalies, ["second"])
+    assert INFERENCE_TIMEOUTS.labels(operation="test-queued", stage="queued")._value.get() == queued + 1
+
+    with pytest.raises(asyncio.TimeoutError):
+        await busy
+    ai_service.gate.set()
+    await asyncio.get_running_loop().run_in_executor(inference.executor, lambda: None)
+    assert ai_service.calls == [["first"]]
+    inference.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_spending_predictions_are_batched():
+    """Test that concurrent spending predictions share one model call."""
+    ai_service = FakeAIService()
+    inference = InferenceService(ai_service, workers=2, timeout=5, batch_size=8, batch_wait=0.01)
+
+    results = await asyncio.gather(*(inference.predict_spending({"hour": hour}) for hour in range(5)))
+
+    assert [result["predicted_amount"] for result in results] == [0.0, 1.0, 2.0, 3.0, 4.0]
+    assert len(ai_service.threads) == 1
+    inference.shutdown()
@@ -0,0 +1,124 @@
+import json
+import pandas as pd
+import pytest
+import pytest_asyncio
+from datetime import datetime
+from decimal import Decimal
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.transaction import Transaction, TransactionType
+from app.services.ingest_service import TransactionIngestor, iter_batches, iter_lines, validate_batch
+
+
+async def _chunks(*parts):
+    for part in parts:
+        yield part
+
+
+def _ndjson(*records):
+    return ("\n".join(json.dumps(r) for r in records) + "\n").encode()
+
+
+@pytest_asyncio.fixture
+async def session(sqlite_engine):
+    """Fixture providing a read-write session on an empty SQLite database."""
+    async with AsyncSession(sqlite_engine) as session:
+        yield session
+
+
+@pytest.mark.asyncio
+async def test_iter_lines_handles_split_chunks():
+    """Test that lines split across chunk boundaries are reassembled."""
+    lines = [line async for line in iter_lines(_chunks(b'{"a":', b' 1}\r\n{"a"', b": 2}\n\n", b'{"a": 3}'))]
+    assert lines == ['{"a": 1}', '{"a": 2}', '{"a": 3}']
+
+
+@pytest.mark.asyncio
+async def test_iter_batches_csv_uses_header():
+    """Test that CSV batches are keyed by the header row."""
+    body = b"amount,type,user_id\n1.50,expense,1\n2.00,income,1\n3.00,expense,2\n"
+    batches = [b async for b in iter_batches(iter_lines(_chunks(body)), fmt="csv", batch_size=2)]
+    assert [len(b) for b in batches] == [2, 1]
+    assert list(batches[0].columns) == ["amount", "type", "user_id"]
+
+
+def test_validate_batch_rejects_invalid_rows():
+    """Test that each invalid column is rejected with its own error."""
+    raw = pd.DataFrame([
+        {"amount": "12.349", "type": "expense", "user_id": 1, "transaction_date": "2024-01-05T10:00:00Z"},
+        {"amount": "abc", "type": "EXPENSE", "user_id": 1},
+        {"amount": "1", "type": "REFUND", "user_id": 1},
+        {"amount": "1", "type": "INCOME", "user_id": 0},
+        {"amount": "1", "type": "INCOME", "user_id": 1, "transaction_date": "yesterday"},
+        {"amount": "1", "type": "INCOME", "user_id": 1, "reference_number": "R" * 101},
+    ])
+
+    rows, errors = validate_batch(raw, now=datetime(2024, 2, 1))
+
+    assert len(rows) == 1
+    assert rows.iloc[0]["amount"] == 12.35
+    assert rows.iloc[0]["type"] == "EXPENSE"
+    assert rows.iloc[0]["transaction_date"] == pd.Timestamp("2024-01-05 10:00:00")
+    assert [e["row"] for e in errors] == [1, 2, 3, 4, 5]
+    assert "amount" in errors[0]["error"]
+    assert "type" in errors[1]["error"]
+    assert "user_id" in errors[2]["error"]
+    assert "transaction_date" in errors[3]["error"]
+    assert "reference_number" in errors[4]["error"]
+
+
+def test_validate_batch_keeps_last_duplicate_reference():
+    """Test that repeated reference numbers within a batch keep the last row."""
+    raw = pd.DataFrame([
+        {"amount": "1", "type": "EXPENSE", "reference_number": "A"},
+        {"amount": "2", "type": "EXPENSE", "reference_number": "A"},
+        {"amount": "3", "type": "EXPENSE"},
+        {"amount": "4", "type": "EXPENSE"},
+    ])
+    rows, errors = validate_batch(raw, user_id=7)
+    assert not errors
+    assert rows["amount"].tolist() == [2.0, 3.0, 4.0]
+    assert set(rows["user_id"]) == {7}
+
+
+@pytest.mark.asyncio
+async def test_ingest_upserts_on_reference_number(session):
+    """Test that re-delivered rows update existing transactions instead of failing."""
+    ingestor = TransactionIngestor(session, batch_size=2)
+    first = _ndjson(*[
+        {"amount": f"{i}.00", "type": "EXPENSE", "reference_number": f"REF-{i}", "category": "Groceries"}
+        for i in range(5)
+    ])
+    report = await ingestor.ingest(iter_batches(iter_lines(_chunks(first)), batch_size=2), user_id=1)
+    assert report["received"] == 5
+    assert report["written"] == 5
+    assert report["rows_per_second"] > 0
+
+    replay = _ndjson({"amount": "99.99", "type": "EXPENSE", "reference_number": "REF-1"},
+                     {"amount": "oops", "type": "EXPENSE", "reference_number": "REF-9"})
+    report = await ingestor.ingest(iter_batches(iter_lines(_chunks(replay))), user_id=1)
+    assert report["rejected"] == 1
+    assert report["errors"][0]["row"] == 1
+
+    amounts = (await session.execute(
+        select(Transaction.reference_number, Transaction.amount).order_by(Transaction.reference_number)
+    )).all()
+    assert len(amounts) == 5
+    assert dict(amounts)["REF-1"] == Decimal("99.99")
+
+
+@pytest.mark.asyncio
+async def test_ingest_skip_and_other_users_rows_are_untouched(session):
+    """Test that skip mode and cross-user conflicts leave existing rows alone."""
+    seed = _ndjson({"amount": "10.00", "type": "INCOME", "reference_number": "SHARED"})
+    await TransactionIngestor(session).ingest(iter_batches(iter_lines(_chunks(seed))), user_id=1)
+
+    other_user = _ndjson({"amount": "20.00", "type": "EXPENSE", "reference_number": "SHARED"})
+    await TransactionIngestor(session).ingest(iter_batches(iter_lines(_chunks(other_user))), user_id=2)
+    await TransactionIngestor(session, on_conflict="skip").ingest(
+        iter_batches(iter_lines(_chunks(other_user))), user_id=1
+    )
+
+    row = (await session.execute(select(Transaction))).scalar_one()
+    assert (row.user_id, row.amount, row.type) == (1, Decimal("10.00"), TransactionType.INCOME)
@@ -0,0 +1,129 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.models.transaction import TransactionType
+from app.services import insights_service
+from app.services.insights_service import InsightsRefresher, MemoryInsightsStore, StoredInsights
+
+
+class FakeInference:
+    """Runs insight generation inline, recording the users computed and the peak concurrency."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.computed = []
+        self.running = 0
+        self.peak = 0
+        self.ai_service = SimpleNamespace(generate_insights=self.generate_insights)
+
+    def generate_insights(self, transactions):
+        return {"spending_trends": [], "savings_opportunities": transactions, "budget_recommendations": [],
+                "risk_alerts": []}
+
+    async def run(self, operation, fn, transactions):
+        self.computed.append(transactions[0]["user_id"])
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        await asyncio.sleep(self.delay)
+        self.running -= 1
+        return fn(transactions)
+
+
+@asynccontextmanager
+async def fake_session():
+    yield None
+
+
+@pytest.fixture
+def records():
+    async def get_transaction_records(user_id, start_date, end_date, transaction_type=None):
+        assert transaction_type == TransactionType.EXPENSE
+        return [{"user_id": user_id}]
+
+    with patch.object(insights_service, "AnalyticsService") as MockAnalyticsService:
+        MockAnalyticsService.return_value.get_transaction_records = AsyncMock(side_effect=get_transaction_records)
+        yield MockAnalyticsService
+
+
+@pytest.mark.asyncio
+async def test_insights_are_computed_once_then_served_from_the_store(records):
+    """Test that a miss computes and stores insights, and later requests are plain lookups."""
+    inference = FakeInference()
+    refresher = InsightsRefresher(MemoryInsightsStore(), inference, fake_session)
+
+    first, first_stale = await refresher.get(1)
+    second, second_stale = await refresher.get(1)
+
+    assert inference.computed == [1]
+    assert second == first
+    assert first.insights["savings_opportunities"] == [{"user_id": 1}]
+    assert not first_stale and not second_stale
+
+
+@pytest.mark.asyncio
+async def test_new_transactions_make_insights_stale_until_refreshed(records):
+    """Test that marking a user dirty flags their stored insights and puts them first in line."""
+    inference = FakeInference()
+    refresher = InsightsRefresher(MemoryInsightsStore(), inference, fake_session, refresh_interval=3600)
+    for user_id in (1, 2, 3):
+        await refresher.get(user_id)
+
+    refresher.mark_dirty(1)
+    assert refresher.due() == [1]
+    assert (await refresher.get(1))[1] is True
+
+    await refresher.refresh_due()
+    assert inference.computed == [1, 2, 3, 1]
+    assert (await refresher.get(1))[1] is False
+
+    # Insights older than twice the refresh interval are stale even without new transactions
+    await refresher.store.put(2, StoredInsights({}, datetime.now() - timedelta(hours=3), 90))
+    assert (await refresher.get(2))[1] is True
+
+
+@pytest.mark.asyncio
+async def test_background_refreshes_are_bounded_and_most_recent_first(records, monkeypatch):
+    """Test the refresh order and concurrency limit, and that inactive users are dropped."""
+    clock = SimpleNamespace(now=1000.0)
+    # Only the refresher's clock is faked; the event loop keeps the real one
+    monkeypatch.setattr(insights_service, "time",
+                        SimpleNamespace(monotonic=lambda: clock.now, perf_counter=time.perf_counter))
+    inference = FakeInference(delay=0.01)
+    refresher = InsightsRefresher(MemoryInsightsStore(), inference, fake_session,
+                                  refresh_interval=60, active_window=3600, concurrency=2)
+    for user_id in range(6):
+        refresher.touch(user_id)
+        clock.now += 1
+    clock.now += 3600 - 3
+
+    assert refresher.due() == [5, 4, 3]
+    await refresher.refresh_due()
+    assert inference.computed == [5, 4, 3]
+    assert inference.peak == 2
+    assert refresher.due() == []
+
+
+@pytest.mark.asyncio
+async def test_refresh_loop_picks_up_new_transactions(records, monkeypatch):
+    """Test that the background loop refreshes a dirty user without waiting for the interval."""
+    monkeypatch.setattr(insights_service, "DIRTY_DEBOUNCE_SECONDS", 0.0)
+    inference = FakeInference()
+    refresher = InsightsRefresher(MemoryInsightsStore(), inference, fake_session, refresh_interval=3600)
+    await refresher.get(1)
+    refresher.start()
+    try:
+        refresher.mark_dirty(1)
+        for _ in range(100):
+            if len(inference.computed) == 2:
+                break
+            await asyncio.sleep(0.01)
+        assert inference.computed == [1, 1]
+    finally:
+        await refresher.stop()
+    assert refresher._task is None